@@ -0,0 +1,46 @@
+import time
+
+import numpy as np
+
+from co2_arrays import annual_stats, load_daily_arrays, monthly_stats, rolling_mean, seasonal_stats
+
+# Define the path to the CSV file
+csv_file = "co2-ppm-daily.csv"
+window_days = 365  # Length of the rolling mean window
+
+# The parsed columns are cached in co2-ppm-daily.npz and reused until the CSV changes
+start = time.perf_counter()
+dates, values = load_daily_arrays(csv_file)
+print("Loaded {} daily values in {:.1f} ms".format(len(values), (time.perf_counter() - start) * 1000))
+
+years, yearly = annual_stats(dates, values)
+print("\nAnnual Averages:")
+for year, mean in zip(years, yearly['mean']):
+    print("Year {}: Annual Average = {}".format(year, mean))
+
+print("\nOverall Statistics:")
+print("Minimum Value:", values.min())
+print("Maximum Value:", values.max())
+print("Overall Average:", values.mean())
+print("Standard Deviation:", values.std(ddof=1))
+
+seasons, seasonal = seasonal_stats(dates, values)
+print("\nSeasonal Averages:")
+for season, mean in zip(seasons, seasonal['mean']):
+    print("{}: {}".format(season, mean))
+
+months, monthly = monthly_stats(dates, values)
+print("\nMonthly Averages (last 12 months):")
+for month, mean, count in zip(months[-12:], monthly['mean'][-12:], monthly['count'][-12:]):
+    print("{}: {} ({} days)".format(month, mean, count))
+
+days, rolling = rolling_mean(dates, values, window_days)
+print("\n{}-day Rolling Mean:".format(window_days))
+print("Lowest: {} ending {}".format(np.nanmin(rolling), days[np.nanargmin(rolling)]))
+print("Highest: {} ending {}".format(np.nanmax(rolling), days[np.nanargmax(rolling)]))
+
+# Anomalies relative to the mean of the entire time series, as one array
+anomalies = values - values.mean()
+print("\nLargest Anomalies Relative to Overall Mean:")
+for index in np.argsort(np.abs(anomalies))[::-1][:10]:
+    print("{}: {}".format(dates[index], anomalies[index]))
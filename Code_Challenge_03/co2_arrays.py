@@ -0,0 +1,115 @@
+import io
+import os
+
+import numpy as np
+
+from co2_stats import SEASONS
+
+# Season names in the order of their group numbers, and the group number of each month (index 1-12)
+SEASON_NAMES = ['Spring', 'Summer', 'Autumn', 'Winter']
+MONTH_SEASON = np.array([-1] + [SEASON_NAMES.index(SEASONS[month]) for month in range(1, 13)])
+
+
+def file_signature(path):
+    """Size and modification time of a file, used to tell whether a cached copy is stale"""
+    return os.path.getsize(path), os.stat(path).st_mtime_ns
+
+
+def parse_daily_csv(csv_path):
+    """Parse a 'M/D/YYYY,value' CSV into (datetime64[D] dates, float64 values) in one call.
+
+    The slashes are turned into commas so the whole file is read by NumPy's C parser as four
+    numeric columns (month, day, year, value); the dates are then assembled from their parts.
+    """
+    with open(csv_path, 'r') as file:
+        next(file)  # Skip the header row
+        text = file.read().replace('/', ',')
+    table = np.loadtxt(io.StringIO(text), delimiter=',', ndmin=2)
+    month, day, year = table[:, 0].astype(np.int64), table[:, 1].astype(np.int64), table[:, 2].astype(np.int64)
+    months = (year - 1970) * 12 + month - 1
+    dates = months.astype('datetime64[M]').astype('datetime64[D]') + (day - 1)
+    return dates, table[:, 3].copy()
+
+
+def load_daily_arrays(csv_path, cache=True):
+    """The dates and values of a daily CSV, from <name>.npz next to it if the CSV has not changed.
+
+    The sidecar stores the CSV's size and mtime; when they no longer match the file is parsed
+    again and the sidecar rewritten, so repeat analyses skip parsing entirely.
+    """
+    cache_path = os.path.splitext(csv_path)[0] + ".npz"
+    signature = file_signature(csv_path)
+    if cache and os.path.exists(cache_path):
+        try:
+            with np.load(cache_path) as saved:
+                if tuple(saved['signature'].tolist()) == signature:
+                    return saved['dates'], saved['values']
+        except (OSError, ValueError, KeyError):
+            pass
+    dates, values = parse_daily_csv(csv_path)
+    if cache:
+        try:
+            np.savez(cache_path, dates=dates, values=values, signature=np.array(signature, dtype=np.int64))
+        except OSError:
+            # A read-only folder only costs the parse next time
+            pass
+    return dates, values
+
+
+def group_stats(keys, values):
+    """Count, mean, standard deviation, min and max of values grouped by an integer key array.
+
+    Returns (unique keys, {statistic: array}) with one entry per key, in key order. Sums come from
+    bincount; min and max from reduceat over the values sorted by key.
+    """
+    unique, inverse = np.unique(keys, return_inverse=True)
+    count = np.bincount(inverse, minlength=len(unique))
+    mean = np.bincount(inverse, values, len(unique)) / count
+    # Squared differences from the group mean avoid the cancellation of sum(x^2) - n * mean^2
+    squares = np.bincount(inverse, (values - mean[inverse]) ** 2, len(unique))
+    std = np.sqrt(np.divide(squares, count - 1, out=np.zeros(len(unique)), where=count > 1))
+    order = np.argsort(inverse, kind='stable')
+    starts = np.concatenate(([0], np.cumsum(count)[:-1]))
+    ordered = values[order]
+    return unique, {'count': count, 'mean': mean, 'std': std,
+                    'min': np.minimum.reduceat(ordered, starts), 'max': np.maximum.reduceat(ordered, starts)}
+
+
+def annual_stats(dates, values):
+    """Statistics per calendar year, keyed by year number"""
+    years = dates.astype('datetime64[Y]').astype(np.int64) + 1970
+    return group_stats(years, values)
+
+
+def monthly_stats(dates, values):
+    """Statistics per calendar month, keyed by datetime64[M]"""
+    months, stats = group_stats(dates.astype('datetime64[M]').astype(np.int64), values)
+    return months.astype('datetime64[M]'), stats
+
+
+def seasonal_stats(dates, values):
+    """Statistics per meteorological season (all years together), keyed by season name"""
+    month = dates.astype('datetime64[M]').astype(np.int64) % 12 + 1
+    seasons, stats = group_stats(MONTH_SEASON[month], values)
+    return [SEASON_NAMES[season] for season in seasons], stats
+
+
+def rolling_mean(dates, values, window_days):
+    """Mean of the values within the window_days calendar days ending on each day.
+
+    Missing days do not shift the window: values are summed onto a daily calendar and the
+    window sums come from differences of the cumulative sums. Returns (days, means); days
+    without any value in their window are NaN.
+    """
+    day = (dates - dates.min()).astype(np.int64)
+    length = int(day.max()) + 1
+    # Summing differences from the overall mean keeps the running totals small and their rounding error low
+    offset = values.mean()
+    sums = np.concatenate(([0.0], np.cumsum(np.bincount(day, values - offset, length))))
+    counts = np.concatenate(([0], np.cumsum(np.bincount(day, minlength=length))))
+    upper = np.arange(1, length + 1)
+    lower = np.maximum(upper - window_days, 0)
+    window_count = counts[upper] - counts[lower]
+    means = np.divide(sums[upper] - sums[lower], window_count,
+                      out=np.full(length, np.nan), where=window_count > 0)
+    return dates.min() + np.arange(length), means + offset
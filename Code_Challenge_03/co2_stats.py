@@ -0,0 +1,78 @@
+import csv
+import math
+
+# Meteorological seasons by month number
+SEASONS = {3: 'Spring', 4: 'Spring', 5: 'Spring',
+           6: 'Summer', 7: 'Summer', 8: 'Summer',
+           9: 'Autumn', 10: 'Autumn', 11: 'Autumn',
+           12: 'Winter', 1: 'Winter', 2: 'Winter'}
+
+
+class RunningStats(object):
+    """Count, min, max, mean and variance updated one value at a time (Welford's algorithm)"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # sum of squared differences from the current mean
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def variance(self):
+        """Sample variance (n - 1 in the denominator)"""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+
+def iter_daily_values(csv_path):
+    """Yield (date, year, month, value) for each row of a 'M/D/YYYY,value' CSV, splitting each date once"""
+    with open(csv_path, 'r', newline='') as file:
+        csv_reader = csv.reader(file)
+        next(csv_reader)  # Skip the header row
+        for row in csv_reader:
+            if len(row) < 2:
+                continue
+            date, value = row[0], row[1]
+            month, day, year = date.split('/')
+            yield date, year, int(month), float(value)
+
+
+def aggregate(csv_path):
+    """Overall, per-year and per-season statistics in a single pass over the file.
+
+    Memory is one RunningStats per year and season, however long the series is.
+    Returns (overall, {year: RunningStats}, {season: RunningStats}).
+    """
+    overall = RunningStats()
+    by_year = {}
+    by_season = {}
+    for date, year, month, value in iter_daily_values(csv_path):
+        overall.add(value)
+        if year not in by_year:
+            by_year[year] = RunningStats()
+        by_year[year].add(value)
+        season = SEASONS[month]
+        if season not in by_season:
+            by_season[season] = RunningStats()
+        by_season[season].add(value)
+    return overall, by_year, by_season
+
+
+def iter_anomalies(csv_path, reference):
+    """Yield (date, value - reference) for every row, reading the file again instead of keeping it"""
+    for date, year, month, value in iter_daily_values(csv_path):
+        yield date, value - reference
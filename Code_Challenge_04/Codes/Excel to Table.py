@@ -1,21 +1,37 @@
-import arcpy
 import os
+
+from precipitation_table import ingest_files
+
+
 def convert_data(input_excel_file, output_folder):
+    # arcpy is only loaded when the geoprocessing tool is used
+    import arcpy
     try:
         arcpy.env.workspace = output_folder
-        arcpy.CheckOutExtension("Spatial")
+        # Table To Table is a core conversion tool, no extension needs to be checked out
         arcpy.TableToTable_conversion(input_excel_file, output_folder, "output_table")
 
         print("Conversion completed successfully.")
-    except arcpy.ExecuteError:
-        print("ArcPy execution error occurred.")
     except arcpy.ExecuteError as e:
         print("An ArcPy specific error occurred:", str(e))
     except Exception as e:
         print("An error occurred during conversion:", str(e))
 
+
 if __name__ == "__main__":
     input_excel_path = r"C:\GitHub\NRS_528\Trial_04\Meshanticut Precipitation Data.csv"
     output_folder_path = r"C:\GitHub\NRS_528\Trial_04\Excel to table"
 
-    convert_data(input_excel_path, output_folder_path)
+    # Bulk mode loads the listed station CSVs into one SQLite database as
+    # (station, series, year, month, value) rows, with annual and monthly aggregates.
+    # Files that are not station tables are skipped and reported.
+    bulk_ingest = True
+    station_files = [input_excel_path]
+
+    if bulk_ingest:
+        database = os.path.join(output_folder_path, "precipitation.sqlite")
+        os.makedirs(output_folder_path, exist_ok=True)
+        count, skipped = ingest_files(station_files, database)
+        print(f"Wrote {count} monthly values to {database}, skipped {len(skipped)} files.")
+    else:
+        convert_data(input_excel_path, output_folder_path)
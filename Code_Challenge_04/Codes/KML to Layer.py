@@ -1,23 +1,43 @@
-import arcpy
 import os
+import sys
+
+from kml_reader import convert_folder, convert_kml
 
 def convert_data(kml_file, output_folder):
+    # arcpy is only loaded when the geoprocessing tool is used
+    import arcpy
     try:
         arcpy.env.workspace = output_folder
         os.path.join(output_folder, "output_layer.lyr")
         arcpy.KMLToLayer_conversion(kml_file, output_folder)
-        
+
         print("Conversion completed successfully.")
     except arcpy.ExecuteError as e:
         print("An ArcPy error occurred:", e)
     except Exception as e:
         print("An error occurred during conversion:", e)
 
+def convert_streaming(kml_path, output_folder, output_format="shapefile"):
+    # Stream the Placemarks straight to shapefiles or GeoJSON; a folder is converted one process per file
+    if os.path.isdir(kml_path):
+        results = convert_folder(kml_path, output_folder, output_format)
+    else:
+        os.makedirs(output_folder, exist_ok=True)
+        results = {kml_path: convert_kml(kml_path, output_folder, output_format)}
+    for path, outputs in results.items():
+        print(path, outputs)
+    return results
+
 if __name__ == "__main__":
     # Example input KML file path - replace with your actual file path
-    kml_file_path = r"C:\GitHub\NRS_528\Trial_04\Watershed.kml"
+    kml_file_path = sys.argv[1] if len(sys.argv) > 1 else r"C:\GitHub\NRS_528\Trial_04\Watershed.kml"
     # Output layer file path - replace with your desired output layer path
     output_folder_path = r"C:\GitHub\NRS_528\Trial_04\KML to Layer"
+    # KML To Layer builds a file geodatabase per call; the streaming reader needs no arcpy
+    use_arcpy = False
 
     # Call the conversion function
-    convert_data(kml_file_path, output_folder_path)
+    if use_arcpy:
+        convert_data(kml_file_path, output_folder_path)
+    else:
+        convert_streaming(kml_file_path, output_folder_path, "shapefile")
@@ -0,0 +1,231 @@
+import glob
+import json
+import os
+import zipfile
+import xml.etree.ElementTree as ElementTree
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from shapefile_io import POINT, POLYGON, POLYLINE, ShapefileWriter
+
+WGS84_WKT = ('GEOGCS["GCS_WGS_1984",DATUM["D_WGS_1984",SPHEROID["WGS_1984",6378137.0,298.257223563]],'
+             'PRIMEM["Greenwich",0.0],UNIT["Degree",0.0174532925199433]]')
+# KML geometry elements, the shapefile type they are written as and the suffix of that shapefile
+SHAPE_TYPES = {"Point": (POINT, "point"), "LineString": (POLYLINE, "line"), "LinearRing": (POLYLINE, "line"),
+               "Polygon": (POLYGON, "polygon")}
+
+
+def _local(tag):
+    # Tag name without its namespace ("{http://www.opengis.net/kml/2.2}Point" -> "Point")
+    return tag[tag.rfind("}") + 1:]
+
+
+def open_kml(path):
+    """Binary stream of a .kml file, or of the main .kml document inside a .kmz archive"""
+    if not path.lower().endswith(".kmz"):
+        return open(path, 'rb')
+    archive = zipfile.ZipFile(path)
+    names = [name for name in archive.namelist() if name.lower().endswith(".kml")]
+    if not names:
+        archive.close()
+        raise ValueError(f"{path} contains no KML document.")
+    # doc.kml is the conventional main document; otherwise take the first one
+    name = "doc.kml" if "doc.kml" in names else names[0]
+    return archive.open(name)
+
+
+def parse_coordinates(text):
+    """(n, 2) float array of the lon, lat pairs in a KML <coordinates> string (altitudes are dropped)"""
+    tuples = text.split()
+    if not tuples:
+        return np.zeros((0, 2))
+    dimensions = tuples[0].count(",") + 1
+    values = np.array(",".join(tuples).split(","), dtype=np.float64).reshape(-1, dimensions)
+    return values[:, :2]
+
+
+def _geometries(element):
+    # (kind, parts) of every geometry under a Placemark; MultiGeometry is flattened
+    for child in element:
+        kind = _local(child.tag)
+        if kind == "MultiGeometry":
+            yield from _geometries(child)
+        elif kind in SHAPE_TYPES:
+            # Polygon rings come outer boundary first, as the KML schema orders them
+            parts = [parse_coordinates(node.text) for node in child.iter()
+                     if node.tag.endswith("coordinates") and node.text and node.text.strip()]
+            if parts:
+                yield kind, parts if kind == "Polygon" else parts[:1]
+
+
+def iter_placemarks(path):
+    """Yield (attributes, geometries) for every Placemark of a KML or KMZ file, in constant memory.
+
+    attributes is {field: text} from <name>, <description> and the ExtendedData Data/SimpleData
+    values; geometries is a list of (kind, parts), each part an (n, 2) array of lon, lat. Every
+    Placemark is removed from the tree once it has been read, so memory does not grow with the file.
+    """
+    with open_kml(path) as stream:
+        parents = []
+        for event, element in ElementTree.iterparse(stream, events=("start", "end")):
+            if event == "start":
+                parents.append(element)
+                continue
+            parents.pop()
+            if not element.tag.endswith("Placemark"):
+                continue
+            attributes = {}
+            for child in element:
+                kind = _local(child.tag)
+                if kind in ("name", "description"):
+                    attributes[kind.capitalize()] = (child.text or "").strip()
+                elif kind == "ExtendedData":
+                    for data in child.iter():
+                        if data.tag.endswith("}Data") or data.tag == "Data":
+                            value = [node.text for node in data if node.tag.endswith("value")]
+                            attributes[data.get("name")] = (value[0] or "").strip() if value else ""
+                        elif data.tag.endswith("SimpleData"):
+                            attributes[data.get("name")] = (data.text or "").strip()
+            yield attributes, list(_geometries(element))
+            if parents:
+                parents[-1].remove(element)
+
+
+def dbf_field_names(names):
+    """Map attribute names to unique dBASE field names of at most 10 characters"""
+    fields, used = {}, set()
+    for name in names:
+        base = "".join(character if character.isalnum() else "_" for character in name)[:10] or "FIELD"
+        field, number = base, 1
+        while field.upper() in used:
+            suffix = str(number)
+            field, number = base[:10 - len(suffix)] + suffix, number + 1
+        used.add(field.upper())
+        fields[name] = field
+    return fields
+
+
+def _ring_area(ring):
+    x, y = ring[:, 0], ring[:, 1]
+    return 0.5 * float(np.dot(x[:-1], y[1:]) - np.dot(x[1:], y[:-1]))
+
+
+def _shapefile_rings(rings):
+    # Shapefiles want outer rings clockwise and holes counter-clockwise; KML does not fix an order
+    oriented = []
+    for index, ring in enumerate(rings):
+        clockwise = _ring_area(ring) < 0
+        oriented.append(ring if clockwise == (index == 0) else ring[::-1])
+    return oriented
+
+
+def kml_to_shapefiles(path, output_folder, stem=None):
+    """Write the Placemarks of a KML/KMZ file as shapefiles, one per geometry type present
+    (<stem>_point.shp, <stem>_line.shp, <stem>_polygon.shp; stem defaults to the file name),
+    with every attribute as a UTF-8 text field.
+
+    The file is streamed twice: once to find the fields and their widths, once to write.
+    Returns {shapefile path: feature count}.
+    """
+    widths, kinds = {}, set()
+    for attributes, geometries in iter_placemarks(path):
+        for name, value in attributes.items():
+            widths[name] = max(widths.get(name, 1), min(len(value.encode("utf-8")), 254))
+        kinds.update(SHAPE_TYPES[kind][0] for kind, parts in geometries)
+
+    names = dbf_field_names(widths)
+    fields = [(names[name], "C", width, 0) for name, width in widths.items()]
+    stem = stem or os.path.splitext(os.path.basename(path))[0]
+    writers = {}
+    for shape_type, suffix in set(SHAPE_TYPES.values()):
+        if shape_type in kinds:
+            writers[shape_type] = ShapefileWriter(os.path.join(output_folder, f"{stem}_{suffix}.shp"),
+                                                  shape_type, fields, WGS84_WKT)
+    try:
+        for attributes, geometries in iter_placemarks(path):
+            record = [attributes.get(name) for name in widths]
+            # The parts of a Placemark's geometries of one type become one multipart shape
+            parts = {}
+            for kind, rings in geometries:
+                shape_type = SHAPE_TYPES[kind][0]
+                if shape_type == POINT:
+                    for point in rings[0]:
+                        writers[POINT].write([[tuple(point)]], record)
+                else:
+                    parts.setdefault(shape_type, []).extend(
+                        _shapefile_rings(rings) if shape_type == POLYGON else rings)
+            for shape_type, shape_parts in parts.items():
+                writers[shape_type].write([part.tolist() for part in shape_parts], record)
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return {os.path.splitext(writer.shp.name)[0] + ".shp": writer.count for writer in writers.values()}
+
+
+def _geojson_geometry(geometries):
+    shapes = []
+    for kind, parts in geometries:
+        if kind == "Point":
+            shapes.append({"type": "Point", "coordinates": parts[0][0].tolist()})
+        elif kind == "Polygon":
+            shapes.append({"type": "Polygon", "coordinates": [part.tolist() for part in parts]})
+        else:
+            shapes.append({"type": "LineString", "coordinates": parts[0].tolist()})
+    if not shapes:
+        return None
+    if len(shapes) == 1:
+        return shapes[0]
+    types = {shape["type"] for shape in shapes}
+    if len(types) == 1:
+        return {"type": "Multi" + shapes[0]["type"], "coordinates": [shape["coordinates"] for shape in shapes]}
+    return {"type": "GeometryCollection", "geometries": shapes}
+
+
+def kml_to_geojson(path, out_path):
+    """Write the Placemarks of a KML/KMZ file as a GeoJSON FeatureCollection, one feature at a time.
+
+    Returns the number of features written.
+    """
+    count = 0
+    with open(out_path, 'w') as file:
+        file.write('{"type": "FeatureCollection", "features": [\n')
+        for attributes, geometries in iter_placemarks(path):
+            feature = {"type": "Feature", "properties": attributes, "geometry": _geojson_geometry(geometries)}
+            file.write((",\n" if count else "") + json.dumps(feature))
+            count += 1
+        file.write("\n]}\n")
+    return count
+
+
+def convert_kml(path, output_folder, output_format="shapefile", stem=None):
+    """Convert one KML/KMZ file; returns {output path: feature count}"""
+    stem = stem or os.path.splitext(os.path.basename(path))[0]
+    if output_format.lower() == "geojson":
+        out_path = os.path.join(output_folder, stem + ".geojson")
+        return {out_path: kml_to_geojson(path, out_path)}
+    return kml_to_shapefiles(path, output_folder, stem)
+
+
+def convert_folder(input_folder, output_folder, output_format="shapefile", workers=None):
+    """Convert every .kml and .kmz file in a folder, one process per file.
+
+    Returns {input path: {output path: feature count}}, or the error message for files that failed.
+    a.kml and a.kmz in the same folder would write the same outputs from two processes at once, so
+    such files keep their extension in the output names (a_kml_point.shp, a_kmz_point.shp).
+    """
+    paths = sorted(glob.glob(os.path.join(input_folder, "*.kml")) + glob.glob(os.path.join(input_folder, "*.kmz")))
+    os.makedirs(output_folder, exist_ok=True)
+    names = [os.path.splitext(os.path.basename(path)) for path in paths]
+    shared = [name.lower() for name, _ in names]
+    stems = [f"{name}_{extension[1:]}" if shared.count(name.lower()) > 1 else name for name, extension in names]
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {path: executor.submit(convert_kml, path, output_folder, output_format, stem)
+                   for path, stem in zip(paths, stems)}
+        for path, future in futures.items():
+            try:
+                results[path] = future.result()
+            except (OSError, ValueError, ElementTree.ParseError) as e:
+                results[path] = str(e)
+    return results
@@ -0,0 +1,131 @@
+import glob
+import os
+import sqlite3
+
+import numpy as np
+
+MONTHS = ["JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"]
+HEADER = ["LATITUDE", "LONGITUDE", "YEAR"] + MONTHS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stations (
+    station TEXT PRIMARY KEY,
+    latitude REAL,
+    longitude REAL,
+    source TEXT
+);
+CREATE TABLE IF NOT EXISTS precipitation (
+    station TEXT NOT NULL,
+    series INTEGER NOT NULL,
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (station, series, year, month)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS annual_totals (
+    station TEXT NOT NULL,
+    series INTEGER NOT NULL,
+    year INTEGER NOT NULL,
+    total REAL,
+    months INTEGER,
+    PRIMARY KEY (station, series, year)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS monthly_normals (
+    station TEXT NOT NULL,
+    series INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    mean REAL,
+    minimum REAL,
+    maximum REAL,
+    years INTEGER,
+    PRIMARY KEY (station, series, month)
+) WITHOUT ROWID;
+"""
+
+
+def read_station_csv(csv_path):
+    """Read one wide station CSV (Latitude, longitude, YEAR, JAN .. DEC) into NumPy arrays.
+
+    Returns (latitude, longitude, years, values) where values is a (years, 12) float array and
+    empty cells are NaN. The whole file is parsed in one call.
+    """
+    with open(csv_path, 'r') as file:
+        header = [name.strip().upper() for name in file.readline().split(",")]
+    if header != HEADER:
+        raise ValueError(f"{csv_path} does not have the columns {', '.join(HEADER)}.")
+    table = np.genfromtxt(csv_path, delimiter=",", skip_header=1, ndmin=2)
+    return table[0, 0], table[0, 1], table[:, 2].astype(np.int64), table[:, 3:]
+
+
+def series_numbers(years):
+    """Number the runs of years in a station file, starting at 1.
+
+    A file can hold several tables for the same location one after another (the NOAA export
+    has one run of 2000-2022 followed by another); a new run starts wherever the year does
+    not increase.
+    """
+    return np.concatenate(([1], 1 + np.cumsum(np.diff(years) <= 0)))
+
+
+def to_long(years, values):
+    """Reshape wide (years, 12) monthly values to long (series, year, month, value) columns, dropping blanks"""
+    series = np.repeat(series_numbers(years), len(MONTHS))
+    year = np.repeat(years, len(MONTHS))
+    month = np.tile(np.arange(1, len(MONTHS) + 1), len(years))
+    value = values.ravel()
+    keep = ~np.isnan(value)
+    return series[keep], year[keep], month[keep], value[keep]
+
+
+def ingest_directory(input_folder, database, pattern="*.csv"):
+    """Load every station CSV in a folder into the database; see ingest_files"""
+    return ingest_files(sorted(glob.glob(os.path.join(input_folder, pattern))), database)
+
+
+def ingest_files(paths, database):
+    """Load station CSVs into one SQLite table of (station, series, year, month, value).
+
+    Each file is one station, named after the file. Re-ingesting a station replaces its rows.
+    Files that are not station tables are skipped and reported instead of failing the load.
+    After loading, the annual_totals and monthly_normals tables are rebuilt for the loaded
+    stations, so lookups read one indexed row instead of rescanning the monthly values.
+    Returns (number of monthly values written, list of skipped paths).
+    """
+    written = 0
+    skipped = []
+    connection = sqlite3.connect(database)
+    try:
+        connection.executescript(SCHEMA)
+        # One transaction for all the files: an error while writing leaves the database as it was
+        with connection:
+            stations = []
+            for path in paths:
+                station = os.path.splitext(os.path.basename(path))[0]
+                try:
+                    latitude, longitude, years, values = read_station_csv(path)
+                except ValueError as e:
+                    print(f"Skipped {path}: {e}")
+                    skipped.append(path)
+                    continue
+                series, year, month, value = to_long(years, values)
+                connection.execute("DELETE FROM precipitation WHERE station = ?", (station,))
+                connection.execute("INSERT OR REPLACE INTO stations VALUES (?, ?, ?, ?)",
+                                   (station, float(latitude), float(longitude), os.path.abspath(path)))
+                connection.executemany("INSERT INTO precipitation VALUES (?, ?, ?, ?, ?)",
+                                       zip([station] * len(value), series.tolist(), year.tolist(),
+                                           month.tolist(), value.tolist()))
+                stations.append((station,))
+                written += len(value)
+                print(f"{station}: {len(years)} years, {len(value)} monthly values")
+
+            for table in ("annual_totals", "monthly_normals"):
+                connection.executemany(f"DELETE FROM {table} WHERE station = ?", stations)
+            connection.executemany(
+                "INSERT INTO annual_totals SELECT station, series, year, SUM(value), COUNT(*) "
+                "FROM precipitation WHERE station = ? GROUP BY series, year", stations)
+            connection.executemany(
+                "INSERT INTO monthly_normals SELECT station, series, month, AVG(value), MIN(value), MAX(value), "
+                "COUNT(*) FROM precipitation WHERE station = ? GROUP BY series, month", stations)
+    finally:
+        connection.close()
+    return written, skipped
@@ -0,0 +1,175 @@
+import datetime
+import os
+import struct
+
+import numpy as np
+
+# Shared shapefile I/O module. The copy in "Final Toolbox Challenge/Code" is the reference; the copies in
+# the other challenge folders (which each run on their own) are kept identical to it.
+
+# Shape type codes from the ESRI shapefile specification
+POINT = 1
+POLYLINE = 3
+POLYGON = 5
+
+
+class ShapefileWriter(object):
+    """Writes a point, polyline or polygon shapefile (.shp, .shx, .dbf, .cpg and optional .prj) without arcpy.
+
+    fields is a list of (name, type, size, decimals) with type "C" (text), "N" (integer) or "F" (float).
+    Records are written as they are added, so only the current shape is held in memory.
+    """
+
+    def __init__(self, path, shape_type, fields, prj_wkt=None):
+        base = os.path.splitext(path)[0]
+        self.shape_type = shape_type
+        self.fields = fields
+        self.shp = open(base + ".shp", 'wb')
+        self.shx = open(base + ".shx", 'wb')
+        self.dbf = open(base + ".dbf", 'wb')
+        # Headers are written as placeholders and filled in by close()
+        self.shp.write(b"\0" * 100)
+        self.shx.write(b"\0" * 100)
+        self.record_length = 1 + sum(field[2] for field in fields)
+        self.dbf.write(b"\0" * (32 + 32 * len(fields) + 1))
+        self.count = 0
+        self.bbox = [float("inf"), float("inf"), float("-inf"), float("-inf")]
+        if prj_wkt:
+            with open(base + ".prj", 'w') as file:
+                file.write(prj_wkt)
+        # Text fields are UTF-8; without a .cpg readers fall back to the system code page
+        with open(base + ".cpg", 'w') as file:
+            file.write("UTF-8")
+
+    def write(self, parts, record):
+        """Write one shape (a list of parts, each a list of (x, y); a point is [[(x, y)]]) and its attributes"""
+        if self.shape_type == POINT:
+            x, y = parts[0][0]
+            content = struct.pack("<idd", POINT, x, y)
+            box = (x, y, x, y)
+        else:
+            points = [point for part in parts for point in part]
+            xs = [point[0] for point in points]
+            ys = [point[1] for point in points]
+            box = (min(xs), min(ys), max(xs), max(ys))
+            offsets = []
+            total = 0
+            for part in parts:
+                offsets.append(total)
+                total += len(part)
+            content = struct.pack("<i4d2i", self.shape_type, *box, len(parts), len(points))
+            content += struct.pack(f"<{len(parts)}i", *offsets)
+            content += struct.pack(f"<{2 * len(points)}d", *[value for point in points for value in point])
+        self.bbox = [min(self.bbox[0], box[0]), min(self.bbox[1], box[1]),
+                     max(self.bbox[2], box[2]), max(self.bbox[3], box[3])]
+
+        # Offsets and lengths in the .shp/.shx are counted in 16-bit words
+        offset = self.shp.tell() // 2
+        self.count += 1
+        self.shp.write(struct.pack(">2i", self.count, len(content) // 2) + content)
+        self.shx.write(struct.pack(">2i", offset, len(content) // 2))
+        self.dbf.write(self._dbf_record(record))
+
+    def _dbf_record(self, record):
+        values = [b" "]
+        for (name, field_type, size, decimals), value in zip(self.fields, record):
+            if value is None:
+                text = ""
+            elif field_type == "C":
+                text = str(value)
+            elif field_type == "F" or decimals:
+                text = f"{value:.{decimals}f}"
+            else:
+                text = str(int(value))
+            # Cut to the field size without splitting a multi-byte character
+            encoded = text.encode("utf-8")[:size].decode("utf-8", "ignore").encode("utf-8")
+            # Text is left aligned, numbers right aligned
+            values.append(encoded.ljust(size) if field_type == "C" else encoded.rjust(size))
+        return b"".join(values)
+
+    def _shape_header(self, file_length):
+        if self.count == 0:
+            self.bbox = [0.0, 0.0, 0.0, 0.0]
+        header = struct.pack(">7i", 9994, 0, 0, 0, 0, 0, file_length // 2)
+        header += struct.pack("<2i", 1000, self.shape_type)
+        header += struct.pack("<8d", *self.bbox, 0.0, 0.0, 0.0, 0.0)
+        return header
+
+    def close(self):
+        for file in [self.shp, self.shx]:
+            length = file.tell()
+            file.seek(0)
+            file.write(self._shape_header(length))
+            file.close()
+
+        self.dbf.write(b"\x1a")
+        self.dbf.seek(0)
+        today = datetime.date.today()
+        header_length = 32 + 32 * len(self.fields) + 1
+        self.dbf.write(struct.pack("<4BIHH20x", 3, today.year - 1900, today.month, today.day,
+                                   self.count, header_length, self.record_length))
+        for name, field_type, size, decimals in self.fields:
+            self.dbf.write(struct.pack("<11sc4xBB14x", name.encode("ascii")[:10], field_type.encode("ascii"),
+                                       size, decimals))
+        self.dbf.write(b"\r")
+        self.dbf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _record_offsets(path):
+    # Byte offsets and content lengths of every record, from the .shx index (big-endian 16-bit words)
+    index = np.fromfile(os.path.splitext(path)[0] + ".shx", dtype=">i4", offset=100).reshape(-1, 2)
+    return index[:, 0].astype(np.int64) * 2, index[:, 1].astype(np.int64) * 2
+
+
+def read_shape_type(path):
+    """Shape type code from the .shp header (POINT, POLYLINE, POLYGON, or their Z/M variants)"""
+    with open(os.path.splitext(path)[0] + ".shp", 'rb') as file:
+        file.seek(32)
+        return struct.unpack("<i", file.read(4))[0]
+
+
+def read_points(path):
+    """(n, 2) array of the x, y of every point in a point shapefile; null shapes are NaN.
+
+    The .shx gives the position of every record, so all points are gathered in one vectorised read.
+    """
+    offsets, lengths = _record_offsets(path)
+    data = np.memmap(os.path.splitext(path)[0] + ".shp", dtype=np.uint8, mode='r')
+    # Record header (8 bytes), shape type (4 bytes), then x and y as little-endian doubles;
+    # null shapes are only the 4-byte shape type
+    has_point = lengths >= 20
+    xy = np.full((len(offsets), 2), np.nan)
+    start = offsets[has_point, np.newaxis] + 12 + np.arange(16)
+    xy[has_point] = np.ascontiguousarray(data[start]).view("<f8").reshape(-1, 2)
+    return xy
+
+
+def read_polygons(path):
+    """Bounding boxes and rings of every polygon (or polyline) in a shapefile.
+
+    Returns (boxes, parts): boxes is an (n, 4) array of (x_min, y_min, x_max, y_max) and parts[i]
+    is the list of (k, 2) coordinate arrays of feature i (empty for null shapes).
+    """
+    offsets, lengths = _record_offsets(path)
+    boxes = np.full((len(offsets), 4), np.nan)
+    parts = []
+    with open(os.path.splitext(path)[0] + ".shp", 'rb') as file:
+        for feature, (offset, length) in enumerate(zip(offsets, lengths)):
+            file.seek(offset + 8)
+            content = file.read(length)
+            if struct.unpack("<i", content[:4])[0] == 0:
+                parts.append([])
+                continue
+            boxes[feature] = struct.unpack("<4d", content[4:36])
+            part_count, point_count = struct.unpack("<2i", content[36:44])
+            starts = list(struct.unpack(f"<{part_count}i", content[44:44 + 4 * part_count])) + [point_count]
+            points = np.frombuffer(content, dtype="<f8", count=2 * point_count,
+                                   offset=44 + 4 * part_count).reshape(-1, 2)
+            parts.append([points[starts[i]:starts[i + 1]] for i in range(part_count)])
+    return boxes, parts
@@ -25,10 +25,11 @@ if arcpy.Exists(saved_Layer):
 
 # 2. Extract the Extent, i.e. XMin, XMax, YMin, YMax of the generated shapefile
 desc = arcpy.Describe(saved_Layer)
-XMin = (-83.5869)
-XMax = (-83.5869)
-YMin = (+35.9181)
-YMax = (60.3661 + 1)
+XMin = desc.extent.XMin
+XMax = desc.extent.XMax
+YMin = desc.extent.YMin
+YMax = desc.extent.YMax
+print(f"Extent: XMin {XMin}, YMin {YMin}, XMax {XMax}, YMax {YMax}")
 
 # Set coordinate system of the output fishnet
 arcpy.env.outputCoordinateSystem = arcpy.SpatialReference(4326)
@@ -37,12 +38,12 @@ outFeatureClass = "Step_3_Fishnet.shp"  # Name of output fishnet
 
 # Set the origin of the fishnet
 originCoordinate = str(XMin) + " " + str(YMin)  # Left bottom of our point data
-yAxisCoordinate = str(XMax) + " " + str(YMax)   # This sets the orientation on the y-axis, so we head north
+yAxisCoordinate = str(XMin) + " " + str(YMax)   # This sets the orientation on the y-axis, so we head north
 cellSizeWidth = "0.25"
 cellSizeHeight = "0.25"
 numRows = ""
 numColumns = ""
-oppositeCorner = str(-48.371) + " " + str(61.231)  # i.e. max x and max y coordinate
+oppositeCorner = str(XMax) + " " + str(YMax)  # i.e. max x and max y coordinate
 labels = "NO_LABELS"
 templateExtent = "#"
 geometryType = "POLYGON"  # Create a polygon, could be POLYLINE
@@ -0,0 +1,66 @@
+import os
+import time
+
+import numpy as np
+
+from heatmap_binning import (count_points, heatmap_pyramid, point_extent, save_count_raster, write_count_table,
+                             write_heatmap_polygons)
+from kernel_density import kernel_density
+from raster_io import create_geotiff
+
+# The same heatmap as Heatmap_Generation.py without arcpy: the points are binned straight from
+# the CSV into 0.25 degree cells instead of building a fishnet and spatially joining the points.
+workspace = r"C:\GitHub\NRS_528\Code Challenge 05\Final_05"
+
+in_Table = os.path.join(workspace, "Step_3_Cepphus_grylle.csv")
+x_coords = "lon"
+y_coords = "lat"
+
+cell_size = 0.25
+# Coarser levels of the heatmap pyramid, summed from the 0.25 degree counts
+pyramid_cell_sizes = [0.5, 1.0, 2.0]
+
+# Kernel density mode: the points are binned once on a fine grid that feeds both the density
+# surface and the counts (0.25 degrees is a whole number of fine cells)
+kernel_density_mode = True
+density_cell_size = 0.05
+kernel = "quartic"  # or "gaussian"
+bandwidth = 0.5  # search radius (quartic) or standard deviation (gaussian) in degrees
+out_density = os.path.join(workspace, "Step_3_HeatMap_density.tif")
+
+# Outputs: polygons for the non-empty cells, a count raster and a sparse cell -> count table
+out_feature_class = os.path.join(workspace, "Step_3_HeatMap.shp")
+out_raster = os.path.join(workspace, "Step_3_HeatMap.tif")
+out_table = os.path.join(workspace, "Step_3_HeatMap_counts.csv")
+
+start = time.perf_counter()
+# The fishnet covers the points, so the extent comes from the data instead of constants
+extent = point_extent(in_Table, x_coords, y_coords)
+print("Extent (XMin, YMin, XMax, YMax): " + str(extent))
+if kernel_density_mode:
+    fine_counts, fine_transform = count_points(in_Table, extent, density_cell_size, x_coords, y_coords)
+    counts, transform = heatmap_pyramid(fine_counts, fine_transform, [cell_size])[cell_size]
+else:
+    counts, transform = count_points(in_Table, extent, cell_size, x_coords, y_coords)
+print(f"Binned {counts.sum()} points into {counts.shape[0]} x {counts.shape[1]} cells "
+      f"in {time.perf_counter() - start:.2f} s.")
+
+save_count_raster(counts, transform, out_raster)
+write_count_table(counts, transform, out_table)
+write_heatmap_polygons(counts, transform, out_feature_class)
+print(f"Created {out_feature_class}, {out_raster} and {out_table} successfully!")
+
+# Zoomable levels: each is the 0.25 degree grid with blocks of cells summed, no second pass over the points
+for level_size, (level_counts, level_transform) in heatmap_pyramid(counts, transform, pyramid_cell_sizes).items():
+    level_raster = os.path.join(workspace, f"Step_3_HeatMap_{level_size:g}deg.tif")
+    save_count_raster(level_counts, level_transform, level_raster)
+    print(f"Created {level_raster} ({level_counts.shape[0]} x {level_counts.shape[1]} cells).")
+
+if kernel_density_mode:
+    start = time.perf_counter()
+    density = kernel_density(fine_counts, fine_transform, bandwidth, kernel)
+    raster = create_geotiff(out_density, density.shape, np.float32, fine_transform)
+    raster[:] = density
+    raster.flush()
+    del raster
+    print(f"Created {out_density} ({kernel} kernel, bandwidth {bandwidth}) in {time.perf_counter() - start:.2f} s.")
@@ -0,0 +1,42 @@
+import sys
+import time
+
+import numpy as np
+
+from heatmap_binning import bin_points, fishnet_grid
+from kernel_density import kernel_density, naive_kernel_density
+
+# Compares the FFT kernel density (bin, then convolve) with summing the kernel of every point
+# over every cell. Usage: python benchmark_kernel_density.py [cell size] [bandwidth]
+cell_size = float(sys.argv[1]) if len(sys.argv) > 1 else 0.05
+bandwidth = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+extent = (-83.5869, 35.9181, -48.371, 61.231)
+transform, shape = fishnet_grid(extent, cell_size)
+rng = np.random.default_rng(0)
+
+print(f"Grid {shape[0]} x {shape[1]} cells of {cell_size} degrees, bandwidth {bandwidth} degrees")
+for kernel in ("quartic", "gaussian"):
+    for points in (1000, 10000, 1000000):
+        # Clustered points, like sightings along a coast
+        centres = rng.uniform((extent[0], extent[1]), (extent[2], extent[3]), size=(20, 2))
+        xy = centres[rng.integers(0, 20, points)] + rng.normal(0.0, 1.0, size=(points, 2))
+        xy = np.clip(xy, (extent[0], extent[1]), (extent[2], extent[3]))
+        x, y = xy[:, 0], xy[:, 1]
+
+        start = time.perf_counter()
+        density = kernel_density(bin_points(x, y, transform, shape), transform, bandwidth, kernel)
+        fft_time = time.perf_counter() - start
+
+        # The naive sum is timed on at most 1000 points and scaled, it is linear in the points
+        sample = min(points, 1000)
+        start = time.perf_counter()
+        reference = naive_kernel_density(x[:sample], y[:sample], transform, shape, bandwidth, kernel)
+        naive_time = (time.perf_counter() - start) * points / sample
+
+        line = f"{kernel:>8} {points:>8} points: FFT {fft_time:7.3f} s, naive {naive_time:9.1f} s"
+        if sample == points:
+            error = np.abs(density - reference).max() / reference.max()
+            line += f", largest difference {error:.2%} of the peak"
+        else:
+            line += " (estimated)"
+        print(line)
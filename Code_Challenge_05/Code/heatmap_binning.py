@@ -0,0 +1,189 @@
+import csv
+
+import numpy as np
+
+from raster_io import create_geotiff
+from shapefile_io import POLYGON, ShapefileWriter
+
+# ESRI WKT of WGS 1984 (EPSG 4326), written to the .prj of vector outputs
+WGS84_WKT = ('GEOGCS["GCS_WGS_1984",DATUM["D_WGS_1984",SPHEROID["WGS_1984",6378137.0,298.257223563]],'
+             'PRIMEM["Greenwich",0.0],UNIT["Degree",0.0174532925199433]]')
+
+
+def _parse_coordinates(lines, x_column, y_column, delimiter):
+    # The C parser in numpy.loadtxt handles clean chunks; rows with missing or text coordinates
+    # send the chunk through the csv module, which skips them
+    try:
+        values = np.loadtxt(lines, dtype=np.float64, delimiter=delimiter, usecols=(x_column, y_column),
+                            quotechar='"', ndmin=2)
+    except ValueError:
+        rows = []
+        for row in csv.reader(lines, delimiter=delimiter):
+            try:
+                rows.append((float(row[x_column]), float(row[y_column])))
+            except (ValueError, IndexError):
+                continue
+        values = np.array(rows, dtype=np.float64).reshape(-1, 2)
+    return values[:, 0], values[:, 1]
+
+
+def iter_point_chunks(csv_path, x_field="lon", y_field="lat", delimiter=",", chunk_bytes=64 << 20):
+    """Yield (x, y) coordinate arrays from a point CSV, about chunk_bytes of text at a time"""
+    with open(csv_path, 'r', newline='') as file:
+        header = next(csv.reader([file.readline()], delimiter=delimiter))
+        header = [name.strip() for name in header]
+        x_column, y_column = header.index(x_field), header.index(y_field)
+        remainder = ""
+        while True:
+            text = file.read(chunk_bytes)
+            if not text:
+                break
+            # Only hand complete lines to the parser; the partial last line waits for the next chunk
+            text = remainder + text
+            cut = text.rfind("\n") + 1
+            remainder = text[cut:]
+            if cut:
+                yield _parse_coordinates(text[:cut].splitlines(), x_column, y_column, delimiter)
+        if remainder.strip():
+            yield _parse_coordinates([remainder], x_column, y_column, delimiter)
+
+
+def point_extent(csv_path, x_field="lon", y_field="lat", delimiter=","):
+    """(x_min, y_min, x_max, y_max) of the points of a CSV, found in one streaming pass"""
+    x_min = y_min = np.inf
+    x_max = y_max = -np.inf
+    for x, y in iter_point_chunks(csv_path, x_field, y_field, delimiter):
+        valid = np.isfinite(x) & np.isfinite(y)
+        if valid.any():
+            x, y = x[valid], y[valid]
+            x_min, x_max = min(x_min, x.min()), max(x_max, x.max())
+            y_min, y_max = min(y_min, y.min()), max(y_max, y.max())
+    if x_min > x_max:
+        raise ValueError(f"{csv_path} has no valid {x_field}/{y_field} coordinates.")
+    return float(x_min), float(y_min), float(x_max), float(y_max)
+
+
+def fishnet_grid(extent, cell_size):
+    """(transform, shape) of a north-up grid of square cells whose lower-left corner is the extent's.
+
+    extent is (x_min, y_min, x_max, y_max); like CreateFishnet, the grid is extended to whole cells.
+    transform is (x_min, y_max, cell_width, cell_height) of the top-left corner.
+    """
+    x_min, y_min, x_max, y_max = extent
+    cols = max(int(np.ceil(round((x_max - x_min) / cell_size, 9))), 1)
+    rows = max(int(np.ceil(round((y_max - y_min) / cell_size, 9))), 1)
+    return (x_min, y_min + rows * cell_size, cell_size, cell_size), (rows, cols)
+
+
+def bin_points(x, y, transform, shape, counts=None):
+    """Add the number of points falling in each grid cell to counts (a (rows, cols) int64 array).
+
+    Cells are found by integer division of the coordinates, so the cost is linear in the number of
+    points and does not depend on the number of cells. Points on the right or bottom edge of the
+    grid count in the last cell; points outside the grid or with NaN coordinates are ignored.
+    """
+    rows, cols = shape
+    x_min, y_max, cell_width, cell_height = transform
+    if counts is None:
+        counts = np.zeros(shape, dtype=np.int64)
+    col = (np.asarray(x, dtype=np.float64) - x_min) / cell_width
+    row = (y_max - np.asarray(y, dtype=np.float64)) / cell_height
+    inside = (col >= 0) & (col <= cols) & (row >= 0) & (row <= rows)
+    col = np.minimum(col[inside].astype(np.int64), cols - 1)
+    row = np.minimum(row[inside].astype(np.int64), rows - 1)
+    counts += np.bincount(row * cols + col, minlength=rows * cols).reshape(shape)
+    return counts
+
+
+def count_points(csv_path, extent, cell_size, x_field="lon", y_field="lat", delimiter=","):
+    """Bin every point of a CSV onto a fishnet grid in one streaming pass.
+
+    Returns (counts, transform): a (rows, cols) int64 array of points per cell, north-up.
+    """
+    transform, shape = fishnet_grid(extent, cell_size)
+    counts = np.zeros(shape, dtype=np.int64)
+    for x, y in iter_point_chunks(csv_path, x_field, y_field, delimiter):
+        bin_points(x, y, transform, shape, counts)
+    return counts, transform
+
+
+def coarsen(counts, transform, factor):
+    """Sum factor x factor blocks of a count grid into a grid with cells factor times larger.
+
+    The lower-left corner stays fixed, as in fishnet_grid; rows are added at the top and columns
+    on the right when the grid is not a whole number of blocks.
+    """
+    rows, cols = counts.shape
+    coarse_rows, coarse_cols = -(-rows // factor), -(-cols // factor)
+    padded = np.zeros((coarse_rows * factor, coarse_cols * factor), dtype=counts.dtype)
+    padded[padded.shape[0] - rows:, :cols] = counts
+    coarse = padded.reshape(coarse_rows, factor, coarse_cols, factor).sum(axis=(1, 3))
+    x_min, y_max, cell_width, cell_height = transform
+    coarse_transform = (x_min, y_max + (padded.shape[0] - rows) * cell_height,
+                        cell_width * factor, cell_height * factor)
+    return coarse, coarse_transform
+
+
+def heatmap_pyramid(counts, transform, cell_sizes):
+    """Count grids at several cell sizes, each derived from the finest grid by summing blocks.
+
+    cell_sizes must be whole multiples of the finest cell size. Returns {cell size: (counts, transform)}.
+    """
+    base = transform[2]
+    levels = {}
+    for cell_size in sorted(cell_sizes):
+        factor = int(round(cell_size / base))
+        if factor < 1 or abs(factor * base - cell_size) > 1e-9 * cell_size:
+            raise ValueError(f"Cell size {cell_size} is not a multiple of {base}.")
+        levels[cell_size] = (counts, transform) if factor == 1 else coarsen(counts, transform, factor)
+    return levels
+
+
+def count_table(counts):
+    """Sparse form of a count grid: (flat cell ids, counts) of the non-empty cells"""
+    cells = np.flatnonzero(counts)
+    return cells, counts.ravel()[cells]
+
+
+def cell_bounds(cells, transform, cols):
+    """(x_min, y_min, x_max, y_max) arrays of the given flat cell ids"""
+    x_min, y_max, cell_width, cell_height = transform
+    row, col = np.divmod(cells, cols)
+    left = x_min + col * cell_width
+    top = y_max - row * cell_height
+    return left, top - cell_height, left + cell_width, top
+
+
+def save_count_raster(counts, transform, path):
+    """Write the count grid as an int32 GeoTIFF (WGS 1984)"""
+    raster = create_geotiff(path, counts.shape, np.int32, transform)
+    raster[:] = counts
+    raster.flush()
+    del raster
+    return path
+
+
+def write_count_table(counts, transform, path):
+    """Write cell_id, row, col, lon, lat (cell centre) and count of every non-empty cell to a CSV"""
+    cells, values = count_table(counts)
+    rows, cols = np.divmod(cells, counts.shape[1])
+    left, bottom, right, top = cell_bounds(cells, transform, counts.shape[1])
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(["cell_id", "row", "col", "lon", "lat", "count"])
+        writer.writerows(zip(cells.tolist(), rows.tolist(), cols.tolist(), ((left + right) / 2).tolist(),
+                             ((bottom + top) / 2).tolist(), values.tolist()))
+    return path
+
+
+def write_heatmap_polygons(counts, transform, path):
+    """Write one square polygon per non-empty cell with its count in Join_Count (as SpatialJoin names it)"""
+    cells, values = count_table(counts)
+    left, bottom, right, top = cell_bounds(cells, transform, counts.shape[1])
+    fields = [("Id", "N", 10, 0), ("Join_Count", "N", 10, 0)]
+    with ShapefileWriter(path, POLYGON, fields, WGS84_WKT) as writer:
+        for cell, count, x0, y0, x1, y1 in zip(cells.tolist(), values.tolist(), left.tolist(), bottom.tolist(),
+                                               right.tolist(), top.tolist()):
+            # Exterior rings are clockwise in shapefiles
+            writer.write([[(x0, y1), (x1, y1), (x1, y0), (x0, y0), (x0, y1)]], [cell, count])
+    return path
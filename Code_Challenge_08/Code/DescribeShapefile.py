@@ -1,4 +1,7 @@
-import arcpy
+import os
+import sys
+
+from dataset_catalog import DatasetCatalog, read_prj, read_shp_header
 
 def describe_shp(input_shapefile):
 
@@ -9,18 +12,13 @@ def describe_shp(input_shapefile):
     extent = None
 
     # Check if the input shapefile exists
-    if arcpy.Exists(input_shapefile):
-        # Get the description of the shapefile
-        desc = arcpy.Describe(input_shapefile)
+    if os.path.exists(input_shapefile):
         print("Describing: " + str(input_shapefile))
         # Check if the data type is a ShapeFile
-        if desc.dataType == "ShapeFile":
-            # Get shape type, spatial reference name, and spatial reference type
-            shapetype = desc.shapeType
-            sprefname = desc.spatialReference.name
-            spreftype = desc.spatialReference.type
-            # Get the extent of the shapefile
-            extent = desc.extent
+        if input_shapefile.lower().endswith(".shp"):
+            # Shape type and extent come from the 100-byte .shp header, the spatial reference from the .prj
+            shapetype, extent, count = read_shp_header(input_shapefile)
+            sprefname, spreftype = read_prj(input_shapefile)
         else:
             print("Input data not ShapeFile..")
     else:
@@ -37,10 +35,25 @@ def print_shapefile_info(shapetype, sprefname, spreftype, extent):
     print("Spatial Reference Type:", spreftype)
     print("Extent:", extent)
 
+def catalog_folder(folder, index_path):
+
+    # Describe every shapefile and raster under the folder; unchanged datasets come from the index
+    catalog = DatasetCatalog(index_path)
+    found, described = catalog.scan(folder)
+    catalog.save()
+    for path, description in catalog.descriptions(folder).items():
+        print(path)
+        for key, value in description.items():
+            print("   {}: {}".format(key, value))
+    print("{} datasets, {} described, {} from the index.".format(found, described, found - described))
+
 if __name__ == "__main__":
-    # Example usage
+    # Example usage; with a folder as argument, every dataset under it is catalogued instead
     input_shapefile = r"C:\Users\Student\Desktop\Risk Maps\Risk Maps\Risk_022624_Kenya.shp"
-    # Describe the shapefile and get its properties
-    shapetype, sprefname, spreftype, extent = describe_shp(input_shapefile)
-    # Print the properties of the shapefile
-    print_shapefile_info(shapetype, sprefname, spreftype, extent)
+    if len(sys.argv) > 1 and os.path.isdir(sys.argv[1]):
+        catalog_folder(sys.argv[1], os.path.join(sys.argv[1], "dataset_catalog.json"))
+    else:
+        # Describe the shapefile and get its properties
+        shapetype, sprefname, spreftype, extent = describe_shp(sys.argv[1] if len(sys.argv) > 1 else input_shapefile)
+        # Print the properties of the shapefile
+        print_shapefile_info(shapetype, sprefname, spreftype, extent)
@@ -1,8 +1,13 @@
-import arcpy
 import os
+import sys
+import time
+
+from kml_reader import convert_folder, convert_kml
 
 def convert_kml_to_layer(kml_file, output_folder, layer_name="output_layer"):
 
+    # arcpy is only loaded when the geoprocessing tool is used
+    import arcpy
     try:
         # Set workspace to output folder
         arcpy.env.workspace = output_folder
@@ -21,8 +26,28 @@ def convert_kml_to_layer(kml_file, output_folder, layer_name="output_layer"):
         # Print other error during conversion
         print("Error during conversion:", e)
 
+def convert_kml_streaming(kml_path, output_folder, output_format="shapefile"):
+
+    # Read the Placemarks with the streaming parser and write them straight to shapefiles or GeoJSON.
+    # A folder converts every KML/KMZ in it, one process per file.
+    start = time.perf_counter()
+    if os.path.isdir(kml_path):
+        results = convert_folder(kml_path, output_folder, output_format)
+    else:
+        os.makedirs(output_folder, exist_ok=True)
+        results = {kml_path: convert_kml(kml_path, output_folder, output_format)}
+    for path, outputs in results.items():
+        if isinstance(outputs, str):
+            print(f"{path}: {outputs}")
+            continue
+        for output, count in outputs.items():
+            print(f"{path} -> {output} ({count} features)")
+    print(f"Converted in {(time.perf_counter() - start) * 1000:.1f} ms.")
+    return results
+
 def print_layer_info(layer_file):
 
+    import arcpy
     # Get layer description
     desc = arcpy.Describe(layer_file)
     # Print layer information
@@ -39,7 +64,17 @@ if __name__ == "__main__":
     # Output layer name
     layer_name = "watershed_layer"
 
-    # Convert KML to layer
-    layer_file_path = convert_kml_to_layer(kml_file_path, output_folder_path, layer_name)
+    # Use KML To Layer, or the streaming reader that needs no arcpy ("shapefile" or "geojson")
+    use_arcpy = False
+    output_format = "shapefile"
+    # A KML/KMZ file or a folder of them can be given on the command line
+    if len(sys.argv) > 1:
+        kml_file_path = sys.argv[1]
+
+    if use_arcpy:
+        # Convert KML to layer
+        layer_file_path = convert_kml_to_layer(kml_file_path, output_folder_path, layer_name)
+    else:
+        convert_kml_streaming(kml_file_path, output_folder_path, output_format)
 
 
@@ -0,0 +1,206 @@
+import json
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+from raster_io import open_band, read_geo_keys
+
+# Shape type codes of the .shp header and the names arcpy.Describe gives them
+SHAPE_TYPES = {0: "Null", 1: "Point", 3: "Polyline", 5: "Polygon", 8: "Multipoint",
+               11: "Point", 13: "Polyline", 15: "Polygon", 18: "Multipoint",
+               21: "Point", 23: "Polyline", 25: "Polygon", 28: "Multipoint", 31: "MultiPatch"}
+RASTER_EXTENSIONS = (".tif", ".tiff", ".bil")
+# Esri names of the EPSG codes most common in this course's data; UTM zones are named in epsg_name
+EPSG_NAMES = {4326: "GCS_WGS_1984", 4269: "GCS_North_American_1983", 4267: "GCS_North_American_1927",
+              3857: "WGS_1984_Web_Mercator_Auxiliary_Sphere"}
+# GeoKey values meaning "not set" and "user-defined"
+UNDEFINED_KEYS = (0, 32767)
+
+
+class Extent(object):
+    """Bounding box with the attribute names of arcpy's Extent"""
+
+    def __init__(self, xmin, ymin, xmax, ymax):
+        self.XMin, self.YMin, self.XMax, self.YMax = xmin, ymin, xmax, ymax
+
+    def __str__(self):
+        return f"{self.XMin} {self.YMin} {self.XMax} {self.YMax}"
+
+    def __repr__(self):
+        return f"Extent({self})"
+
+
+def read_prj(path):
+    """(name, type) of the spatial reference in a dataset's .prj, e.g. ('GCS_WGS_1984', 'Geographic').
+
+    Only the outermost WKT keyword and the name that follows it are read; a missing
+    .prj gives ('Unknown', 'Unknown') as arcpy does.
+    """
+    prj = os.path.splitext(path)[0] + ".prj"
+    if not os.path.exists(prj):
+        return "Unknown", "Unknown"
+    with open(prj, 'r') as file:
+        wkt = file.read().strip()
+    keyword = wkt.split("[", 1)[0].strip().upper()
+    name = wkt.split('"')[1] if wkt.count('"') >= 2 else ""
+    spatial_reference_type = {"PROJCS": "Projected", "PROJCRS": "Projected", "GEOGCS": "Geographic",
+                              "GEOGCRS": "Geographic"}.get(keyword, "Unknown")
+    return name, spatial_reference_type
+
+
+def epsg_name(code):
+    """Esri-style name of an EPSG code, or "EPSG:<code>" when it is not a known one"""
+    if code in EPSG_NAMES:
+        return EPSG_NAMES[code]
+    for first, datum in ((32601, "WGS_1984"), (32701, "WGS_1984"), (26901, "NAD_1983")):
+        if first <= code < first + 60:
+            return f"{datum}_UTM_Zone_{code - first + 1}{'S' if first == 32701 else 'N'}"
+    return f"EPSG:{code}"
+
+
+def read_geotiff_spatial_reference(path):
+    """(name, type) from the GeoKeys of a GeoTIFF, or None when it has no EPSG code in them"""
+    keys = read_geo_keys(path)
+    if keys.get(3072, 0) not in UNDEFINED_KEYS:
+        return epsg_name(keys[3072]), "Projected"
+    if keys.get(2048, 0) not in UNDEFINED_KEYS:
+        return epsg_name(keys[2048]), "Geographic"
+    return None
+
+
+def read_shp_header(path):
+    """(shape type name, Extent, feature count) from the 100-byte .shp header and the .shx size"""
+    shp = os.path.splitext(path)[0] + ".shp"
+    with open(shp, 'rb') as file:
+        header = file.read(100)
+    if len(header) < 100 or struct.unpack(">i", header[:4])[0] != 9994:
+        raise ValueError(f"{shp} is not a shapefile.")
+    shape_type = struct.unpack("<i", header[32:36])[0]
+    xmin, ymin, xmax, ymax = struct.unpack("<4d", header[36:68])
+    shx = os.path.splitext(path)[0] + ".shx"
+    # The .shx has a 100-byte header and 8 bytes per record
+    count = (os.path.getsize(shx) - 100) // 8 if os.path.exists(shx) else None
+    return SHAPE_TYPES.get(shape_type, str(shape_type)), Extent(xmin, ymin, xmax, ymax), count
+
+
+def describe_shapefile(path):
+    """Describe a shapefile from its header and .prj alone, without arcpy"""
+    shape_type, extent, count = read_shp_header(path)
+    name, spatial_reference_type = read_prj(path)
+    return {"dataType": "ShapeFile", "shapeType": shape_type, "spatialReference": name,
+            "spatialReferenceType": spatial_reference_type,
+            "extent": [extent.XMin, extent.YMin, extent.XMax, extent.YMax], "featureCount": count}
+
+
+def describe_raster(path):
+    """Describe an uncompressed GeoTIFF or BIL from its header, without reading any pixels"""
+    reader = open_band(path)
+    rows, cols = reader.shape
+    x_min, y_max, cell_width, cell_height = reader.transform
+    # The GeoKeys of a GeoTIFF come first; the .prj is for BILs and TIFFs written without them
+    spatial_reference = None
+    if path.lower().endswith((".tif", ".tiff")):
+        spatial_reference = read_geotiff_spatial_reference(path)
+    name, spatial_reference_type = spatial_reference or read_prj(path)
+    return {"dataType": "RasterDataset", "rows": rows, "columns": cols, "pixelType": reader.dtype.name,
+            "cellSize": [cell_width, cell_height], "noData": reader.nodata,
+            "spatialReference": name, "spatialReferenceType": spatial_reference_type,
+            "extent": [x_min, y_max - rows * cell_height, x_min + cols * cell_width, y_max]}
+
+
+def describe(path):
+    if path.lower().endswith(".shp"):
+        return describe_shapefile(path)
+    return describe_raster(path)
+
+
+def dataset_signature(path):
+    """Sizes and modification times of the files a description is read from"""
+    signature = []
+    base = os.path.splitext(path)[0]
+    for file in (path, base + ".shx", base + ".prj", base + ".hdr", base + ".tfw", path + ".aux.xml"):
+        if os.path.exists(file):
+            stat = os.stat(file)
+            signature += [stat.st_size, stat.st_mtime_ns]
+    return signature
+
+
+def _scan_directory(directory):
+    # Datasets and subdirectories of one directory
+    datasets, subdirectories = [], []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirectories.append(entry.path)
+                elif entry.name.lower().endswith((".shp",) + RASTER_EXTENSIONS):
+                    datasets.append(entry.path)
+    except OSError:
+        pass
+    return datasets, subdirectories
+
+
+class DatasetCatalog(object):
+    """Descriptions of every shapefile and raster under a folder, cached in a JSON index.
+
+    The index keeps each dataset's signature (sizes and mtimes of its files); a rescan only
+    describes datasets that are new or changed, and drops those that are gone.
+    """
+
+    def __init__(self, index_path):
+        self.index_path = index_path
+        self.entries = {}
+        if os.path.exists(index_path):
+            try:
+                with open(index_path, 'r') as file:
+                    self.entries = json.load(file)
+            except ValueError:
+                # A damaged index only costs one full scan
+                self.entries = {}
+
+    def _describe(self, path):
+        signature = dataset_signature(path)
+        entry = self.entries.get(path)
+        if entry is not None and entry["signature"] == signature:
+            return path, entry, False
+        try:
+            description = describe(path)
+        except (OSError, ValueError, KeyError, struct.error) as e:
+            description = {"error": str(e)}
+        return path, {"signature": signature, "description": description}, True
+
+    def scan(self, root, workers=8):
+        """Walk root one directory level at a time, listing directories and describing datasets
+        in a thread pool. Returns (datasets found, datasets described this time).
+        """
+        root = os.path.abspath(root)
+        found = {}
+        described = 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            directories = [root]
+            while directories:
+                datasets, next_level = [], []
+                for level_datasets, subdirectories in executor.map(_scan_directory, directories):
+                    datasets += level_datasets
+                    next_level += subdirectories
+                for path, entry, changed in executor.map(self._describe, datasets):
+                    found[path] = entry
+                    described += changed
+                directories = next_level
+        # Datasets under root that no longer exist are dropped; other folders' entries are kept
+        prefix = root + os.sep
+        for path in [path for path in self.entries if path.startswith(prefix) and path not in found]:
+            del self.entries[path]
+        self.entries.update(found)
+        return len(found), described
+
+    def save(self):
+        with open(self.index_path + ".tmp", 'w') as file:
+            json.dump(self.entries, file, indent=1, sort_keys=True)
+        os.replace(self.index_path + ".tmp", self.index_path)
+
+    def descriptions(self, root=None):
+        """{path: description} of the cached datasets, optionally only those under root"""
+        prefix = os.path.abspath(root) + os.sep if root else ""
+        return {path: entry["description"] for path, entry in sorted(self.entries.items())
+                if path.startswith(prefix)}
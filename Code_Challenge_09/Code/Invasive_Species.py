@@ -1,38 +1,50 @@
 import arcpy
 
+from partition_features import by_field, by_predicates, partition_features
+
 # Set workspace environment
 arcpy.env.workspace = r"C:\GitHub\NRS_528\Code Challenge 09"
+arcpy.env.overwriteOutput = True
 
 # Input dataset and fields
 input_dataset = "RI_Forest_Health_Works_Project%3A_Points_All_Invasives.shp"
 fields = ["Photo", "Species"]
+output_dir = r"C:\GitHub\NRS_528\Code Challenge 09\Results"
+
+# Set to True to also write one shapefile per species in the same pass
+split_by_species = False
+
+
+def has_photo(row):
+    # Same test as the query "Photo IS NOT NULL AND Photo <> ''"
+    return row[fields[0]] is not None and row[fields[0]] != ""
+
 
-# Queries to filter records
-queries = {
-    "with_photo": f"{fields[0]} IS NOT NULL AND {fields[0]} <> ''",
-    "without_photo": f"{fields[0]} IS NULL OR {fields[0]} = ''"
-}
+# Partitions to fill: with and without photo, optionally one per species
+photo_route = by_predicates({
+    "with_photo": has_photo,
+    "without_photo": lambda row: not has_photo(row)
+})
+species_route = by_field(fields[1], prefix="species_")
 
-# Initialize counter for records and a set for unique species
-counters = {"with_photo": 0, "without_photo": 0}
-unique_species = set()
 
-# Process records based on photo presence and update counters and species set
-for key, query in queries.items():
-    with arcpy.da.SearchCursor(input_dataset, fields, query) as cursor:
-        for row in cursor:
-            counters[key] += 1
-            unique_species.add(row[1])
-    arcpy.Select_analysis(input_dataset, key, query)
+def route(row):
+    names = photo_route(row)
+    if split_by_species:
+        names += species_route(row)
+    return names
+
+
+# One read of the dataset routes every record to its shapefiles and counts as it goes
+partitions = partition_features(input_dataset, output_dir, route, distinct_fields=[fields[1]])
+empty = {"count": 0, "distinct": {fields[1]: set()}}
+with_photo = partitions.get("with_photo", empty)
+without_photo = partitions.get("without_photo", empty)
+unique_species = with_photo["distinct"][fields[1]] | without_photo["distinct"][fields[1]]
 
 # Print results
-print(f"Records with Photos: {counters['with_photo']}")
-print(f"Records Without Photos: {counters['without_photo']}")
+print(f"Records with Photos: {with_photo['count']}")
+print(f"Records Without Photos: {without_photo['count']}")
 print(f"Unique species in the dataset: {len(unique_species)}")
 
-# Export shapefiles for records
-output_dir = r"C:\GitHub\NRS_528\Code Challenge 09\Results"
-arcpy.FeatureClassToShapefile_conversion(["with_photo", "without_photo"], output_dir)
-
 print("Shapefiles generated for records with and without photos.")
-
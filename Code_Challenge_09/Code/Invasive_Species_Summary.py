@@ -0,0 +1,29 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+from dbf_reader import DbfReader
+
+# The photo and species counts of Invasive_Species.py straight from the .dbf, without arcpy.
+# Usage: python Invasive_Species_Summary.py [path to the .shp or .dbf]
+workspace = r"C:\GitHub\NRS_528\Code Challenge 09"
+input_dataset = sys.argv[1] if len(sys.argv) > 1 else \
+    os.path.join(workspace, "RI_Forest_Health_Works_Project%3A_Points_All_Invasives.shp")
+fields = ["Photo", "Species"]
+
+start = time.perf_counter()
+with_photo = 0
+total = 0
+unique_species = set()
+# Only the two columns are decoded, one batch of records at a time
+for batch in DbfReader(input_dataset).iter_batches(fields):
+    with_photo += int(np.count_nonzero(batch[fields[0]] != ""))
+    total += len(batch[fields[0]])
+    unique_species.update(batch[fields[1]].tolist())
+
+print(f"Records with Photos: {with_photo}")
+print(f"Records Without Photos: {total - with_photo}")
+print(f"Unique species in the dataset: {len(unique_species)}")
+print(f"Read {total} records in {(time.perf_counter() - start) * 1000:.1f} ms.")
@@ -0,0 +1,156 @@
+import codecs
+import os
+import re
+import struct
+
+import numpy as np
+
+def _parse_numbers(raw):
+    """Parse a column of fixed-width number text ('   -12.50') into float64 in one call.
+
+    raw is an (n, width) uint8 array. It is viewed as an array of byte strings and converted by
+    NumPy's C parser, without building Python objects. Blank cells become NaN; if any cell cannot
+    be parsed (e.g. an overflow marker '****') the cells are converted one by one and those become NaN.
+    """
+    blank = ((raw == 32) | (raw == 0)).all(axis=1)
+    text = raw.view(f"S{raw.shape[1]}").ravel()
+    values = np.full(len(text), np.nan)
+    try:
+        values[~blank] = text[~blank].astype(np.float64)
+    except ValueError:
+        for index in np.flatnonzero(~blank):
+            try:
+                values[index] = float(text[index])
+            except ValueError:
+                pass
+    return values
+
+
+def cpg_encoding(path):
+    """Python codec for the code page named in a shapefile's .cpg, latin-1 if there is none.
+
+    Esri writes names such as "UTF-8", "ANSI 1252", "1252", "65001" or "8859_1"; names Python
+    does not know also fall back to latin-1, which decodes any byte.
+    """
+    cpg = os.path.splitext(path)[0] + ".cpg"
+    if not os.path.exists(cpg):
+        return "latin-1"
+    with open(cpg, 'r', errors="replace") as file:
+        name = file.read().strip()
+    number = re.fullmatch(r"(?:ANSI|OEM|CP)?\s*(\d+)", name, re.IGNORECASE)
+    iso = re.fullmatch(r"(?:ISO)?[\s_-]*8859[\s_-]*(\d+)", name, re.IGNORECASE)
+    if iso:
+        name = "iso8859-" + iso.group(1)
+    elif number:
+        name = "utf-8" if number.group(1) == "65001" else "cp" + number.group(1)
+    try:
+        return codecs.lookup(name).name
+    except LookupError:
+        return "latin-1"
+
+
+class DbfReader(object):
+    """Columnar reader for dBASE (.dbf) attribute tables that memory-maps the file.
+
+    Only the requested columns are decoded, each into one NumPy array: C fields to str, N fields
+    without decimals to a masked int64 array (blank or unreadable values masked), other N/F fields
+    to float64 with NaN for blanks, D to datetime64[D] and L to bool. The dtype depends only on the
+    field, so every batch and range of a column has the same type. Works without arcpy, so
+    attribute-only jobs can run anywhere NumPy does.
+    """
+
+    def __init__(self, path, encoding=None):
+        if path.lower().endswith(".shp"):
+            path = path[:-4] + ".dbf"
+        self.path = path
+        with open(path, 'rb') as file:
+            header = file.read(32)
+            self.count, header_length, record_length = struct.unpack("<IHH", header[4:12])
+            descriptors = file.read(header_length - 32)
+
+        # Field descriptors are 32 bytes each and end with 0x0D; values start after the deletion flag
+        self.fields = []
+        offset = 1
+        for start in range(0, len(descriptors) - 31, 32):
+            descriptor = descriptors[start:start + 32]
+            if descriptor[0] == 0x0D:
+                break
+            name = descriptor[:11].split(b"\0")[0].decode("ascii", "replace")
+            field_type = chr(descriptor[11])
+            length, decimals = descriptor[16], descriptor[17]
+            self.fields.append((name, field_type, length, decimals, offset))
+            offset += length
+
+        self.encoding = encoding or cpg_encoding(path)
+        self.records = np.memmap(path, dtype=np.uint8, mode='r', offset=header_length,
+                                 shape=(self.count, record_length)) if self.count else \
+            np.zeros((0, record_length), dtype=np.uint8)
+
+    @property
+    def field_names(self):
+        return [field[0] for field in self.fields]
+
+    def __len__(self):
+        return self.count
+
+    def _field(self, name):
+        for field in self.fields:
+            if field[0].lower() == name.lower():
+                return field
+        raise KeyError(f"{self.path} has no field {name}.")
+
+    def _decode(self, raw, field):
+        # raw is the (records, length) byte column of the field
+        name, field_type, length, decimals, offset = field
+        if field_type == "I":
+            # Binary little-endian integers (Visual FoxPro / dBASE 7)
+            return np.ascontiguousarray(raw).view("<i4").ravel().astype(np.int64)
+        if field_type in "NF":
+            values = _parse_numbers(np.ascontiguousarray(raw))
+            if decimals == 0 and field_type == "N":
+                blank = np.isnan(values)
+                return np.ma.MaskedArray(np.round(np.where(blank, 0, values)).astype(np.int64), mask=blank)
+            return values
+        if field_type == "D":
+            # YYYYMMDD, parsed as a number and split into its parts
+            number = _parse_numbers(np.ascontiguousarray(raw))
+            valid = np.isfinite(number)
+            number = np.where(valid, number, 0).astype(np.int64)
+            year, month, day = number // 10000, number // 100 % 100, number % 100
+            valid &= (month >= 1) & (month <= 12) & (day >= 1) & (day <= 31)
+            months = (year - 1970) * 12 + month - 1
+            dates = months.astype("datetime64[M]").astype("datetime64[D]") + (day - 1)
+            dates[~valid] = np.datetime64("NaT")
+            return dates
+        if field_type == "L":
+            return np.isin(raw[:, 0], np.frombuffer(b"TtYy", dtype=np.uint8))
+        # Character (and anything else): trailing spaces are padding
+        text = np.char.rstrip(np.ascontiguousarray(raw).view(f"S{length}").ravel(), b" ")
+        if raw.size == 0 or raw.max() < 128:
+            # Plain ASCII converts without calling the codec for every value
+            return text.astype(f"U{length}")
+        return np.char.decode(text, self.encoding, "replace")
+
+    def read(self, columns=None, start=0, stop=None, skip_deleted=True):
+        """{field name: array} of the given columns (all by default) for records start .. stop - 1"""
+        fields = [self._field(name) for name in (columns or self.field_names)]
+        # A slice of the memory map: only the bytes of the requested columns are copied
+        block = self.records[start:stop]
+        live = block[:, 0] != ord("*") if skip_deleted else None
+        if live is not None and live.all():
+            live = None
+        result = {}
+        for field in fields:
+            raw = block[:, field[4]:field[4] + field[2]]
+            result[field[0]] = self._decode(raw if live is None else raw[live], field)
+        return result
+
+    def iter_batches(self, columns=None, batch_size=65536, skip_deleted=True):
+        """Yield {field name: array} for successive batches of batch_size records"""
+        for start in range(0, self.count, batch_size):
+            yield self.read(columns, start, start + batch_size, skip_deleted)
+
+
+def read_field_names(shapefile):
+    """Field names of a shapefile's attribute table, read from the .dbf header"""
+    return DbfReader(shapefile).field_names
@@ -0,0 +1,74 @@
+import os
+
+import arcpy
+
+
+def by_predicates(predicates):
+    """Route a row to every partition whose predicate(row) is true; predicates maps names to functions"""
+    def route(row):
+        return [name for name, predicate in predicates.items() if predicate(row)]
+    return route
+
+
+def by_field(field, prefix="", format_value=str):
+    """Route a row to one partition per distinct value of a field, e.g. by_field("Species").
+
+    format_value turns the value into the partition name, e.g. lambda date: str(date.year) for years.
+    Rows where the field is empty are not routed.
+    """
+    def route(row):
+        value = row[field]
+        if value is None or value == "":
+            return []
+        return [prefix + format_value(value)]
+    return route
+
+
+def _output_path(output_workspace, name):
+    # Shapefiles in folders, feature classes in geodatabases
+    valid_name = arcpy.ValidateTableName(name, output_workspace)
+    if not output_workspace.lower().endswith((".gdb", ".sde")):
+        valid_name += ".shp"
+    return os.path.join(output_workspace, valid_name)
+
+
+def partition_features(input_dataset, output_workspace, route, distinct_fields=()):
+    """Split a feature class into several outputs in a single read of the input.
+
+    route(row) receives each row as a {field name: value} dict and returns the names of the
+    partitions it belongs to (none, one or several). An output with the input's schema is created
+    the first time a partition name appears, so the partitions do not need to be known in advance.
+    Counts and the distinct values of distinct_fields are accumulated in the same pass.
+
+    Returns {partition name: {"path": output, "count": rows, "distinct": {field: set of values}}}.
+    """
+    desc = arcpy.Describe(input_dataset)
+    fields = [field.name for field in arcpy.ListFields(input_dataset)
+              if field.type not in ("OID", "Geometry") and field.name.lower() not in ("shape_length", "shape_area")]
+    cursor_fields = ["SHAPE@"] + fields
+
+    partitions = {}
+    writers = {}
+    try:
+        with arcpy.da.SearchCursor(input_dataset, cursor_fields) as cursor:
+            for values in cursor:
+                row = dict(zip(fields, values[1:]))
+                for name in route(row):
+                    if name not in writers:
+                        path = _output_path(output_workspace, name)
+                        arcpy.CreateFeatureclass_management(os.path.dirname(path), os.path.basename(path),
+                                                            desc.shapeType, input_dataset,
+                                                            spatial_reference=desc.spatialReference)
+                        writers[name] = arcpy.da.InsertCursor(path, cursor_fields)
+                        partitions[name] = {"path": path, "count": 0,
+                                            "distinct": {field: set() for field in distinct_fields}}
+                    writers[name].insertRow(values)
+                    summary = partitions[name]
+                    summary["count"] += 1
+                    for field in distinct_fields:
+                        summary["distinct"][field].add(row[field])
+    finally:
+        # Deleting the insert cursors releases the locks on the outputs
+        for name in list(writers):
+            del writers[name]
+    return partitions
@@ -1,10 +1,15 @@
 import os
 import arcpy
 
+from band_cleanup import CleanupWorker, Journal
+from landsat import find_band_pairs
+
 # Setup
 arcpy.env.overwriteOutput = True
 data_directory = r'C:\GitHub\NRS_528\Code Challenge 10\Landsat_data_Ifs'
 output_directory = os.path.join(data_directory, 'output')
+# Set to a folder to move the used bands there instead of deleting them
+archive_directory = None
 
 # Ensure output directory exists
 if not os.path.exists(output_directory):
@@ -14,46 +19,75 @@ if not os.path.exists(output_directory):
 list_input = os.listdir(data_directory)
 print("Folders available: " + str(list_input))
 
+# The journal records every scene's progress so an interrupted batch resumes where it stopped
+journal = Journal(os.path.join(output_directory, 'ndvi_journal.jsonl'))
+cleanup = CleanupWorker(journal, archive_directory)
+
 # Iterate over each subfolder
-for data in list_input:
-    folder_path = os.path.join(data_directory, data)
-    arcpy.env.workspace = folder_path
-    list_raster = arcpy.ListRasters("*", "TIF")
-
-    print(f"Gathering all raster files in {arcpy.env.workspace}...")
-    if not list_raster:
-        print("No raster files found in the directory.")
-        continue
-
-    print("Searching for Band 4 and Band 5...")
-    band_4_rasters = [x for x in list_raster if "B4" in x]
-    band_5_rasters = [x for x in list_raster if "B5" in x]
-
-    if not band_4_rasters or not band_5_rasters:
-        print("Required bands are not found in the folder.")
-        continue
-
-    try:
-        # Assume one band 4 and band 5 per folder
-        band_4_raster = band_4_rasters[0]
-        band_5_raster = band_5_rasters[0]
-        band_4 = arcpy.Raster(band_4_raster)
-        band_5 = arcpy.Raster(band_5_raster)
-
-        print("Calculating NDVI...")
-        NDVI = (band_5 - band_4) / (band_5 + band_4)
+try:
+    for data in list_input:
+        folder_path = os.path.join(data_directory, data)
+        if not os.path.isdir(folder_path) or folder_path == output_directory:
+            continue
         output_path = os.path.join(output_directory, f"output_{data}.tif")
-        NDVI.save(output_path)
 
-        if arcpy.Exists(output_path):
+        # Resume: never recompute a finished scene, only finish its cleanup
+        state = journal.state(data)
+        if state == "cleaned":
+            print(f"Skipping {data}, already processed.")
+            continue
+        if state in ("computed", "verified") and os.path.exists(output_path):
+            print(f"Resuming cleanup of {data}.")
+            cleanup.submit(data, output_path, journal.scenes[data]["inputs"])
+            continue
+
+        arcpy.env.workspace = folder_path
+        list_raster = arcpy.ListRasters("*", "TIF")
+
+        print(f"Gathering all raster files in {arcpy.env.workspace}...")
+        if not list_raster:
+            print("No raster files found in the directory.")
+            continue
+
+        print("Searching for Band 4 and Band 5...")
+        # Parse the Landsat file names so only the red and near-infrared bands of a scene are paired
+        band_pairs = find_band_pairs(list_raster)
+
+        if not band_pairs:
+            print("Required bands are not found in the folder.")
+            continue
+
+        try:
+            # Assume one scene per folder
+            band_4_raster, band_5_raster = band_pairs[sorted(band_pairs)[0]]
+            band_4 = arcpy.Raster(band_4_raster)
+            band_5 = arcpy.Raster(band_5_raster)
+
+            print("Calculating NDVI...")
+            NDVI = (band_5 - band_4) / (band_5 + band_4)
+            NDVI.save(output_path)
+
+            # Validate before anything is deleted: the output must exist and cover the input grid
+            if not arcpy.Exists(output_path):
+                print("Failed to save the NDVI raster.")
+                continue
+            saved = arcpy.Raster(output_path)
+            if (saved.height, saved.width) != (band_4.height, band_4.width):
+                print(f"NDVI raster {output_path} does not match the input size, keeping the bands.")
+                continue
             print(f"NDVI Calculated Successfully for {output_path}")
-        else:
-            print("Failed to save the NDVI raster.")
 
-        # Delete unwanted files
-        print("Deleting unwanted files...")
-        arcpy.Delete_management(band_4_raster)
-        arcpy.Delete_management(band_5_raster)
+            # Checksumming the output and deleting the bands happen in the background
+            inputs = [os.path.join(folder_path, band_4_raster), os.path.join(folder_path, band_5_raster)]
+            del band_4, band_5, NDVI, saved
+            # A fresh output replaces any checksum recorded for an earlier one
+            journal.record(data, "computed", output=output_path, inputs=inputs, checksum=None)
+            print("Queueing unwanted files for deletion...")
+            cleanup.submit(data, output_path, inputs)
 
-    except Exception as e:
-        print(f"An error occurred: {str(e)}")
+        except Exception as e:
+            print(f"An error occurred: {str(e)}")
+finally:
+    failed = cleanup.close()
+    if failed:
+        print(f"Input bands were kept for: {', '.join(failed)}")
@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+
+# Files that travel with a raster and have to go with it
+SIDECAR_SUFFIXES = (".aux.xml", ".ovr", ".xml")
+WORLD_FILE_EXTENSIONS = (".tfw", ".TFW")
+
+
+def file_checksum(path, chunk_size=1 << 20):
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def raster_files(path):
+    """The raster file and whichever of its sidecar files exist"""
+    base = os.path.splitext(path)[0]
+    candidates = [path] + [path + suffix for suffix in SIDECAR_SUFFIXES] + [base + ext for ext in WORLD_FILE_EXTENSIONS]
+    return [candidate for candidate in candidates if os.path.exists(candidate)]
+
+
+def remove_raster(path, archive_directory=None):
+    """Delete a raster and its sidecars, or move them to archive_directory if one is given.
+
+    Files that are already gone are skipped, so an interrupted cleanup can be repeated.
+    """
+    for file_path in raster_files(path):
+        if archive_directory:
+            os.makedirs(archive_directory, exist_ok=True)
+            shutil.move(file_path, os.path.join(archive_directory, os.path.basename(file_path)))
+        else:
+            os.remove(file_path)
+
+
+class Journal(object):
+    """Append-only JSON-lines log of each scene's progress: computed -> verified -> cleaned.
+
+    Every entry is flushed and fsync'ed before the step it records is acted on, so after a crash
+    the journal never claims more than what happened. A line torn by a crash mid-write is skipped
+    when reloading.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.scenes = {}
+        if os.path.exists(path):
+            with open(path, 'r') as file:
+                text = file.read()
+            for line in text.splitlines():
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                self.scenes.setdefault(entry["scene"], {}).update(entry)
+            # Terminate a torn last line so the next entry starts on a line of its own
+            if text and not text.endswith("\n"):
+                with open(path, 'a') as file:
+                    file.write("\n")
+
+    def record(self, scene, state, **details):
+        entry = dict(scene=scene, state=state, time=time.strftime("%Y-%m-%d %H:%M:%S"), **details)
+        with self.lock:
+            with open(self.path, 'a') as file:
+                file.write(json.dumps(entry) + "\n")
+                file.flush()
+                os.fsync(file.fileno())
+            self.scenes.setdefault(scene, {}).update(entry)
+
+    def state(self, scene):
+        return self.scenes.get(scene, {}).get("state")
+
+
+class CleanupWorker(object):
+    """Checksums finished outputs and deletes (or archives) their inputs on a background thread.
+
+    The main loop only has to submit() a scene once its output is written and validated, so the
+    next scene starts while the previous one is cleaned up. Inputs are removed only after the
+    output's checksum is in the journal, and never if the output changed since it was verified.
+    """
+
+    def __init__(self, journal, archive_directory=None):
+        self.journal = journal
+        self.archive_directory = archive_directory
+        self.failed = []
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name="band-cleanup")
+        self.thread.start()
+
+    def submit(self, scene, output_path, input_paths):
+        self.queue.put((scene, output_path, list(input_paths)))
+
+    def close(self):
+        """Finish the queued cleanups and stop the worker"""
+        self.queue.put(None)
+        self.thread.join()
+        return self.failed
+
+    def _run(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                break
+            scene = job[0]
+            try:
+                self._clean(*job)
+                print(f"Cleaned up the input bands of {scene}.")
+            except Exception as e:
+                self.failed.append(scene)
+                print(f"Input bands of {scene} were kept: {str(e)}")
+
+    def _clean(self, scene, output_path, input_paths):
+        if not os.path.exists(output_path):
+            raise ValueError(f"{output_path} does not exist.")
+        checksum = file_checksum(output_path)
+        previous = self.journal.scenes.get(scene, {}).get("checksum")
+        if previous and previous != checksum:
+            raise ValueError(f"{output_path} changed since it was verified.")
+        self.journal.record(scene, "verified", output=output_path, checksum=checksum)
+        for path in input_paths:
+            remove_raster(path, self.archive_directory)
+        self.journal.record(scene, "cleaned", inputs=input_paths)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
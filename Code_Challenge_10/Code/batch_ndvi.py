@@ -0,0 +1,108 @@
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from landsat import find_band_pairs
+from raster_io import create_geotiff, open_band
+
+
+def find_scenes(data_directory):
+    """Find the red/NIR band pair of every Landsat scene in the subfolders of data_directory"""
+    scenes = []
+    for folder in sorted(os.listdir(data_directory)):
+        folder_path = os.path.join(data_directory, folder)
+        if not os.path.isdir(folder_path):
+            continue
+        for scene, (red, nir) in sorted(find_band_pairs(os.listdir(folder_path)).items()):
+            scenes.append((scene, os.path.join(folder_path, red), os.path.join(folder_path, nir)))
+    return scenes
+
+
+def is_up_to_date(output_path, input_paths):
+    """True if the output exists and is newer than every input"""
+    if not os.path.exists(output_path):
+        return False
+    output_time = os.path.getmtime(output_path)
+    return all(os.path.getmtime(path) <= output_time for path in input_paths)
+
+
+def compute_ndvi(red_path, nir_path, output_path, chunk_rows=512, nodata=None):
+    """NDVI = (NIR - red) / (NIR + red) in float32, computed chunk by chunk from memory-mapped bands.
+
+    Both bands are memory-mapped (uncompressed GeoTIFF or BIL) and the output is a memory-mapped
+    GeoTIFF, so only one chunk of rows is in memory and scene size is limited by disk, not RAM.
+    Cells that are NoData in either band (the files' own NoData value, or `nodata` when given, e.g.
+    0 for Landsat fill), NaN, or where NIR + red is 0 become NaN instead of dividing by zero.
+    The result is written to a temporary name and renamed when complete, so an interrupted run never
+    leaves a half-written output that looks finished.
+    """
+    red = open_band(red_path)
+    nir = open_band(nir_path)
+    if red.shape != nir.shape:
+        raise ValueError(f"Band sizes differ: {red.shape} and {nir.shape}")
+    nodata_values = [nodata if nodata is not None else band.nodata for band in (red, nir)]
+
+    temp_path = output_path + ".partial.tif"
+    ndvi = create_geotiff(temp_path, red.shape, np.float32, red.transform, nodata=np.nan)
+    for row0 in range(0, red.shape[0], chunk_rows):
+        row1 = min(row0 + chunk_rows, red.shape[0])
+        red_chunk = red.read(row0, row1).astype(np.float32)
+        nir_chunk = nir.read(row0, row1).astype(np.float32)
+        valid = np.isfinite(red_chunk) & np.isfinite(nir_chunk)
+        for chunk, value in zip((red_chunk, nir_chunk), nodata_values):
+            if value is not None:
+                valid &= chunk != value
+        total = nir_chunk + red_chunk
+        valid &= total != 0
+        block = np.full(red_chunk.shape, np.nan, dtype=np.float32)
+        np.divide(nir_chunk - red_chunk, total, out=block, where=valid)
+        ndvi[row0:row1] = block
+    ndvi.flush()
+    del ndvi
+    os.replace(temp_path, output_path)
+    return output_path
+
+
+def run_batch(data_directory, output_directory, workers=None, chunk_rows=512, nodata=0):
+    """Compute NDVI for every scene in a process pool, skipping scenes whose output is up to date.
+
+    nodata defaults to 0, the fill value of Landsat level-1 bands.
+    """
+    if not os.path.exists(output_directory):
+        os.makedirs(output_directory)
+
+    scenes = find_scenes(data_directory)
+    print(f"Scenes found: {len(scenes)}")
+    jobs = []
+    for scene, red_path, nir_path in scenes:
+        output_path = os.path.join(output_directory, f"output_{scene}.tif")
+        if is_up_to_date(output_path, [red_path, nir_path]):
+            print(f"Skipping {scene}, output is up to date.")
+            continue
+        jobs.append((scene, red_path, nir_path, output_path))
+
+    start = time.perf_counter()
+    failed = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(compute_ndvi, red_path, nir_path, output_path, chunk_rows, nodata): scene
+                   for scene, red_path, nir_path, output_path in jobs}
+        for future in as_completed(futures):
+            scene = futures[future]
+            try:
+                print(f"NDVI Calculated Successfully for {future.result()}")
+            except Exception as e:
+                failed.append(scene)
+                print(f"An error occurred for {scene}: {str(e)}")
+    print(f"{len(jobs) - len(failed)} of {len(jobs)} scenes processed in {time.perf_counter() - start:.1f} s.")
+    return failed
+
+
+if __name__ == "__main__":
+    # Usage: python batch_ndvi.py [workers]
+    data_directory = r'C:\GitHub\NRS_528\Code Challenge 10\Landsat_data_Ifs'
+    output_directory = os.path.join(data_directory, 'output')
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    run_batch(data_directory, output_directory, workers)
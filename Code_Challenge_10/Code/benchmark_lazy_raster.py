@@ -0,0 +1,73 @@
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import lazy_raster
+from raster_io import GeoTiffWriter, open_geotiff
+
+# Synthetic Landsat-sized bands (rows, columns)
+shape = (4000, 4000)
+
+
+def write_band(path, seed):
+    rng = np.random.default_rng(seed)
+    with GeoTiffWriter(path, shape, np.uint16, (0.0, 0.0, 30.0, 30.0)) as writer:
+        for row0 in range(0, shape[0], 500):
+            writer.write_rows(rng.integers(0, 20000, (500, shape[1]), dtype=np.uint16))
+
+
+def naive(band_4_path, band_5_path, out_path):
+    # Every operator materialises a full-size raster, as with eager map algebra
+    band_4 = open_geotiff(band_4_path).read(0, shape[0]).astype(np.float32)
+    band_5 = open_geotiff(band_5_path).read(0, shape[0]).astype(np.float32)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ndvi = (band_5 - band_4) / (band_5 + band_4)
+    vegetated = np.where(ndvi > 0.3, 1, 0).astype(np.uint8)
+    with GeoTiffWriter(out_path, shape, np.float32, (0.0, 0.0, 30.0, 30.0), nodata=np.nan) as writer:
+        writer.write_rows(ndvi)
+    with GeoTiffWriter(out_path + ".veg.tif", shape, np.uint8, (0.0, 0.0, 30.0, 30.0)) as writer:
+        writer.write_rows(vegetated)
+
+
+def lazy(band_4_path, band_5_path, out_path):
+    band_4 = lazy_raster.source(band_4_path)
+    band_5 = lazy_raster.source(band_5_path)
+    ndvi = (band_5 - band_4) / (band_5 + band_4)
+    # The NDVI subexpression is shared by both outputs and computed once per block
+    vegetated = lazy_raster.Con(ndvi > 0.3, 1, 0)
+    lazy_raster.save_all({out_path: ndvi, out_path + ".veg.tif": vegetated}, block_rows=256)
+
+
+def measure(function, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    function(*args)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / (1024 * 1024)
+
+
+if __name__ == "__main__":
+    temp_dir = tempfile.mkdtemp()
+    band_4_path = os.path.join(temp_dir, "B4.tif")
+    band_5_path = os.path.join(temp_dir, "B5.tif")
+    write_band(band_4_path, 4)
+    write_band(band_5_path, 5)
+
+    results = {}
+    for name, function in [("naive", naive), ("lazy", lazy)]:
+        out_path = os.path.join(temp_dir, f"ndvi_{name}.tif")
+        elapsed, peak_mb = measure(function, band_4_path, band_5_path, out_path)
+        results[name] = out_path
+        print(f"{name:>6}: {elapsed:6.2f} s, peak memory {peak_mb:8.1f} MB")
+
+    same = np.allclose(open_geotiff(results["naive"]).read(0, shape[0]),
+                       open_geotiff(results["lazy"]).read(0, shape[0]), equal_nan=True)
+    print("Outputs match." if same else "Warning: outputs differ.")
+    for name in os.listdir(temp_dir):
+        os.remove(os.path.join(temp_dir, name))
+    os.rmdir(temp_dir)
@@ -0,0 +1,52 @@
+import os
+import re
+
+# Collection 1/2 names, e.g. LC08_L1TP_012031_20200615_20200625_02_T1_B4.TIF
+COLLECTION_NAME = re.compile(
+    r"^(?P<scene>(?P<sensor>L[COTEM])(?P<satellite>\d{2})_(?P<level>L[12][A-Z]{2})_(?P<path>\d{3})(?P<row>\d{3})_"
+    r"(?P<acquired>\d{8})_(?P<processed>\d{8})_(?P<collection>\d{2})_(?P<tier>RT|T1|T2))"
+    r"_(?P<band>(?:SR_|ST_)?B\d{1,2})\.TIF$", re.IGNORECASE)
+
+# Pre-collection names, e.g. LC80120312020167LGN00_B4.TIF
+LEGACY_NAME = re.compile(
+    r"^(?P<scene>(?P<sensor>L[COTEM])(?P<satellite>\d)(?P<path>\d{3})(?P<row>\d{3})(?P<acquired>\d{7})"
+    r"(?P<station>[A-Z]{3})(?P<version>\d{2}))_(?P<band>B\d{1,2})\.TIF$", re.IGNORECASE)
+
+# Red and near-infrared bands per (sensor, satellite). TM and ETM+ use B3/B4 and OLI (8, 9) moved
+# them up by one; MSS numbers its four bands 4-7 on Landsat 1-3 and 1-4 on Landsat 4-5, where B3
+# and B4 are both near-infrared
+NDVI_BANDS = {("T", 4): ("B3", "B4"), ("T", 5): ("B3", "B4"), ("E", 7): ("B3", "B4"),
+              ("C", 8): ("B4", "B5"), ("O", 8): ("B4", "B5"), ("C", 9): ("B4", "B5"), ("O", 9): ("B4", "B5"),
+              ("M", 1): ("B5", "B7"), ("M", 2): ("B5", "B7"), ("M", 3): ("B5", "B7"),
+              ("M", 4): ("B2", "B4"), ("M", 5): ("B2", "B4")}
+
+
+def parse_landsat_name(filename):
+    """Split a Landsat band file name into its parts, or return None if it is not a Landsat band"""
+    name = os.path.basename(filename)
+    match = COLLECTION_NAME.match(name) or LEGACY_NAME.match(name)
+    if not match:
+        return None
+    parts = match.groupdict()
+    parts["satellite"] = int(parts["satellite"])
+    # Surface reflectance bands (SR_B4) pair the same way as the level-1 bands
+    parts["band_number"] = parts["band"].upper().split("_")[-1]
+    return parts
+
+
+def find_band_pairs(filenames):
+    """Group band files by scene and return {scene id: (red file, near-infrared file)} for NDVI"""
+    scenes = {}
+    for filename in filenames:
+        parts = parse_landsat_name(filename)
+        instrument = None if parts is None else (parts["sensor"][1].upper(), parts["satellite"])
+        if instrument not in NDVI_BANDS:
+            continue
+        red_band, nir_band = NDVI_BANDS[instrument]
+        bands = scenes.setdefault(parts["scene"], {})
+        if parts["band_number"] == red_band:
+            bands["red"] = filename
+        elif parts["band_number"] == nir_band:
+            bands["nir"] = filename
+    return {scene: (bands["red"], bands["nir"]) for scene, bands in scenes.items()
+            if "red" in bands and "nir" in bands}
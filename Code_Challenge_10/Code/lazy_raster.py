@@ -0,0 +1,204 @@
+import numpy as np
+
+from raster_io import GeoTiffWriter, RasterReader, open_band, open_geotiff
+
+# Arithmetic is done in float32 so integer bands (e.g. uint16 Landsat DNs) cannot wrap around
+ARITHMETIC = {"add": np.add, "subtract": np.subtract, "multiply": np.multiply, "divide": np.divide}
+COMPARISON = {"greater": np.greater, "less": np.less, "greater_equal": np.greater_equal,
+              "less_equal": np.less_equal, "equal": np.equal, "not_equal": np.not_equal,
+              "and": np.logical_and, "or": np.logical_or}
+# Integer types from small to large, for the branches of Con
+INTEGER_TYPES = [np.dtype(name) for name in ("uint8", "int8", "uint16", "int16", "uint32", "int32", "int64")]
+
+
+class LazyRaster(object):
+    """A node of a raster map-algebra expression that is only evaluated when saved.
+
+    Operators build a graph instead of computing full-size rasters. save() (or save_all() for
+    several outputs) walks the raster in blocks of rows and evaluates the whole graph for one block
+    at a time, so intermediates are block-sized, and identical subexpressions are computed once
+    per block.
+    """
+
+    def __init__(self, op, args, shape, transform):
+        self.op = op
+        self.args = args
+        self.shape = shape
+        self.transform = transform
+        self._key = None
+
+    @property
+    def key(self):
+        """Structural key: two nodes with the same key compute the same values"""
+        if self._key is None:
+            if self.op == "source":
+                self._key = ("source", id(self.args[0]))
+            else:
+                self._key = (self.op,) + tuple(arg.key if isinstance(arg, LazyRaster) else ("value", arg)
+                                               for arg in self.args)
+        return self._key
+
+    # NumPy leaves array <op> LazyRaster to the reflected operators below instead of looping over the array
+    __array_ufunc__ = None
+
+    def _apply(self, op, *others):
+        others = tuple(_operand(other, self) for other in others)
+        for other in others:
+            if isinstance(other, LazyRaster) and other.shape != self.shape:
+                raise ValueError(f"Raster shapes differ: {self.shape} and {other.shape}")
+        return LazyRaster(op, (self,) + others, self.shape, self.transform)
+
+    def _reflected(self, op, other):
+        return LazyRaster(op, (_operand(other, self), self), self.shape, self.transform)
+
+    # Map algebra operators
+    def __add__(self, other): return self._apply("add", other)
+    def __radd__(self, other): return self._reflected("add", other)
+    def __sub__(self, other): return self._apply("subtract", other)
+    def __rsub__(self, other): return self._reflected("subtract", other)
+    def __mul__(self, other): return self._apply("multiply", other)
+    def __rmul__(self, other): return self._reflected("multiply", other)
+    def __truediv__(self, other): return self._apply("divide", other)
+    def __rtruediv__(self, other): return self._reflected("divide", other)
+    def __gt__(self, other): return self._apply("greater", other)
+    def __lt__(self, other): return self._apply("less", other)
+    def __ge__(self, other): return self._apply("greater_equal", other)
+    def __le__(self, other): return self._apply("less_equal", other)
+    def __eq__(self, other): return self._apply("equal", other)
+    def __ne__(self, other): return self._apply("not_equal", other)
+    def __and__(self, other): return self._apply("and", other)
+    def __or__(self, other): return self._apply("or", other)
+    def __invert__(self): return self._apply("not")
+    def __neg__(self): return self._apply("negative")
+    __hash__ = object.__hash__
+
+    def evaluate(self, row0, row1, memo):
+        """Values of rows row0 .. row1 - 1, reusing results already in memo (keyed by structure)"""
+        key = self.key
+        if key in memo:
+            return memo[key]
+        if self.op == "source":
+            result = _masked_read(self.args[0], row0, row1)
+        else:
+            values = [arg.evaluate(row0, row1, memo) if isinstance(arg, LazyRaster) else arg for arg in self.args]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                if self.op in ARITHMETIC:
+                    result = ARITHMETIC[self.op](*values, dtype=np.float32)
+                elif self.op in COMPARISON:
+                    result = COMPARISON[self.op](*values)
+                elif self.op == "not":
+                    result = np.logical_not(values[0])
+                elif self.op == "negative":
+                    result = np.negative(values[0], dtype=np.float32)
+                elif self.op == "isnull":
+                    result = np.isnan(values[0]) if np.asarray(values[0]).dtype.kind == "f" \
+                        else np.zeros(np.shape(values[0]), dtype=bool)
+                elif self.op == "con":
+                    # The smallest type holding both branches, as eager Con: Con(c, 1, 0) is uint8
+                    result = np.where(*values).astype(_branch_dtype(values[1:]), copy=False)
+                else:
+                    raise ValueError(f"Unknown raster operation: {self.op}")
+        memo[key] = result
+        return result
+
+    def save(self, path, block_rows=256, nodata=np.nan, dtype=None):
+        """Evaluate the expression block by block and stream it to a GeoTIFF"""
+        save_all({path: self}, block_rows, nodata, dtype)
+        return open_geotiff(path)
+
+    def compute(self, block_rows=256):
+        """Evaluate the whole expression into one in-memory array"""
+        blocks = []
+        for row0 in range(0, self.shape[0], block_rows):
+            blocks.append(self.evaluate(row0, min(row0 + block_rows, self.shape[0]), {}))
+        return np.concatenate(blocks)
+
+
+def save_all(outputs, block_rows=256, nodata=np.nan, dtype=None):
+    """Evaluate several expressions in one pass, sharing common subexpressions between them.
+
+    outputs maps output GeoTIFF paths to LazyRaster expressions of the same shape.
+    """
+    shape = next(iter(outputs.values())).shape
+    writers = {}
+    try:
+        for row0 in range(0, shape[0], block_rows):
+            row1 = min(row0 + block_rows, shape[0])
+            memo = {}
+            for path, expression in outputs.items():
+                block = np.asarray(expression.evaluate(row0, row1, memo))
+                if block.dtype == bool:
+                    block = block.astype(np.uint8)
+                if path not in writers:
+                    block_dtype = dtype or block.dtype
+                    block_nodata = nodata if np.dtype(block_dtype).kind == "f" else None
+                    writers[path] = GeoTiffWriter(path, shape, block_dtype, expression.transform, nodata=block_nodata)
+                writers[path].write_rows(block)
+    except Exception:
+        # Leave the partial files behind without headers rather than hiding the original error
+        for writer in writers.values():
+            writer.file.close()
+        raise
+    for writer in writers.values():
+        writer.close()
+
+
+def _operand(value, like):
+    # Scalars stay values; an array of the raster's shape becomes a source node, so it is read
+    # block by block and keyed by node like any other raster
+    if not isinstance(value, np.ndarray):
+        return value
+    if value.ndim == 0:
+        return value.item()
+    if value.shape != like.shape:
+        raise ValueError(f"Array operand of shape {value.shape} does not match the raster shape {like.shape}.")
+    return source(value, like.transform)
+
+
+def _masked_read(reader, row0, row1):
+    # Rows of a source with its NoData value turned into NaN, so NoData propagates like in
+    # ArcGIS and IsNull finds it; rasters with a NoData value are read as float32
+    block = reader.read(row0, row1)
+    if reader.nodata is None:
+        return block
+    block = block.astype(np.result_type(block.dtype, np.float32))
+    block[block == reader.nodata] = np.nan
+    return block
+
+
+def _branch_dtype(values):
+    # Arrays keep their type, Python floats are float32 and Python integers get the smallest
+    # integer type holding all of them, so Con(c, 1, 0) is uint8 and Con(c, -1, 300) is int16
+    dtypes = [value.dtype for value in values if isinstance(value, np.ndarray)]
+    numbers = [value for value in values if not isinstance(value, np.ndarray)]
+    if any(isinstance(value, (float, np.floating)) for value in numbers):
+        dtypes.append(np.dtype(np.float32))
+    integers = [int(value) for value in numbers if not isinstance(value, (float, np.floating))]
+    if integers:
+        low, high = min(integers), max(integers)
+        dtypes.append(next((dtype for dtype in INTEGER_TYPES
+                            if np.iinfo(dtype).min <= low and high <= np.iinfo(dtype).max), np.dtype(np.int64)))
+    return np.result_type(*dtypes)
+
+
+def source(raster, transform=(0.0, 0.0, 1.0, 1.0), nodata=None):
+    """Leaf node over a GeoTIFF/BIL path, a RasterReader or an in-memory array.
+
+    Cells equal to the raster's NoData value (or nodata, for an array) are read as NaN.
+    """
+    if isinstance(raster, str):
+        raster = open_band(raster)
+    elif not isinstance(raster, RasterReader):
+        raster = RasterReader(np.asarray(raster), transform, nodata)
+    return LazyRaster("source", (raster,), raster.shape, raster.transform)
+
+
+def Con(condition, true_value, false_value=np.nan):
+    """Con(condition, true, false) like arcpy.sa.Con; cells that are false become NoData by default"""
+    values = tuple(_operand(value, condition) for value in (true_value, false_value))
+    return LazyRaster("con", (condition,) + values, condition.shape, condition.transform)
+
+
+def IsNull(raster):
+    """1 where the raster is NoData (NaN), 0 elsewhere, like arcpy.sa.IsNull"""
+    return LazyRaster("isnull", (raster,), raster.shape, raster.transform)
@@ -1,7 +1,16 @@
 import arcpy
 import os
 import json
-import tempfile
+import sys
+import time
+
+import numpy as np
+
+import raster_vectorize
+import spatial_index
+import structured_json
+from dbf_reader import DbfReader, read_field_names
+from projection_cache import shared_cache
 
 # Set up environment to allow overwriting output files
 arcpy.env.overwriteOutput = True
@@ -12,7 +21,8 @@ class Toolbox(object):
         self.label = "Advanced Conversion Toolbox"
         self.alias = ""
         # List of tool classes associated with this toolbox
-        self.tools = [TifftoShapefile, AddXY, IntersectShapefiles, CleanShapefile, ShapefileToGeoJSON, StructuredGeoJSON]
+        self.tools = [TifftoShapefile, AddXY, IntersectShapefiles, CleanShapefile, ShapefileToGeoJSON, StructuredGeoJSON,
+                      DirectJoin, RunPipeline]
 
 class TifftoShapefile(object):
     def __init__(self):
@@ -31,13 +41,37 @@ class TifftoShapefile(object):
                                   name="out_shapefile",
                                   datatype="DEShapefile",
                                   parameterType="Required",
-                                  direction="Output")]
+                                  direction="Output"),
+                  arcpy.Parameter(displayName="Vectorization Method",
+                                  name="method",
+                                  datatype="GPString",
+                                  parameterType="Optional",
+                                  direction="Input"),
+                  arcpy.Parameter(displayName="Simplify Tolerance (map units, 0 = no simplify)",
+                                  name="simplify_tolerance",
+                                  datatype="GPDouble",
+                                  parameterType="Optional",
+                                  direction="Input"),
+                  arcpy.Parameter(displayName="Tile Size (cells)",
+                                  name="tile_size",
+                                  datatype="GPLong",
+                                  parameterType="Optional",
+                                  direction="Input")]
+        # NumPy labels and traces the polygons tile by tile without the ArcGIS conversion tool
+        params[2].filter.type = "ValueList"
+        params[2].filter.list = ["ArcGIS", "NumPy"]
+        params[2].value = "ArcGIS"
+        params[3].value = 0
+        params[4].value = 2048
         return params
 
     def execute(self, parameters, messages):
         """Execution of converting TIFF to Shapefile"""
         in_tiff = parameters[0].valueAsText
         out_shapefile = parameters[1].valueAsText
+        method = parameters[2].valueAsText or "ArcGIS"
+        simplify_tolerance = float(parameters[3].value or 0)
+        tile_size = int(parameters[4].value or 2048)
 
         # Check if the input TIFF file exists and is valid
         if not arcpy.Exists(in_tiff):
@@ -50,11 +84,36 @@ class TifftoShapefile(object):
             arcpy.AddError("Input is not a valid raster TIFF file.")
             return
 
-        arcpy.RasterToPolygon_conversion(in_tiff, out_shapefile, "NO_SIMPLIFY", "VALUE")
-        arcpy.AddMessage("Conversion complete: " + out_shapefile)
-        # Just before calling RasterToPolygon
         print("Input TIFF File:", in_tiff)
-        arcpy.RasterToPolygon_conversion(in_tiff, out_shapefile, "NO_SIMPLIFY", "VALUE")
+        if method == "NumPy":
+            raster = arcpy.Raster(in_tiff)
+            transform = (raster.extent.XMin, raster.extent.YMax, raster.meanCellWidth, raster.meanCellHeight)
+            prj_wkt = raster.spatialReference.exportToString().split(";")[0]
+            count = raster_vectorize.vectorize_to_shapefile(arcpy_window_reader(raster), (raster.height, raster.width),
+                                                            transform, out_shapefile, raster.noDataValue,
+                                                            simplify_tolerance, tile_size, prj_wkt)
+            arcpy.AddMessage(f"{count} polygons traced.")
+        elif simplify_tolerance > 0:
+            # RasterToPolygon's SIMPLIFY takes no tolerance; trace the exact outlines, then apply the
+            # tolerance with Douglas-Peucker (POINT_REMOVE), as the NumPy method does
+            traced = os.path.join("in_memory", "traced_polygons")
+            arcpy.RasterToPolygon_conversion(in_tiff, traced, "NO_SIMPLIFY", "VALUE")
+            try:
+                arcpy.cartography.SimplifyPolygon(traced, out_shapefile, "POINT_REMOVE", simplify_tolerance)
+            finally:
+                arcpy.Delete_management(traced)
+        else:
+            arcpy.RasterToPolygon_conversion(in_tiff, out_shapefile, "NO_SIMPLIFY", "VALUE")
+        arcpy.AddMessage("Conversion complete: " + out_shapefile)
+
+
+def arcpy_window_reader(raster):
+    """Window reader for raster_vectorize that reads one block of an arcpy Raster at a time"""
+    def read_window(row0, row1, col0, col1):
+        lower_left = arcpy.Point(raster.extent.XMin + col0 * raster.meanCellWidth,
+                                 raster.extent.YMax - row1 * raster.meanCellHeight)
+        return arcpy.RasterToNumPyArray(raster, lower_left, col1 - col0, row1 - row0)
+    return read_window
 
 
 class AddXY(object):
@@ -88,9 +147,6 @@ class AddXY(object):
         in_shapefile = parameters[0].valueAsText
         out_shapefile = parameters[1].valueAsText
 
-        # Create a temporary folder for intermediate outputs
-        temp_dir = tempfile.mkdtemp()
-
         # Check if the input shapefile exists and is valid
         if not arcpy.Exists(in_shapefile):
             arcpy.AddError("Input Shapefile does not exist or is invalid.")
@@ -100,17 +156,18 @@ class AddXY(object):
             # Define a common coordinate system (e.g., WGS 1984)
             coord_system = arcpy.SpatialReference(4326)  # WGS 1984
 
-            # Project the shapefile to the common coordinate system
-            projected_shapefile = os.path.join(temp_dir, "projected_shapefile.shp")
-            arcpy.Project_management(in_shapefile, projected_shapefile, coord_system)
+            # Project the shapefile to the common coordinate system (reused from the cache when possible)
+            projected_shapefile = shared_cache.project(in_shapefile, coord_system)
 
-            temp_points = os.path.join(temp_dir, "temp_points.shp")
+            temp_points = "in_memory/temp_points"
             arcpy.FeatureToPoint_management(projected_shapefile, temp_points)
             arcpy.AddXY_management(temp_points)
             arcpy.CopyFeatures_management(temp_points, out_shapefile)
+            arcpy.Delete_management(temp_points)
 
             # Output message
             arcpy.AddMessage(f"XY coordinates added. Output shapefile saved as: {out_shapefile}")
+            shared_cache.report()
         except arcpy.ExecuteError as e:
             arcpy.AddError(f"Error during adding XY coordinates: {e}")
             arcpy.AddError(arcpy.GetMessages())
@@ -147,9 +204,6 @@ class IntersectShapefiles(object):
         in_shapefile2 = parameters[1].valueAsText
         out_shapefile = parameters[2].valueAsText
 
-        # Create a temporary folder for intermediate outputs
-        temp_dir = tempfile.mkdtemp()
-
         # Check if the input shapefiles exist and are valid
         if not arcpy.Exists(in_shapefile1):
             arcpy.AddError("Input Shapefile 1 does not exist or is invalid.")
@@ -162,18 +216,50 @@ class IntersectShapefiles(object):
             # Define a common coordinate system (e.g., WGS 1984)
             coord_system = arcpy.SpatialReference(4326)  # WGS 1984
 
-            # Project the shapefiles to the common coordinate system
-            projected_shapefile1 = os.path.join(temp_dir, "projected_shapefile1.shp")
-            projected_shapefile2 = os.path.join(temp_dir, "projected_shapefile2.shp")
-            arcpy.Project_management(in_shapefile1, projected_shapefile1, coord_system)
-            arcpy.Project_management(in_shapefile2, projected_shapefile2, coord_system)
-
-            arcpy.Intersect_analysis([projected_shapefile1, projected_shapefile2], out_shapefile)
+            # Project the shapefiles to the common coordinate system (reused from the cache when possible)
+            projected_shapefile1 = shared_cache.project(in_shapefile1, coord_system)
+            projected_shapefile2 = shared_cache.project(in_shapefile2, coord_system)
+
+            shape_type1 = spatial_index.read_shape_type(projected_shapefile1)
+            shape_type2 = spatial_index.read_shape_type(projected_shapefile2)
+            if shape_type1 in spatial_index.POINT_TYPES and shape_type2 in spatial_index.POLYGON_TYPES or \
+                    shape_type2 in spatial_index.POINT_TYPES and shape_type1 in spatial_index.POLYGON_TYPES:
+                # Points against polygons: R-tree candidates, then exact point-in-polygon tests
+                points_first = shape_type1 in spatial_index.POINT_TYPES
+                points, polygons = (projected_shapefile1, projected_shapefile2) if points_first else \
+                    (projected_shapefile2, projected_shapefile1)
+                count = spatial_index.intersect_points_with_polygons(points, polygons, out_shapefile, points_first)
+                arcpy.AddMessage(f"{count} points fall inside polygons.")
+            else:
+                # Only features whose bounding boxes overlap the other layer can intersect
+                candidates1, candidates2 = spatial_index.candidate_features(projected_shapefile1, projected_shapefile2)
+                layers = []
+                for number, (shapefile, candidates) in enumerate([(projected_shapefile1, candidates1),
+                                                                   (projected_shapefile2, candidates2)], 1):
+                    layer = arcpy.MakeFeatureLayer_management(shapefile, f"intersect_candidates_{number}")
+                    select_features(layer, candidates)
+                    layers.append(layer)
+                arcpy.AddMessage(f"Bounding box candidates: {len(candidates1)} and {len(candidates2)} features.")
+                arcpy.Intersect_analysis(layers, out_shapefile)
+                for layer in layers:
+                    arcpy.Delete_management(layer)
             arcpy.AddMessage("Intersection complete: " + out_shapefile)
+            shared_cache.report()
         except arcpy.ExecuteError as e:
             arcpy.AddError(f"Error during intersection: {e}")
             arcpy.AddError(arcpy.GetMessages())
 
+def select_features(layer, fids, chunk_size=1000):
+    """Select the features of a layer by FID, a chunk of ids per where clause, so large candidate
+    sets stay under the SQL length limits"""
+    fids = [int(fid) for fid in fids]
+    if not fids:
+        arcpy.SelectLayerByAttribute_management(layer, "NEW_SELECTION", "FID = -1")
+    for start in range(0, len(fids), chunk_size):
+        where = f"FID IN ({','.join(map(str, fids[start:start + chunk_size]))})"
+        arcpy.SelectLayerByAttribute_management(layer, "ADD_TO_SELECTION" if start else "NEW_SELECTION", where)
+
+
 class CleanShapefile(object):
     def __init__(self):
         """Tool for cleaning a shapefile"""
@@ -214,18 +300,17 @@ class CleanShapefile(object):
         fields_to_delete = parameters[1].values
         out_shapefile = parameters[2].valueAsText
 
-        # Create a temporary folder for intermediate outputs
-        temp_dir = tempfile.mkdtemp()
-
         # Check if the input shapefile exists and is valid
         if not arcpy.Exists(in_shapefile):
             arcpy.AddError("Input Shapefile does not exist or is invalid.")
             return
 
         try:
-            # Describe the input shapefile
-            desc_shapefile = arcpy.Describe(in_shapefile)
-            field_names = [field.name for field in desc_shapefile.fields]
+            # Field names come straight from the .dbf header; other inputs are described by arcpy
+            if in_shapefile.lower().endswith(".shp"):
+                field_names = read_field_names(in_shapefile)
+            else:
+                field_names = [field.name for field in arcpy.Describe(in_shapefile).fields]
 
             # Check if any fields are selected for deletion
             if not fields_to_delete:
@@ -241,18 +326,18 @@ class CleanShapefile(object):
             # Define a common coordinate system (e.g., WGS 1984)
             coord_system = arcpy.SpatialReference(4326)  # WGS 1984
 
-            # Project the shapefile to the common coordinate system
-            projected_shapefile = os.path.join(temp_dir, "projected_shapefile.shp")
-            arcpy.Project_management(in_shapefile, projected_shapefile, coord_system)
+            # Project the shapefile to the common coordinate system (reused from the cache when possible)
+            projected_shapefile = shared_cache.project(in_shapefile, coord_system)
 
             try:
-                # Delete the specified fields from the attribute table
-                arcpy.DeleteField_management(projected_shapefile, fields_to_delete)
-                arcpy.AddMessage("Fields deleted successfully from: " + projected_shapefile)
-
-                # Copy the cleaned shapefile to the output location
+                # Copy first so the cached projection is never modified
                 arcpy.CopyFeatures_management(projected_shapefile, out_shapefile)
+
+                # Delete the specified fields from the attribute table
+                arcpy.DeleteField_management(out_shapefile, fields_to_delete)
+                arcpy.AddMessage("Fields deleted successfully from: " + out_shapefile)
                 arcpy.AddMessage("Cleaned shapefile saved as: " + out_shapefile)
+                shared_cache.report()
             except arcpy.ExecuteError as e:
                 arcpy.AddError(f"Error during field deletion: {e}")
                 arcpy.AddError(arcpy.GetMessages())
@@ -291,9 +376,6 @@ class ShapefileToGeoJSON(object):
         in_shapefile = parameters[0].valueAsText
         out_geojson = parameters[1].valueAsText
 
-        # Create a temporary folder for intermediate outputs
-        temp_dir = tempfile.mkdtemp()
-
         # Check if the input shapefile exists and is valid
         if not arcpy.Exists(in_shapefile):
             arcpy.AddError("Input Shapefile does not exist or is invalid.")
@@ -303,9 +385,8 @@ class ShapefileToGeoJSON(object):
             # Define a common coordinate system (e.g., WGS 1984)
             coord_system = arcpy.SpatialReference(4326)  # WGS 1984
 
-            # Project the shapefile to the common coordinate system
-            projected_shapefile = os.path.join(temp_dir, "projected_shapefile.shp")
-            arcpy.Project_management(in_shapefile, projected_shapefile, coord_system)
+            # Project the shapefile to the common coordinate system (reused from the cache when possible)
+            projected_shapefile = shared_cache.project(in_shapefile, coord_system)
 
             # Describe the input shapefile
             desc_shapefile = arcpy.Describe(projected_shapefile)
@@ -313,14 +394,11 @@ class ShapefileToGeoJSON(object):
                 arcpy.AddError("Input shapefile must be a point, polyline, or polygon shapefile.")
                 return
 
-            # Perform the conversion to GeoJSON
-            temp_geojson = os.path.join(temp_dir, "temp_geojson.json")
-            arcpy.FeaturesToJSON_conversion(in_features=projected_shapefile, out_json_file=temp_geojson, format_json="FORMATTED")
-
-            # Save the GeoJSON to the output file
-            arcpy.Copy_management(temp_geojson, out_geojson)
+            # Perform the conversion to GeoJSON straight into the output file
+            arcpy.FeaturesToJSON_conversion(in_features=projected_shapefile, out_json_file=out_geojson, format_json="FORMATTED")
 
             arcpy.AddMessage("Shapefile converted to GeoJSON: " + out_geojson)
+            shared_cache.report()
         except arcpy.ExecuteError as e:
             arcpy.AddError(f"Error during conversion: {e}")
             arcpy.AddError(arcpy.GetMessages())
@@ -343,14 +421,34 @@ class StructuredGeoJSON(object):
                             name="out_structured_json",
                             datatype="DEFile",
                             parameterType="Required",
-                            direction="Output")
+                            direction="Output"),
+            arcpy.Parameter(displayName="Processing Mode",
+                            name="processing_mode",
+                            datatype="GPString",
+                            parameterType="Optional",
+                            direction="Input"),
+            arcpy.Parameter(displayName="Output Format",
+                            name="output_format",
+                            datatype="GPString",
+                            parameterType="Optional",
+                            direction="Input")
         ]
+        # Streaming reads one feature at a time so memory stays bounded on large exports
+        params[2].filter.type = "ValueList"
+        params[2].filter.list = ["Streaming", "In Memory"]
+        params[2].value = "Streaming"
+        # NDJSON writes one structured entry per line
+        params[3].filter.type = "ValueList"
+        params[3].filter.list = ["JSON", "NDJSON"]
+        params[3].value = "JSON"
         return params
 
     def execute(self, parameters, messages):
         print("Running tool: " + self.label)  # Print statement
         in_geojson = parameters[0].valueAsText
         out_structured_json = parameters[1].valueAsText
+        processing_mode = parameters[2].valueAsText or "Streaming"
+        ndjson = parameters[3].valueAsText == "NDJSON"
 
         # Check if the input GeoJSON file exists
         if in_geojson is None or in_geojson.strip() == "":
@@ -361,46 +459,263 @@ class StructuredGeoJSON(object):
             return
 
         try:
-            # Load GeoJSON data and convert to desired format
-            with open(in_geojson, 'r') as file:
-                data = json.load(file)
-
-            # Function to convert GeoJSON features to desired format
-            def convert_to_desired_format(features):
-                new_data = []
-                for feature in features:
-                    attributes = feature['attributes']
-                    constituency = attributes['NAME_2']
-                    county = attributes['NAME_1']
-                    ward = attributes['NAME_3']
-                    risk_factor = attributes['gridcode']  # Rename gridcode as risk factor
-                    longitude = attributes['POINT_X']
-                    latitude = attributes['POINT_Y']
-                    new_entry = {
-                        "Constituency": constituency,
-                        "County": county,
-                        "Ward": ward,
-                        "Risk Factor": risk_factor,  # Rename attribute
-                        "Longitude": longitude,
-                        "Latitude": latitude
-                    }
-                    new_data.append(new_entry)
-                return new_data
-
             # Convert GeoJSON features to desired format
-            structured_data = convert_to_desired_format(data['features'])
-
-            # Save structured JSON to output file
-            with open(out_structured_json, 'w') as file:
-                json.dump(structured_data, file, indent=2)
+            if processing_mode == "In Memory":
+                count = structured_json.convert_in_memory(in_geojson, out_structured_json, ndjson)
+            else:
+                count = structured_json.convert_streaming(in_geojson, out_structured_json, ndjson)
 
+            arcpy.AddMessage(f"{count} features structured.")
             arcpy.AddMessage("Structured GeoJSON saved: " + out_structured_json)
         except Exception as e:
             arcpy.AddError(f"Unexpected error: {e}")
 
 
+class DirectJoin(object):
+    def __init__(self):
+        """Tool for joining points to admin areas straight into the structured JSON"""
+        self.label = "Steps 3-6: Direct Join to Structured JSON"
+        self.description = "Assigns county, constituency and ward names to the AddXY points with a NumPy point-in-polygon join and writes the structured JSON directly."
+
+    def getParameterInfo(self):
+        """Parameter definitions for the tool"""
+        params = [
+            arcpy.Parameter(displayName="Input Points Shapefile (from Step 2)",
+                            name="in_points",
+                            datatype="DEShapefile",
+                            parameterType="Required",
+                            direction="Input"),
+            arcpy.Parameter(displayName="Admin Boundary Shapefile",
+                            name="admin_shapefile",
+                            datatype="DEShapefile",
+                            parameterType="Required",
+                            direction="Input"),
+            arcpy.Parameter(displayName="Output Structured JSON",
+                            name="out_structured_json",
+                            datatype="DEFile",
+                            parameterType="Required",
+                            direction="Output"),
+            arcpy.Parameter(displayName="Output Format",
+                            name="output_format",
+                            datatype="GPString",
+                            parameterType="Optional",
+                            direction="Input")
+        ]
+        params[3].filter.type = "ValueList"
+        params[3].filter.list = ["JSON", "NDJSON"]
+        params[3].value = "JSON"
+        return params
+
+    def execute(self, parameters, messages):
+        """Execution of the direct join"""
+        print("Running tool: " + self.label)  # Print statement
+        in_points = parameters[0].valueAsText
+        admin_shapefile = parameters[1].valueAsText
+        out_structured_json = parameters[2].valueAsText
+        ndjson = parameters[3].valueAsText == "NDJSON"
+
+        if not arcpy.Exists(in_points):
+            arcpy.AddError("Input points shapefile does not exist or is invalid.")
+            return
+        if not arcpy.Exists(admin_shapefile):
+            arcpy.AddError("Admin boundary shapefile does not exist or is invalid.")
+            return
+
+        try:
+            # The AddXY output is already in WGS 1984; the admin layer is projected to match (cached)
+            projected_admin = shared_cache.project(admin_shapefile, arcpy.SpatialReference(4326))
+            # read_points returns every shape, deleted records included, so both sides drop them together
+            live = spatial_index.live_records(in_points)
+            xy = spatial_index.read_points(in_points)[live]
+            risk_factor = DbfReader(in_points).read(["gridcode"], skip_deleted=False)["gridcode"][live]
+            count = spatial_index.join_to_structured_json(xy, risk_factor, projected_admin, out_structured_json, ndjson)
+            arcpy.AddMessage(f"{count} features structured.")
+            arcpy.AddMessage("Structured GeoJSON saved: " + out_structured_json)
+            shared_cache.report()
+        except arcpy.ExecuteError as e:
+            arcpy.AddError(f"Error during the join: {e}")
+            arcpy.AddError(arcpy.GetMessages())
+
+
+class RunPipeline(object):
+    def __init__(self):
+        """Tool for running Steps 1-6 as one chain"""
+        self.label = "Run Steps 1-6: TIFF to Structured JSON"
+        self.description = "Runs the whole conversion chain on one TIFF and an admin-boundary layer, keeping intermediates in a scratch workspace."
+
+    def getParameterInfo(self):
+        """Parameter definitions for the tool"""
+        params = [
+            arcpy.Parameter(displayName="Input TIFF File",
+                            name="in_tiff",
+                            datatype="DERasterDataset",
+                            parameterType="Required",
+                            direction="Input"),
+            arcpy.Parameter(displayName="Admin Boundary Shapefile",
+                            name="admin_shapefile",
+                            datatype="DEShapefile",
+                            parameterType="Required",
+                            direction="Input"),
+            arcpy.Parameter(displayName="Output Structured JSON",
+                            name="out_structured_json",
+                            datatype="DEFile",
+                            parameterType="Required",
+                            direction="Output"),
+            arcpy.Parameter(displayName="Output Format",
+                            name="output_format",
+                            datatype="GPString",
+                            parameterType="Optional",
+                            direction="Input"),
+            arcpy.Parameter(displayName="Scratch Workspace",
+                            name="scratch_workspace",
+                            datatype="DEWorkspace",
+                            parameterType="Optional",
+                            direction="Input"),
+            arcpy.Parameter(displayName="Join Method",
+                            name="join_method",
+                            datatype="GPString",
+                            parameterType="Optional",
+                            direction="Input")
+        ]
+        params[3].filter.type = "ValueList"
+        params[3].filter.list = ["JSON", "NDJSON"]
+        params[3].value = "JSON"
+        # NumPy joins the points to the admin areas in memory instead of AddXY + Intersect
+        params[5].filter.type = "ValueList"
+        params[5].filter.list = ["Intersect", "NumPy"]
+        params[5].value = "Intersect"
+        return params
+
+    def execute(self, parameters, messages):
+        """Execution of the whole conversion chain"""
+        print("Running tool: " + self.label)  # Print statement
+        in_tiff = parameters[0].valueAsText
+        admin_shapefile = parameters[1].valueAsText
+        out_structured_json = parameters[2].valueAsText
+        ndjson = parameters[3].valueAsText == "NDJSON"
+        scratch_workspace = parameters[4].valueAsText or "in_memory"
+        join_method = parameters[5].valueAsText or "Intersect"
+
+        # Check if the inputs exist and are valid
+        if not arcpy.Exists(in_tiff):
+            arcpy.AddError("Input TIFF file does not exist or is invalid.")
+            return
+        if not arcpy.Exists(admin_shapefile):
+            arcpy.AddError("Admin boundary shapefile does not exist or is invalid.")
+            return
+
+        try:
+            run_pipeline(in_tiff, admin_shapefile, out_structured_json, ndjson=ndjson,
+                         scratch_workspace=scratch_workspace, join_method=join_method)
+        except arcpy.ExecuteError as e:
+            arcpy.AddError(f"Error during pipeline: {e}")
+            arcpy.AddError(arcpy.GetMessages())
+        except RuntimeError as e:
+            arcpy.AddError(f"Error during pipeline: {e}")
+
+
+def run_pipeline(in_tiff, admin_shapefile, out_structured_json, fields_to_delete=None, ndjson=False,
+                 scratch_workspace="in_memory", join_method="Intersect"):
+    """Run Steps 1-6 in one pass and return the time spent in each stage.
+
+    Intermediates live in scratch_workspace (in_memory by default) and are deleted when the run
+    ends, the points are projected on the fly while they are created, and the structured JSON is
+    written straight from a cursor, so the Step 5 GeoJSON file is never written or re-read. With
+    join_method="NumPy", AddXY and Intersect are replaced by spatial_index.join_to_structured_json
+    on the points read into memory.
+    """
+    timings = {}
+    stage_start = time.perf_counter()
+
+    def end_stage(name):
+        nonlocal stage_start
+        timings[name] = time.perf_counter() - stage_start
+        arcpy.AddMessage(f"{name}: {timings[name]:.2f} s")
+        stage_start = time.perf_counter()
+
+    coord_system = arcpy.SpatialReference(4326)  # WGS 1984
+    # A folder workspace holds shapefiles, so the intermediates need the .shp extension there
+    extension = ""
+    if scratch_workspace != "in_memory" and arcpy.Describe(scratch_workspace).workspaceType == "FileSystem":
+        extension = ".shp"
+    risk_polygons = os.path.join(scratch_workspace, "risk_polygons" + extension)
+    risk_points = os.path.join(scratch_workspace, "risk_points" + extension)
+    risk_admin = os.path.join(scratch_workspace, "risk_admin" + extension)
+    intermediates = [risk_polygons, risk_points, risk_admin]
+
+    try:
+        # Leftovers from an interrupted run would make the tools below fail
+        delete_intermediates(intermediates)
+
+        # Step 1: TIFF to polygons
+        arcpy.RasterToPolygon_conversion(in_tiff, risk_polygons, "NO_SIMPLIFY", "VALUE")
+        end_stage("Step 1: TIFF to polygons")
+
+        # Step 2: polygons to points, projected to WGS 1984 as they are written
+        with arcpy.EnvManager(outputCoordinateSystem=coord_system):
+            arcpy.FeatureToPoint_management(risk_polygons, risk_points)
+        projected_admin = shared_cache.project(admin_shapefile, coord_system)
+
+        if join_method == "NumPy":
+            # Steps 3-6: the point coordinates are the XY, so AddXY, Intersect and Clean are not needed
+            points = arcpy.da.FeatureClassToNumPyArray(risk_points, ["SHAPE@X", "SHAPE@Y", "gridcode"])
+            end_stage("Step 2: Feature to points")
+            xy = np.column_stack([points["SHAPE@X"], points["SHAPE@Y"]])
+            count = spatial_index.join_to_structured_json(xy, points["gridcode"], projected_admin,
+                                                          out_structured_json, ndjson)
+            end_stage("Steps 3-6: NumPy join to structured JSON")
+            arcpy.AddMessage(f"Pipeline complete: {count} features saved to {out_structured_json}")
+            arcpy.AddMessage(f"Total time: {sum(timings.values()):.2f} s")
+            shared_cache.report()
+            return timings
+
+        arcpy.AddXY_management(risk_points)
+        end_stage("Step 2: Add XY coordinates")
+
+        # Step 3: intersect with the admin boundaries (projected once through the shared cache)
+        arcpy.Intersect_analysis([risk_points, projected_admin], risk_admin)
+        end_stage("Step 3: Intersect")
+
+        # Step 4: only needed when the intermediate is kept; the cursor below reads just the structured fields
+        if fields_to_delete:
+            arcpy.DeleteField_management(risk_admin, fields_to_delete)
+            end_stage("Step 4: Clean")
+
+        # Steps 5 and 6: write the structured JSON straight from the intersected features
+        # Names the admin layer does not have (e.g. NAME_3 for a level 2 layer) are written as null
+        fields = [field for field, _ in structured_json.STRUCTURED_FIELDS]
+        present = {field.name for field in arcpy.ListFields(risk_admin)}
+        cursor_fields = [field for field in fields if field in present]
+        missing = dict.fromkeys(field for field in fields if field not in present)
+        with arcpy.da.SearchCursor(risk_admin, cursor_fields) as cursor, open(out_structured_json, 'w') as file:
+            entries = (structured_json.structure_feature({**missing, **dict(zip(cursor_fields, row))})
+                       for row in cursor)
+            count = structured_json.write_structured_json(entries, file, ndjson)
+        end_stage("Steps 5-6: Structured JSON")
+    finally:
+        delete_intermediates(intermediates)
+
+    arcpy.AddMessage(f"Pipeline complete: {count} features saved to {out_structured_json}")
+    arcpy.AddMessage(f"Total time: {sum(timings.values()):.2f} s")
+    shared_cache.report()
+    return timings
+
+
+def delete_intermediates(intermediates):
+    """Delete the pipeline intermediates that exist, in memory or on disk"""
+    for intermediate in intermediates:
+        if arcpy.Exists(intermediate):
+            arcpy.Delete_management(intermediate)
+
+
 def main():
     """Main function to run the toolbox"""
+    # python ConversionBundleToolbox.py <in_tiff> <admin_shapefile> <out_structured_json> [Intersect|NumPy]
+    # runs the whole chain
+    if len(sys.argv) in (4, 5):
+        run_pipeline(sys.argv[1], sys.argv[2], sys.argv[3], join_method=sys.argv[4] if len(sys.argv) == 5 else "Intersect")
+        return
+
     toolbox = Toolbox()
     for tool_class in toolbox.tools:
         tool = tool_class()
@@ -410,4 +725,3 @@ def main():
 
 if __name__ == '__main__':
     main()
-
@@ -0,0 +1,82 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import structured_json
+
+# Number of synthetic features written to the benchmark input
+feature_counts = [10000, 100000, 500000]
+
+
+def write_sample_featureset(path, count):
+    """Write an Esri JSON FeatureSet shaped like the ShapefileToGeoJSON output"""
+    header = {"displayFieldName": "", "geometryType": "esriGeometryPoint",
+              "spatialReference": {"wkid": 4326, "latestWkid": 4326},
+              "fields": [{"name": name, "type": "esriFieldTypeString"}
+                         for name, _ in structured_json.STRUCTURED_FIELDS]}
+    with open(path, 'w') as file:
+        file.write(json.dumps(header, indent=2)[:-2] + ',\n  "features": [\n')
+        for i in range(count):
+            x, y = 34.0 + (i % 1000) * 0.001, -1.0 + (i // 1000) * 0.001
+            feature = {"attributes": {"NAME_1": "County %d" % (i % 47),
+                                      "NAME_2": "Constituency %d" % (i % 290),
+                                      "NAME_3": "Ward %d" % (i % 1450),
+                                      "gridcode": i % 5, "POINT_X": x, "POINT_Y": y},
+                       "geometry": {"x": x, "y": y}}
+            file.write(("    " if i == 0 else ",\n    ") + json.dumps(feature))
+        file.write("\n  ]\n}\n")
+
+
+def run_mode(mode, in_path, out_path):
+    """Run one conversion in this process and print wall time and peak RSS as JSON"""
+    start = time.perf_counter()
+    if mode == "streaming":
+        structured_json.convert_streaming(in_path, out_path)
+    else:
+        structured_json.convert_in_memory(in_path, out_path)
+    elapsed = time.perf_counter() - start
+    try:
+        import resource
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak_mb = peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        # Windows has no resource module, fall back to the peak working set through psutil
+        import psutil
+        peak_mb = psutil.Process().memory_info().peak_wset / (1024 * 1024)
+    print(json.dumps({"seconds": elapsed, "peak_mb": peak_mb}))
+
+
+def measure(mode, in_path, out_path):
+    # Each mode runs in a fresh interpreter so the peak RSS of one does not hide the other
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), mode, in_path, out_path],
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4:
+        run_mode(*sys.argv[1:])
+        sys.exit()
+
+    temp_dir = tempfile.mkdtemp()
+    print(f"{'Features':>10} {'Input MB':>9} {'Mode':>10} {'Seconds':>8} {'Peak MB':>8}")
+    for count in feature_counts:
+        in_path = os.path.join(temp_dir, f"features_{count}.json")
+        write_sample_featureset(in_path, count)
+        size_mb = os.path.getsize(in_path) / (1024 * 1024)
+        outputs = {}
+        for mode in ["in_memory", "streaming"]:
+            outputs[mode] = os.path.join(temp_dir, f"structured_{mode}_{count}.json")
+            stats = measure(mode, in_path, outputs[mode])
+            print(f"{count:>10} {size_mb:>9.1f} {mode:>10} {stats['seconds']:>8.2f} {stats['peak_mb']:>8.1f}")
+        # Both paths must write the same file
+        with open(outputs["in_memory"]) as a, open(outputs["streaming"]) as b:
+            if a.read() != b.read():
+                print("Warning: streaming output differs from the in-memory output.")
+        for path in [in_path] + list(outputs.values()):
+            os.remove(path)
+    os.rmdir(temp_dir)
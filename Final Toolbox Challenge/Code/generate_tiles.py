@@ -0,0 +1,38 @@
+import os
+import sys
+import time
+import zipfile
+
+from tile_pyramid import TileCache, generate_pyramid, import_tree
+
+# Renders the cholera risk raster into a Web Mercator z/x/y pyramid for web maps.
+# Usage: python generate_tiles.py [raster.tif] [min zoom] [max zoom]
+code_folder = os.path.dirname(os.path.abspath(__file__))
+data_folder = os.path.join(code_folder, "..", "Data")
+repository = os.path.join(code_folder, "..", "..")
+raster_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(data_folder, "trial1_040124_Kenya.tif")
+min_zoom = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+max_zoom = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+cache_folder = os.path.join(repository, "CholeraRiskCache")  # hash -> PNG objects plus the z/x/y index
+tile_folder = os.path.join(repository, "CholeraRiskTiles")  # plain z/x/y.png tree linked to the cache
+deduplicate_existing = True  # also report the duplicates in the hand-built CholeraRisk tree
+
+if __name__ == "__main__":
+    # The raster is shipped zipped with its attribute table
+    if not os.path.exists(raster_path) and os.path.exists(raster_path + ".vat.zip"):
+        with zipfile.ZipFile(raster_path + ".vat.zip") as archive:
+            archive.extractall(os.path.dirname(raster_path))
+
+    if deduplicate_existing:
+        existing = TileCache(os.path.join(cache_folder, "existing"))
+        tiles, distinct = import_tree(os.path.join(repository, "CholeraRisk"), existing)
+        existing.save()
+        print(f"CholeraRisk: {tiles} tiles, {distinct} distinct images.")
+
+    start = time.perf_counter()
+    cache, counts = generate_pyramid(raster_path, cache_folder, range(min_zoom, max_zoom + 1))
+    removed = cache.prune()
+    stale = cache.export_tree(tile_folder)
+    print(f"Zoom {min_zoom}-{max_zoom}: {len(cache.index)} tiles, " +
+          ", ".join(f"{count} {name}" for name, count in counts.items()) +
+          f", {removed} unused images and {stale} stale tiles removed in {time.perf_counter() - start:.1f} s.")
@@ -0,0 +1,142 @@
+import arcpy
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+# Files that make up one shapefile dataset; a change to any of them invalidates a cached projection
+SHAPEFILE_PARTS = [".shp", ".shx", ".dbf", ".prj", ".cpg"]
+
+
+class ProjectionCache(object):
+    """Content-addressed cache of reprojected shapefiles shared by all toolbox tools"""
+
+    def __init__(self, cache_dir=None, max_bytes=2 * 1024 ** 3, hash_contents=False):
+        self.cache_dir = cache_dir or os.path.join(tempfile.gettempdir(), "conversion_toolbox_projections")
+        self.max_bytes = max_bytes
+        # Hashing file contents survives copies that keep the data but change the timestamps
+        self.hash_contents = hash_contents
+        self.index_path = os.path.join(self.cache_dir, "index.json")
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+        self.index = self._load_index()
+
+    def _load_index(self):
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, 'r') as file:
+                    return json.load(file)
+            except ValueError:
+                print("Projection cache index is corrupt, starting a new one.")
+        return {}
+
+    def _save_index(self):
+        temp_path = self.index_path + ".tmp"
+        with open(temp_path, 'w') as file:
+            json.dump(self.index, file, indent=2)
+        os.replace(temp_path, self.index_path)
+
+    def _source_signature(self, in_dataset, sha):
+        # Returns the number of files signed; 0 for geodatabase and in_memory inputs
+        base = os.path.splitext(os.path.abspath(in_dataset))[0]
+        sha.update(os.path.normcase(base).encode("utf-8"))
+        found = 0
+        for extension in SHAPEFILE_PARTS:
+            part = base + extension
+            if not os.path.exists(part):
+                continue
+            found += 1
+            stat = os.stat(part)
+            sha.update(f"{extension}:{stat.st_size}".encode("utf-8"))
+            if self.hash_contents:
+                with open(part, 'rb') as file:
+                    for block in iter(lambda: file.read(1024 * 1024), b""):
+                        sha.update(block)
+            else:
+                sha.update(str(stat.st_mtime_ns).encode("utf-8"))
+        return found
+
+    def cache_key(self, in_dataset, spatial_reference):
+        """Key built from the input files (path, size and mtime or contents) and the target spatial reference.
+
+        None when in_dataset is not a shapefile on disk: a feature class in a geodatabase or
+        in_memory has no files whose changes could be detected, so it is never cached.
+        """
+        sha = hashlib.sha1()
+        if not self._source_signature(in_dataset, sha):
+            return None
+        if spatial_reference.factoryCode:
+            sha.update(f"wkid:{spatial_reference.factoryCode}".encode("utf-8"))
+        else:
+            sha.update(spatial_reference.exportToString().encode("utf-8"))
+        return sha.hexdigest()
+
+    def project(self, in_dataset, spatial_reference):
+        """Return the path of in_dataset projected to spatial_reference, projecting only on a cache miss"""
+        key = self.cache_key(in_dataset, spatial_reference)
+        if key is None:
+            projected = arcpy.CreateUniqueName("projected", arcpy.env.scratchGDB)
+            arcpy.Project_management(in_dataset, projected, spatial_reference)
+            arcpy.AddMessage(f"{in_dataset} is not a shapefile, projected without caching")
+            return projected
+        entry = self.index.get(key)
+        if entry and arcpy.Exists(entry["path"]):
+            self.hits += 1
+            entry["last_used"] = time.time()
+            self._save_index()
+            arcpy.AddMessage(f"Projection cache hit for {in_dataset}")
+            return entry["path"]
+
+        self.misses += 1
+        entry_dir = os.path.join(self.cache_dir, key)
+        if os.path.exists(entry_dir):
+            shutil.rmtree(entry_dir, ignore_errors=True)
+        os.makedirs(entry_dir)
+        projected = os.path.join(entry_dir, "projected.shp")
+        try:
+            arcpy.Project_management(in_dataset, projected, spatial_reference)
+        except arcpy.ExecuteError:
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            raise
+        size = sum(os.path.getsize(os.path.join(entry_dir, name)) for name in os.listdir(entry_dir))
+        self.index[key] = {"source": os.path.abspath(in_dataset), "path": projected,
+                           "size": size, "last_used": time.time()}
+        self._evict(keep=key)
+        self._save_index()
+        arcpy.AddMessage(f"Projection cache miss for {in_dataset}, projected copy stored")
+        return projected
+
+    def _evict(self, keep=None):
+        # Remove least recently used entries until the cache fits in max_bytes
+        total = sum(entry["size"] for entry in self.index.values())
+        for key in sorted(self.index, key=lambda k: self.index[k]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            total -= self.index[key]["size"]
+            shutil.rmtree(os.path.join(self.cache_dir, key), ignore_errors=True)
+            del self.index[key]
+            self.evictions += 1
+
+    def clear(self):
+        """Delete every cached projection"""
+        for key in list(self.index):
+            shutil.rmtree(os.path.join(self.cache_dir, key), ignore_errors=True)
+        self.index = {}
+        self._save_index()
+
+    def report(self):
+        """Report hit/miss counters through the geoprocessing messages"""
+        total_mb = sum(entry["size"] for entry in self.index.values()) / (1024 * 1024)
+        arcpy.AddMessage(f"Projection cache: {self.hits} hits, {self.misses} misses, "
+                         f"{self.evictions} evictions, {len(self.index)} entries ({total_mb:.1f} MB)")
+
+
+# Single cache shared by every tool in the toolbox
+shared_cache = ProjectionCache()
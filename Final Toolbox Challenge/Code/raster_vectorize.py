@@ -0,0 +1,322 @@
+import numpy as np
+
+from shapefile_io import POLYGON, ShapefileWriter
+
+# Edge directions in grid coordinates (column right, row down): East, South, West, North
+DIRECTION_STEPS = np.array([[1, 0], [0, 1], [-1, 0], [0, -1]])
+
+
+def resolve_roots(parent, pairs_a, pairs_b):
+    """Union-find over integer ids, vectorized with hooking and pointer jumping.
+
+    Every pair (a, b) is merged; returns an array mapping each id to the smallest id of its set.
+    """
+    parent = parent.copy()
+    while True:
+        root_a = parent[pairs_a]
+        root_b = parent[pairs_b]
+        low = np.minimum(root_a, root_b)
+        high = np.maximum(root_a, root_b)
+        changed = low != high
+        if not changed.any():
+            return parent
+        # Hook the larger root under the smaller one, then compress every path fully
+        np.minimum.at(parent, high[changed], low[changed])
+        while True:
+            grand_parent = parent[parent]
+            if np.array_equal(grand_parent, parent):
+                break
+            parent = grand_parent
+
+
+def label_regions(values, valid):
+    """Label 4-connected regions of equal-valued cells; invalid (NoData) cells get -1.
+
+    Returns the label array (0 .. count - 1) and the number of regions.
+    """
+    rows, cols = values.shape
+    ids = np.arange(rows * cols, dtype=np.int64).reshape(rows, cols)
+    same_right = (values[:, :-1] == values[:, 1:]) & valid[:, :-1] & valid[:, 1:]
+    same_down = (values[:-1, :] == values[1:, :]) & valid[:-1, :] & valid[1:, :]
+    pairs_a = np.concatenate([ids[:, :-1][same_right], ids[:-1, :][same_down]])
+    pairs_b = np.concatenate([ids[:, 1:][same_right], ids[1:, :][same_down]])
+    roots = resolve_roots(np.arange(rows * cols, dtype=np.int64), pairs_a, pairs_b)
+
+    labels = np.full(rows * cols, -1, dtype=np.int64)
+    flat_valid = valid.ravel()
+    unique_roots, compact = np.unique(roots[flat_valid], return_inverse=True)
+    labels[flat_valid] = compact
+    return labels.reshape(rows, cols), len(unique_roots)
+
+
+def boundary_edges(window, window_valid, labels, row0, col0):
+    """Directed boundary edges of the core of a window read with a one-cell halo.
+
+    Each edge keeps its region on the right-hand side when walked in grid coordinates.
+    Returns (start_col, start_row, direction, label) arrays in global grid coordinates.
+    """
+    core = window[1:-1, 1:-1]
+    core_valid = window_valid[1:-1, 1:-1]
+    rows, cols = core.shape
+    grid_rows, grid_cols = np.mgrid[0:rows, 0:cols]
+    grid_rows += row0
+    grid_cols += col0
+
+    # Neighbour above, right, below and left of every core cell, with the corner the edge starts from
+    sides = [(window[:-2, 1:-1], window_valid[:-2, 1:-1], 0, 0, 0),
+             (window[1:-1, 2:], window_valid[1:-1, 2:], 1, 1, 0),
+             (window[2:, 1:-1], window_valid[2:, 1:-1], 2, 1, 1),
+             (window[1:-1, :-2], window_valid[1:-1, :-2], 3, 0, 1)]
+    start_cols, start_rows, directions, edge_labels = [], [], [], []
+    for neighbour, neighbour_valid, direction, col_offset, row_offset in sides:
+        is_edge = core_valid & ~(neighbour_valid & (neighbour == core))
+        count = int(is_edge.sum())
+        start_cols.append(grid_cols[is_edge] + col_offset)
+        start_rows.append(grid_rows[is_edge] + row_offset)
+        directions.append(np.full(count, direction, dtype=np.int8))
+        edge_labels.append(labels[is_edge])
+    return (np.concatenate(start_cols), np.concatenate(start_rows),
+            np.concatenate(directions), np.concatenate(edge_labels))
+
+
+def chain_rings(start_cols, start_rows, directions, labels):
+    """Link boundary edges into closed rings.
+
+    At a vertex shared by two diagonal cells of the same region the walk turns right, so it keeps
+    hugging the current cell and rings only touch there instead of crossing.
+    Returns the edge order, the ring id of every ordered edge and a corner mask (direction changes).
+    """
+    vertex_cols = int(start_cols.max()) + 2 if len(start_cols) else 1
+    vertex = start_rows.astype(np.int64) * vertex_cols + start_cols
+    keys = vertex * 4 + directions
+    order = np.argsort(keys)
+    sorted_keys = keys[order]
+
+    end_vertex = vertex + DIRECTION_STEPS[directions, 1] * vertex_cols + DIRECTION_STEPS[directions, 0]
+    successor = np.full(len(keys), -1, dtype=np.int64)
+    for turn in [1, 0, 3]:  # right, straight, left
+        pending = successor < 0
+        candidate = end_vertex[pending] * 4 + (directions[pending] + turn) % 4
+        position = np.minimum(np.searchsorted(sorted_keys, candidate), len(sorted_keys) - 1)
+        match = order[position]
+        found = (sorted_keys[position] == candidate) & (labels[match] == labels[pending])
+        pending_index = np.nonzero(pending)[0]
+        successor[pending_index[found]] = match[found]
+    if (successor < 0).any():
+        raise ValueError("Boundary edges do not form closed rings.")
+
+    # Ring id = smallest edge index on the cycle, found by doubling the successor jumps
+    ring = np.arange(len(keys), dtype=np.int64)
+    jump = successor.copy()
+    for _ in range(int(np.ceil(np.log2(max(len(keys), 2)))) + 1):
+        ring = np.minimum(ring, ring[jump])
+        jump = jump[jump]
+
+    # Cut every ring before its first edge and rank edges by their distance to the cut (list ranking)
+    is_last = successor == ring
+    next_edge = np.where(is_last, np.arange(len(keys)), successor)
+    distance = (~is_last).astype(np.int64)
+    while True:
+        following = next_edge[next_edge]
+        if np.array_equal(following, next_edge):
+            break
+        distance += distance[next_edge]
+        next_edge = following
+    edge_order = np.lexsort((-distance, ring))
+
+    ordered_ring = ring[edge_order]
+    ordered_direction = directions[edge_order]
+    previous_direction = np.roll(ordered_direction, 1)
+    ring_start = np.ones(len(edge_order), dtype=bool)
+    ring_start[1:] = ordered_ring[1:] != ordered_ring[:-1]
+    # The previous edge of a ring's first edge is that ring's last edge
+    ring_end = np.roll(ring_start, -1)
+    previous_direction[ring_start] = ordered_direction[ring_end]
+    corner = ordered_direction != previous_direction
+    return edge_order, ordered_ring, corner
+
+
+def simplify_ring(points, tolerance):
+    """Douglas-Peucker simplification of a closed ring given as an (n, 2) array without the closing point"""
+    if tolerance <= 0 or len(points) <= 4:
+        return points
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = True
+    # Split the ring at the point farthest from the first one so both halves are open lines
+    far = int(np.argmax(((points - points[0]) ** 2).sum(axis=1)))
+    keep[far] = True
+    closed = np.vstack([points, points[:1]])
+    stack = [(0, far), (far, len(points))]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        segment = closed[last] - closed[first]
+        offsets = closed[first + 1:last] - closed[first]
+        length = np.hypot(*segment)
+        if length == 0:
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        else:
+            distances = np.abs(segment[0] * offsets[:, 1] - segment[1] * offsets[:, 0]) / length
+        index = int(np.argmax(distances))
+        if distances[index] > tolerance:
+            middle = first + 1 + index
+            keep[middle] = True
+            stack.extend([(first, middle), (middle, last)])
+    simplified = points[keep]
+    # A ring needs at least three distinct corners
+    return simplified if len(simplified) >= 3 else points
+
+
+def array_window_reader(array):
+    """Window reader over an in-memory array, for vectorize_tiles"""
+    return lambda row0, row1, col0, col1: array[row0:row1, col0:col1]
+
+
+def _region_rings(start_cols, start_rows, directions, edge_labels, region_values):
+    # Chain the edges of complete regions into rings and yield (value, rings) per region
+    edge_order, ordered_ring, corner = chain_rings(start_cols, start_rows, directions, edge_labels)
+
+    # Keep only the corners of every ring and group the rings by region
+    corner_edges = edge_order[corner]
+    corner_ring = ordered_ring[corner]
+    points = np.column_stack([start_cols[corner_edges], start_rows[corner_edges]]).astype(np.float64)
+    ring_bounds = np.flatnonzero(np.diff(corner_ring)) + 1
+    ring_starts = np.concatenate([[0], ring_bounds])
+    ring_ends = np.concatenate([ring_bounds, [len(corner_ring)]])
+    ring_labels = edge_labels[corner_edges[ring_starts]]
+    for label_order in np.split(np.argsort(ring_labels, kind="stable"),
+                                np.flatnonzero(np.diff(np.sort(ring_labels))) + 1):
+        label = ring_labels[label_order[0]]
+        rings = [points[ring_starts[i]:ring_ends[i]] for i in label_order]
+        yield region_values[label], rings
+
+
+def vectorize_tiles(read_window, shape, nodata=None, tile_size=2048):
+    """Vectorize a raster into one polygon per 4-connected region of equal values.
+
+    read_window(row0, row1, col0, col1) returns that window of the raster. Tiles are read one at
+    a time with a one-cell halo. Regions cut by tile seams are merged by joining their labels
+    across the seam; edges between equal cells on either side of a seam are never emitted.
+    After each tile, the regions that no longer touch a seam with an unread tile are chained
+    into rings and yielded, so only the edges of regions still open along the current tile row
+    are carried forward. Yields (value, rings) per region with rings as (n, 2) arrays of
+    (col, row) grid corners.
+    """
+    rows, cols = shape
+    # Edges and values of the regions still open, and the region count; labels are kept compact
+    pending = [np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int8),
+               np.zeros(0, dtype=np.int64)]
+    region_values = None
+    label_count = 0
+    # Labels along the bottom row / right column of read tiles, waiting for their neighbours
+    bottom_labels, right_labels = {}, {}
+
+    for row0 in range(0, rows, tile_size):
+        row1 = min(row0 + tile_size, rows)
+        for col0 in range(0, cols, tile_size):
+            col1 = min(col0 + tile_size, cols)
+            # Read the tile with a one-cell halo, padding with NoData outside the raster
+            halo_row0, halo_row1 = max(row0 - 1, 0), min(row1 + 1, rows)
+            halo_col0, halo_col1 = max(col0 - 1, 0), min(col1 + 1, cols)
+            data = np.asarray(read_window(halo_row0, halo_row1, halo_col0, halo_col1))
+            window = np.zeros((row1 - row0 + 2, col1 - col0 + 2), dtype=data.dtype)
+            window_valid = np.zeros(window.shape, dtype=bool)
+            top, left = 1 - (row0 - halo_row0), 1 - (col0 - halo_col0)
+            window[top:top + data.shape[0], left:left + data.shape[1]] = data
+            data_valid = np.ones(data.shape, dtype=bool)
+            if nodata is not None:
+                data_valid &= data != nodata
+            if np.issubdtype(data.dtype, np.floating):
+                data_valid &= ~np.isnan(data)
+            window_valid[top:top + data.shape[0], left:left + data.shape[1]] = data_valid
+
+            core = window[1:-1, 1:-1]
+            core_valid = window_valid[1:-1, 1:-1]
+            local_labels, count = label_regions(core, core_valid)
+            labels = np.where(local_labels >= 0, local_labels + label_count, -1)
+            values = np.zeros(count, dtype=core.dtype)
+            values[local_labels[core_valid]] = core[core_valid]
+            region_values = values if region_values is None else np.concatenate([region_values, values])
+            label_count += count
+
+            # Join regions that continue into the tile above and the tile to the left
+            seam_a, seam_b = [], []
+            above = bottom_labels.pop((row0 - tile_size, col0), None)
+            if above is not None:
+                same = core_valid[0] & window_valid[0, 1:-1] & (core[0] == window[0, 1:-1])
+                seam_a.append(labels[0][same])
+                seam_b.append(above[same])
+            before = right_labels.pop((row0, col0 - tile_size), None)
+            if before is not None:
+                same = core_valid[:, 0] & window_valid[1:-1, 0] & (core[:, 0] == window[1:-1, 0])
+                seam_a.append(labels[:, 0][same])
+                seam_b.append(before[same])
+            if row1 < rows:
+                bottom_labels[(row0, col0)] = labels[-1].copy()
+            if col1 < cols:
+                right_labels[(row0, col0)] = labels[:, -1].copy()
+
+            edges = boundary_edges(window, window_valid, labels, row0, col0)
+            pending = [np.concatenate([old, new]) for old, new in zip(pending, edges)]
+            if label_count == 0:
+                continue
+            roots = np.arange(label_count, dtype=np.int64)
+            if seam_a:
+                roots = resolve_roots(roots, np.concatenate(seam_a), np.concatenate(seam_b))
+            # -1 (NoData) maps to itself through the appended entry
+            roots = np.append(roots, -1)
+            seams = list(bottom_labels.values()) + list(right_labels.values())
+            open_labels = np.zeros(label_count + 1, dtype=bool)
+            for seam in seams:
+                open_labels[roots[seam]] = True
+            open_labels[-1] = False
+            edge_labels = roots[pending[3]]
+            done = ~open_labels[edge_labels]
+            if done.any():
+                yield from _region_rings(pending[0][done], pending[1][done], pending[2][done],
+                                         edge_labels[done], region_values)
+
+            # Renumber the open regions 0 .. k - 1 so the label space does not grow with the raster
+            kept = np.flatnonzero(open_labels[:-1])
+            compact = np.full(label_count + 1, -1, dtype=np.int64)
+            compact[kept] = np.arange(len(kept))
+            pending = [part[~done] for part in pending[:3]] + [compact[edge_labels[~done]]]
+            for seam_labels in (bottom_labels, right_labels):
+                for key, seam in seam_labels.items():
+                    seam_labels[key] = compact[roots[seam]]
+            region_values = region_values[kept]
+            label_count = len(kept)
+
+
+def ring_area(ring):
+    """Signed shoelace area of a ring (positive when counter-clockwise with y pointing up)"""
+    x, y = ring[:, 0], ring[:, 1]
+    return 0.5 * float(np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y))
+
+
+def vectorize_to_shapefile(read_window, shape, transform, out_shapefile, nodata=None,
+                           simplify_tolerance=0.0, tile_size=2048, prj_wkt=None):
+    """Write one polygon per region to out_shapefile with the Id and gridcode fields of RasterToPolygon.
+
+    transform is (x_min, y_max, cell_width, cell_height) of the raster's top-left corner.
+    simplify_tolerance is in map units; 0 keeps the exact cell outlines (NO_SIMPLIFY). Simplification
+    is done per polygon, so shared boundaries of neighbouring polygons may no longer match exactly.
+    Like RasterToPolygon, the raster is expected to hold integer values.
+    Returns the number of polygons written.
+    """
+    x_min, y_max, cell_width, cell_height = transform
+    fields = [("Id", "N", 10, 0), ("gridcode", "N", 10, 0)]
+    count = 0
+    with ShapefileWriter(out_shapefile, POLYGON, fields, prj_wkt) as writer:
+        for value, rings in vectorize_tiles(read_window, shape, nodata, tile_size):
+            parts = []
+            for ring in rings:
+                coords = np.column_stack([x_min + ring[:, 0] * cell_width, y_max - ring[:, 1] * cell_height])
+                # Flipping rows to map y turns the rings clockwise for exteriors and counter-clockwise
+                # for holes, as shapefiles expect
+                coords = simplify_ring(coords, simplify_tolerance)
+                parts.append([tuple(point) for point in np.vstack([coords, coords[:1]])])
+            count += 1
+            writer.write(parts, [count, value.item()])
+    return count
@@ -0,0 +1,364 @@
+import os
+
+import numpy as np
+
+import structured_json
+from dbf_reader import DbfReader
+from shapefile_io import POINT, ShapefileWriter, read_points, read_polygons, read_shape_type
+
+# Point and polygon shape types, including the Z and M variants
+POINT_TYPES = (1, 11, 21)
+POLYGON_TYPES = (5, 15, 25)
+
+
+def _expand(start, count):
+    """Concatenation of the ranges start[i] .. start[i] + count[i] - 1, without a Python loop"""
+    ends = np.cumsum(count)
+    return np.repeat(start - ends + count, count) + np.arange(ends[-1] if len(ends) else 0)
+
+
+def _overlaps(boxes, others):
+    return ((boxes[:, 0] <= others[:, 2]) & (others[:, 0] <= boxes[:, 2]) &
+            (boxes[:, 1] <= others[:, 3]) & (others[:, 1] <= boxes[:, 3]))
+
+
+def _str_order(boxes, capacity):
+    # Sort-Tile-Recursive: cut into vertical slices by x, then sort each slice by y
+    with np.errstate(invalid="ignore"):
+        centre_x = (boxes[:, 0] + boxes[:, 2]) / 2.0
+        centre_y = (boxes[:, 1] + boxes[:, 3]) / 2.0
+    nodes = -(-len(boxes) // capacity)
+    slice_size = capacity * int(np.ceil(np.sqrt(nodes)))
+    by_x = np.argsort(centre_x, kind="stable")
+    return np.concatenate([chunk[np.argsort(centre_y[chunk], kind="stable")]
+                           for chunk in np.split(by_x, np.arange(slice_size, len(by_x), slice_size))])
+
+
+class STRTree(object):
+    """Static R-tree over bounding boxes, packed with Sort-Tile-Recursive.
+
+    levels[0] groups the item boxes into leaves of up to `capacity` entries, each higher level
+    groups the nodes below it, and the last level is the root. Every node stores the bounding box
+    of its children and the contiguous range (start, count) they occupy in the level below.
+    Queries walk all query boxes down the tree together, level by level, as arrays of candidate pairs.
+    """
+
+    def __init__(self, item_boxes, items, levels):
+        self.item_boxes = item_boxes
+        self.items = items
+        self.levels = levels
+
+    @classmethod
+    def build(cls, boxes, capacity=16):
+        boxes = np.asarray(boxes, dtype=np.float64)
+        order = _str_order(boxes, capacity) if len(boxes) else np.zeros(0, dtype=np.int64)
+        item_boxes, items = boxes[order], order
+        levels = []
+        child_boxes = item_boxes
+        while True:
+            starts = np.arange(0, len(child_boxes), capacity)
+            counts = np.minimum(capacity, len(child_boxes) - starts)
+            if len(child_boxes):
+                node_boxes = np.column_stack([np.minimum.reduceat(child_boxes[:, 0], starts),
+                                              np.minimum.reduceat(child_boxes[:, 1], starts),
+                                              np.maximum.reduceat(child_boxes[:, 2], starts),
+                                              np.maximum.reduceat(child_boxes[:, 3], starts)])
+            else:
+                node_boxes = np.zeros((0, 4))
+            levels.append([node_boxes, starts, counts])
+            if len(node_boxes) <= 1:
+                break
+            # Pack this level's nodes in STR order before grouping them into the next level
+            order = _str_order(node_boxes, capacity)
+            levels[-1] = [node_boxes[order], starts[order], counts[order]]
+            child_boxes = levels[-1][0]
+        return cls(item_boxes, items, levels)
+
+    def query(self, boxes):
+        """(query index, item index) pairs whose boxes overlap; points are boxes with x_min == x_max"""
+        boxes = np.asarray(boxes, dtype=np.float64)
+        root_boxes = self.levels[-1][0]
+        query_index = np.arange(len(boxes))
+        node = np.zeros(len(boxes), dtype=np.int64)
+        if len(root_boxes) == 0:
+            return query_index[:0], node[:0]
+        keep = _overlaps(boxes, root_boxes[node])
+        query_index, node = query_index[keep], node[keep]
+        for level in range(len(self.levels) - 1, -1, -1):
+            _, starts, counts = self.levels[level]
+            child = _expand(starts[node], counts[node])
+            query_index = np.repeat(query_index, counts[node])
+            child_boxes = self.levels[level - 1][0] if level else self.item_boxes
+            keep = _overlaps(boxes[query_index], child_boxes[child])
+            query_index, node = query_index[keep], child[keep]
+        return query_index, self.items[node]
+
+    def query_points(self, xy):
+        xy = np.asarray(xy, dtype=np.float64)
+        return self.query(np.column_stack([xy, xy]))
+
+    def save(self, path, signature=()):
+        arrays = {"item_boxes": self.item_boxes, "items": self.items, "signature": np.asarray(signature)}
+        for level, (node_boxes, starts, counts) in enumerate(self.levels):
+            arrays[f"boxes_{level}"], arrays[f"starts_{level}"], arrays[f"counts_{level}"] = node_boxes, starts, counts
+        with open(path, 'wb') as file:
+            np.savez(file, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            level_count = sum(1 for name in data.files if name.startswith("boxes_"))
+            levels = [[data[f"boxes_{level}"], data[f"starts_{level}"], data[f"counts_{level}"]]
+                      for level in range(level_count)]
+            return cls(data["item_boxes"], data["items"], levels), tuple(data["signature"].tolist())
+
+
+def file_signature(shapefile):
+    """Size and modification time of the .shp, used to tell whether a saved index is stale"""
+    shp = os.path.splitext(shapefile)[0] + ".shp"
+    return os.path.getsize(shp), os.stat(shp).st_mtime_ns
+
+
+def load_or_build_index(shapefile, boxes=None, capacity=16):
+    """The STR tree of a shapefile's feature boxes, from <name>.strtree.npz next to it if still current.
+
+    A new index is built (from `boxes`, or the boxes read from the .shp) and saved when there is
+    no saved index or the shapefile changed since it was saved.
+    """
+    index_path = os.path.splitext(shapefile)[0] + ".strtree.npz"
+    signature = file_signature(shapefile)
+    if os.path.exists(index_path):
+        try:
+            tree, saved_signature = STRTree.load(index_path)
+            if saved_signature == signature:
+                return tree
+        except (OSError, ValueError, KeyError):
+            pass
+    if boxes is None:
+        boxes = feature_boxes(shapefile)
+    # Null shapes get an empty box (min > max) that overlaps nothing
+    boxes = np.where(np.isnan(boxes), [np.inf, np.inf, -np.inf, -np.inf], boxes)
+    tree = STRTree.build(boxes, capacity)
+    try:
+        tree.save(index_path, signature)
+    except OSError:
+        # A read-only folder only costs the rebuild next time
+        pass
+    return tree
+
+
+class PolygonEdges(object):
+    """Every ring edge of a set of polygons as flat arrays, for vectorised ray casting"""
+
+    def __init__(self, parts):
+        starts, ends, counts = [], [], []
+        for rings in parts:
+            total = 0
+            for ring in rings:
+                starts.append(ring[:-1])
+                ends.append(ring[1:])
+                total += len(ring) - 1
+            counts.append(total)
+        self.count = np.array(counts, dtype=np.int64)
+        self.start = np.concatenate([[0], np.cumsum(self.count)[:-1]]).astype(np.int64)
+        self.x0, self.y0 = np.concatenate(starts).T if starts else (np.zeros(0), np.zeros(0))
+        self.x1, self.y1 = np.concatenate(ends).T if ends else (np.zeros(0), np.zeros(0))
+
+
+def points_in_polygons(xy, point_index, polygon_index, edges, chunk_edges=1 << 22):
+    """True for every (point, polygon) candidate pair where the point is inside the polygon.
+
+    Even-odd ray casting against all rings of the polygon at once, so holes are handled. Pairs are
+    tested in chunks of about chunk_edges point-edge tests to bound memory.
+    """
+    inside = np.zeros(len(point_index), dtype=bool)
+    counts = edges.count[polygon_index]
+    cumulative = np.cumsum(counts)
+    start = 0
+    while start < len(point_index):
+        done = cumulative[start - 1] if start else 0
+        stop = max(int(np.searchsorted(cumulative, done + chunk_edges, side="right")), start + 1)
+        pair_counts = counts[start:stop]
+        edge = _expand(edges.start[polygon_index[start:stop]], pair_counts)
+        pair = np.repeat(np.arange(stop - start), pair_counts)
+        px, py = xy[point_index[start:stop][pair], 0], xy[point_index[start:stop][pair], 1]
+        x0, y0, x1, y1 = edges.x0[edge], edges.y0[edge], edges.x1[edge], edges.y1[edge]
+        straddles = (y0 > py) != (y1 > py)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            crossing_x = x0 + (py - y0) * (x1 - x0) / (y1 - y0)
+        crossings = np.bincount(pair, weights=straddles & (px < crossing_x), minlength=stop - start)
+        inside[start:stop] = crossings % 2 == 1
+        start = stop
+    return inside
+
+
+def live_records(shapefile):
+    """True for every feature whose .dbf record is not marked deleted.
+
+    The .shp keeps the shapes of deleted records, so readers of the .shp must drop them themselves.
+    """
+    return DbfReader(shapefile).records[:, 0] != ord("*")
+
+
+def locate_points(xy, polygons_shapefile):
+    """(point index, polygon FID) of every point of an (n, 2) array that falls inside a polygon.
+
+    Candidates come from the polygon layer's STR tree (saved next to the shapefile); only those
+    are given to the exact ray-casting test. Polygons whose records are deleted are skipped.
+    Pairs are sorted by point, then polygon.
+    """
+    xy = np.asarray(xy, dtype=np.float64)
+    boxes, parts = read_polygons(polygons_shapefile)
+    tree = load_or_build_index(polygons_shapefile, boxes)
+    valid = np.flatnonzero(np.isfinite(xy).all(axis=1))
+    query, polygon = tree.query_points(xy[valid])
+    live = live_records(polygons_shapefile)[polygon]
+    point, polygon = valid[query[live]], polygon[live]
+    inside = points_in_polygons(xy, point, polygon, PolygonEdges(parts))
+    point, polygon = point[inside], polygon[inside]
+    order = np.lexsort((polygon, point))
+    return point[order], polygon[order]
+
+
+def point_polygon_pairs(points_shapefile, polygons_shapefile):
+    """(point FID, polygon FID, point coordinates) of every point of a shapefile inside a polygon.
+
+    Points and polygons whose records are deleted are skipped, as Intersect skips them.
+    """
+    xy = read_points(points_shapefile)
+    # Deleted points get no coordinates, so they are never located
+    xy[~live_records(points_shapefile)] = np.nan
+    point, polygon = locate_points(xy, polygons_shapefile)
+    return point, polygon, xy
+
+
+def join_point_attributes(xy, polygons_shapefile, fields):
+    """Attributes of the polygon each point falls in, for an (n, 2) array of points held in memory.
+
+    Returns (point index, {field: values}) with one entry per (point, polygon) containment, in
+    point order, like the rows of an Intersect of the points with the polygons. Fields the polygon
+    layer does not have are filled with None.
+    """
+    point, polygon = locate_points(xy, polygons_shapefile)
+    reader = DbfReader(polygons_shapefile)
+    names = {name.lower(): name for name in reader.field_names}
+    columns = reader.read([names[field.lower()] for field in fields if field.lower() in names], skip_deleted=False)
+    values = {field: columns[names[field.lower()]][polygon] if field.lower() in names
+              else np.full(len(point), None, dtype=object) for field in fields}
+    return point, values
+
+
+def join_to_structured_json(xy, risk_factor, admin_shapefile, out_structured_json, ndjson=False):
+    """Steps 3-6 in one in-memory pass: point-in-polygon join of the points to the admin areas,
+    written straight to the structured JSON.
+
+    xy is an (n, 2) array of WGS 1984 points and risk_factor their gridcode values. Every point
+    inside an admin polygon becomes one entry, as after Intersect; names the admin layer does not
+    have (e.g. NAME_3 for a level 2 layer) are null. Returns the number of entries.
+    """
+    point_fields = {"gridcode", "POINT_X", "POINT_Y"}
+    admin_fields = [field for field, _ in structured_json.STRUCTURED_FIELDS if field not in point_fields]
+    point, columns = join_point_attributes(xy, admin_shapefile, admin_fields)
+    # Masked (blank) values stay masked and are written as null
+    columns["gridcode"] = np.ma.asarray(risk_factor)[point]
+    columns["POINT_X"], columns["POINT_Y"] = xy[point, 0], xy[point, 1]
+    fields = [field for field, _ in structured_json.STRUCTURED_FIELDS]
+    values = [columns[field].tolist() for field in fields]
+    entries = (structured_json.structure_feature(dict(zip(fields, row))) for row in zip(*values))
+    with open(out_structured_json, 'w') as file:
+        return structured_json.write_structured_json(entries, file, ndjson)
+
+
+def _output_fields(inputs):
+    # Like Intersect: FID_<input> then the input's fields, for each input; repeated names get _1, _2 ...
+    fields, used = [], set()
+    for name, reader in inputs:
+        specs = [("FID_" + name, "N", 10, 0)]
+        for field_name, field_type, length, decimals, _ in reader.fields:
+            if field_type == "I":
+                specs.append((field_name, "N", 11, 0))
+            elif field_type in "NF":
+                specs.append((field_name, "F" if decimals else "N", length, decimals))
+            elif field_type == "D":
+                specs.append((field_name, "C", 10, 0))
+            else:
+                specs.append((field_name, "C", length, 0))
+        for spec in specs:
+            base, suffix, unique = spec[0][:10], 0, spec[0][:10]
+            while unique.upper() in used:
+                suffix += 1
+                unique = base[:10 - len(str(suffix)) - 1] + f"_{suffix}"
+            used.add(unique.upper())
+            fields.append((unique,) + spec[1:])
+    return fields
+
+
+def _attribute_rows(reader, fids):
+    # Attribute values of the given records, in record order, as Python values for ShapefileWriter
+    columns = reader.read(skip_deleted=False)
+    values = []
+    for field_name, field_type, _, _, _ in reader.fields:
+        column = columns[field_name][fids]
+        if field_type == "D":
+            values.append([None if np.isnat(value) else str(value) for value in column])
+        elif column.dtype.kind == "f":
+            values.append([None if np.isnan(value) else value for value in column.tolist()])
+        else:
+            values.append(column.tolist())
+    return [list(row) for row in zip(fids.tolist(), *values)]
+
+
+def intersect_points_with_polygons(points_shapefile, polygons_shapefile, out_shapefile, points_first=True,
+                                   prj_wkt=None):
+    """Point-in-polygon version of Intersect_analysis for a point layer and a polygon layer.
+
+    Writes one point per (point, polygon) containment with the attributes of both inputs in the
+    same order and naming as Intersect (FID_<input>, then the input's fields). Returns the number
+    of points written.
+    """
+    for path, types in ((points_shapefile, POINT_TYPES), (polygons_shapefile, POLYGON_TYPES)):
+        if read_shape_type(path) not in types:
+            raise ValueError(f"{path} does not have the expected shape type.")
+    point_fid, polygon_fid, xy = point_polygon_pairs(points_shapefile, polygons_shapefile)
+    order = np.lexsort((polygon_fid, point_fid)) if points_first else np.lexsort((point_fid, polygon_fid))
+    point_fid, polygon_fid = point_fid[order], polygon_fid[order]
+
+    inputs = [(os.path.splitext(os.path.basename(path))[0], DbfReader(path))
+              for path in (points_shapefile, polygons_shapefile)]
+    point_rows = _attribute_rows(inputs[0][1], point_fid)
+    polygon_rows = _attribute_rows(inputs[1][1], polygon_fid)
+    if not points_first:
+        inputs.reverse()
+    fields = _output_fields(inputs)
+    if prj_wkt is None:
+        prj = os.path.splitext(points_shapefile)[0] + ".prj"
+        if os.path.exists(prj):
+            with open(prj, 'r') as file:
+                prj_wkt = file.read()
+
+    with ShapefileWriter(out_shapefile, POINT, fields, prj_wkt) as writer:
+        for fid, point_row, polygon_row in zip(point_fid.tolist(), point_rows, polygon_rows):
+            record = point_row + polygon_row if points_first else polygon_row + point_row
+            writer.write([[tuple(xy[fid])]], record)
+    return len(point_fid)
+
+
+def feature_boxes(shapefile):
+    """(n, 4) bounding boxes of the features of a shapefile; points are boxes of zero size"""
+    if read_shape_type(shapefile) in POINT_TYPES:
+        xy = read_points(shapefile)
+        return np.column_stack([xy, xy])
+    return read_polygons(shapefile)[0]
+
+
+def candidate_features(shapefile_a, shapefile_b):
+    """FIDs of the features of each layer whose bounding box overlaps a feature box of the other.
+
+    Only these can be part of an intersection, so the exact overlay can skip everything else.
+    The index of shapefile_b is saved next to it for the next run.
+    """
+    boxes_a = feature_boxes(shapefile_a)
+    tree = load_or_build_index(shapefile_b)
+    valid = np.flatnonzero(np.isfinite(boxes_a).all(axis=1))
+    query, item = tree.query(boxes_a[valid])
+    return np.unique(valid[query]), np.unique(item)
@@ -0,0 +1,137 @@
+import json
+import re
+
+# Attribute names read from each Esri JSON feature and their structured names
+STRUCTURED_FIELDS = [("NAME_2", "Constituency"),
+                     ("NAME_1", "County"),
+                     ("NAME_3", "Ward"),
+                     ("gridcode", "Risk Factor"),  # Rename gridcode as risk factor
+                     ("POINT_X", "Longitude"),
+                     ("POINT_Y", "Latitude")]
+
+WHITESPACE = re.compile(r"[ \t\r\n]*")
+
+# Encoders are built once and reused for every entry
+INDENTED_ENCODER = json.JSONEncoder(indent=2)
+LINE_ENCODER = json.JSONEncoder()
+
+
+def structure_feature(attributes):
+    """Map the attributes of one feature to the structured JSON entry"""
+    return {new_name: attributes[field] for field, new_name in STRUCTURED_FIELDS}
+
+
+class _StreamDecoder(object):
+    """Reads JSON values one at a time from a file, keeping only a small buffer in memory"""
+
+    def __init__(self, file_obj, chunk_size):
+        self.file = file_obj
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size):
+        # Drop the consumed part of the buffer before reading more
+        if self.pos:
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        chunk = self.file.read(size)
+        if not chunk:
+            self.eof = True
+        self.buffer += chunk
+
+    def peek(self):
+        """Skip whitespace and return the next character ('' at end of file)"""
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) or self.eof:
+                return self.buffer[self.pos:self.pos + 1]
+            self._fill(self.chunk_size)
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise json.JSONDecodeError(f"Expecting '{char}'", self.buffer, self.pos)
+        self.pos += 1
+
+    def decode(self):
+        """Decode the next complete JSON value, reading more of the file when it is cut off"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # A number at the very end of the buffer may continue in the next chunk
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Grow the read size with the buffer so large features are not re-parsed too often
+            self._fill(max(self.chunk_size, len(self.buffer) - self.pos))
+
+
+def iter_esri_features(file_obj, chunk_size=65536):
+    """Yield the features of an Esri JSON FeatureSet one at a time without loading the whole file"""
+    stream = _StreamDecoder(file_obj, chunk_size)
+    stream.expect("{")
+    if stream.peek() == "}":
+        return
+    while True:
+        key = stream.decode()
+        stream.expect(":")
+        if key == "features":
+            stream.expect("[")
+            if stream.peek() == "]":
+                stream.pos += 1
+            else:
+                while True:
+                    yield stream.decode()
+                    if stream.peek() == "]":
+                        stream.pos += 1
+                        break
+                    stream.expect(",")
+        else:
+            # Other top-level members (fields, spatialReference, ...) are small and skipped
+            stream.decode()
+        if stream.peek() == "}":
+            return
+        stream.expect(",")
+
+
+def write_structured_json(entries, file_obj, ndjson=False):
+    """Write structured entries as they arrive, either as an indented JSON array or as NDJSON"""
+    count = 0
+    for entry in entries:
+        if ndjson:
+            file_obj.write(LINE_ENCODER.encode(entry) + "\n")
+        else:
+            # Same layout as json.dump(list, indent=2), written one entry at a time
+            text = INDENTED_ENCODER.encode(entry).replace("\n", "\n  ")
+            file_obj.write(("[\n  " if count == 0 else ",\n  ") + text)
+        count += 1
+    if not ndjson:
+        file_obj.write("\n]" if count else "[]")
+    return count
+
+
+def convert_streaming(in_geojson, out_structured_json, ndjson=False):
+    """Convert an Esri JSON file to structured JSON feature by feature; returns the feature count"""
+    with open(in_geojson, 'r') as in_file, open(out_structured_json, 'w') as out_file:
+        entries = (structure_feature(feature['attributes']) for feature in iter_esri_features(in_file))
+        return write_structured_json(entries, out_file, ndjson)
+
+
+def convert_in_memory(in_geojson, out_structured_json, ndjson=False):
+    """Convert an Esri JSON file to structured JSON by loading it whole; returns the feature count"""
+    with open(in_geojson, 'r') as file:
+        data = json.load(file)
+    structured_data = [structure_feature(feature['attributes']) for feature in data['features']]
+    with open(out_structured_json, 'w') as file:
+        if ndjson:
+            for entry in structured_data:
+                file.write(json.dumps(entry) + "\n")
+        else:
+            json.dump(structured_data, file, indent=2)
+    return len(structured_data)
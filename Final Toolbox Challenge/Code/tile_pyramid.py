@@ -0,0 +1,292 @@
+import hashlib
+import json
+import math
+import os
+import shutil
+import struct
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from raster_io import open_band
+
+TILE_SIZE = 256
+EARTH_RADIUS = 6378137.0
+ORIGIN_SHIFT = math.pi * EARTH_RADIUS  # Web Mercator x/y of the top-right corner of tile 0/0/0
+MAX_LATITUDE = 85.0511287798
+
+# Colour ramp for the cholera risk classes (0 = low .. 10 = high): (value, (red, green, blue, alpha))
+RISK_COLOURS = [(0, (26, 152, 80, 200)), (3, (145, 207, 96, 200)), (5, (254, 224, 139, 200)),
+                (7, (252, 141, 89, 200)), (10, (215, 48, 39, 200))]
+
+
+def lonlat_to_tile(lon, lat, zoom):
+    """Fractional XYZ tile coordinates of a longitude/latitude at a zoom level"""
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+    n = 2 ** zoom
+    x = (lon + 180.0) / 360.0 * n
+    y = (1.0 - math.log(math.tan(math.radians(lat)) + 1.0 / math.cos(math.radians(lat))) / math.pi) / 2.0 * n
+    return x, y
+
+
+def tile_range(extent, zoom):
+    """(x0, x1, y0, y1) of the tiles covering a (min lon, min lat, max lon, max lat) extent, inclusive"""
+    n = 2 ** zoom
+    x0, y0 = lonlat_to_tile(extent[0], extent[3], zoom)
+    x1, y1 = lonlat_to_tile(extent[2], extent[1], zoom)
+    return (max(int(x0), 0), min(int(math.ceil(x1)) - 1, n - 1),
+            max(int(y0), 0), min(int(math.ceil(y1)) - 1, n - 1))
+
+
+def pixel_lonlat(zoom, x, y):
+    """Longitudes of the pixel columns and latitudes of the pixel rows of a tile (pixel centres)"""
+    resolution = 2 * ORIGIN_SHIFT / (TILE_SIZE * 2 ** zoom)
+    offsets = np.arange(TILE_SIZE) + 0.5
+    mercator_x = (x * TILE_SIZE + offsets) * resolution - ORIGIN_SHIFT
+    mercator_y = ORIGIN_SHIFT - (y * TILE_SIZE + offsets) * resolution
+    lon = np.degrees(mercator_x / EARTH_RADIUS)
+    lat = np.degrees(2 * np.arctan(np.exp(mercator_y / EARTH_RADIUS)) - np.pi / 2)
+    return lon, lat
+
+
+def raster_extent(reader):
+    x_min, y_max, cell_width, cell_height = reader.transform
+    rows, cols = reader.shape
+    return x_min, y_max - rows * cell_height, x_min + cols * cell_width, y_max
+
+
+def sample_indices(reader, zoom, x, y):
+    """Raster row of each tile pixel row and column of each tile pixel column (-1 outside the raster).
+
+    Web Mercator is separable in longitude and latitude, so nearest-neighbour sampling of a
+    geographic raster needs one index vector per axis instead of one index per pixel.
+    """
+    x_min, y_max, cell_width, cell_height = reader.transform
+    rows, cols = reader.shape
+    lon, lat = pixel_lonlat(zoom, x, y)
+    col = np.floor((lon - x_min) / cell_width).astype(np.int64)
+    row = np.floor((y_max - lat) / cell_height).astype(np.int64)
+    col[(col < 0) | (col >= cols)] = -1
+    row[(row < 0) | (row >= rows)] = -1
+    return row, col
+
+
+def colourize(values, valid, stops):
+    """RGBA uint8 image of values, interpolating linearly between colour stops; invalid cells are transparent"""
+    positions = [stop[0] for stop in stops]
+    # NoData (NaN) cells would not cast to uint8; they are made transparent below anyway
+    values = np.where(valid, values, positions[0])
+    rgba = np.zeros(values.shape + (4,), dtype=np.uint8)
+    for channel in range(4):
+        colours = [stop[1][channel] for stop in stops]
+        rgba[..., channel] = np.round(np.interp(values, positions, colours))
+    rgba[~valid] = 0
+    return rgba
+
+
+def encode_png(rgba):
+    """Encode an (height, width, 4) uint8 array as an RGBA PNG (no filtering, zlib level 6).
+
+    The output only depends on the pixels, so identical tiles hash identically.
+    """
+    height, width = rgba.shape[:2]
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    # Every scanline starts with its filter type byte (0 = none)
+    scanlines = np.concatenate([np.zeros((height, 1), dtype=np.uint8), rgba.reshape(height, width * 4)], axis=1)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(scanlines.tobytes(), 6)) + chunk(b"IEND", b""))
+
+
+class TileCache(object):
+    """Content-addressed tile store: objects/<hash>.png plus an index of z/x/y -> hashes.
+
+    Each distinct PNG is stored once however many tiles use it. The index also keeps the hash
+    of the source window every tile was rendered from, so unchanged tiles are not re-rendered.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.objects = os.path.join(folder, "objects")
+        self.index_path = os.path.join(folder, "index.json")
+        os.makedirs(self.objects, exist_ok=True)
+        self.index = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r') as file:
+                self.index = json.load(file)
+
+    def object_path(self, digest):
+        return os.path.join(self.objects, digest[:2], digest + ".png")
+
+    def source_hash(self, key):
+        entry = self.index.get(key)
+        return entry["source"] if entry else None
+
+    def put(self, key, png, source_hash):
+        """Store the PNG of tile key ('z/x/y'); returns True if its content was new"""
+        digest = hashlib.sha256(png).hexdigest()
+        path = self.object_path(digest)
+        new = not os.path.exists(path)
+        if new:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + ".tmp", 'wb') as file:
+                file.write(png)
+            os.replace(path + ".tmp", path)
+        self.index[key] = {"png": digest, "source": source_hash}
+        return new
+
+    def remove(self, key):
+        self.index.pop(key, None)
+
+    def save(self):
+        with open(self.index_path + ".tmp", 'w') as file:
+            json.dump(self.index, file, indent=1, sort_keys=True)
+        os.replace(self.index_path + ".tmp", self.index_path)
+
+    def prune(self):
+        """Delete stored PNGs no tile refers to any more; returns how many were removed"""
+        used = {entry["png"] for entry in self.index.values()}
+        removed = 0
+        for directory, _, files in os.walk(self.objects):
+            for name in files:
+                if name.endswith(".png") and name[:-4] not in used:
+                    os.remove(os.path.join(directory, name))
+                    removed += 1
+        return removed
+
+    def export_tree(self, out_folder):
+        """Write the tiles as an ordinary z/x/y.png tree for web maps.
+
+        Tiles are hard links to the stored objects where the file system allows it, so
+        duplicates still take the space of one file; otherwise they are copied. z/x/y.png files
+        that are no longer in the index (tiles that went blank or fell out of range) are removed.
+        Returns the number of tiles removed.
+        """
+        removed = 0
+        for directory, _, files in os.walk(out_folder, topdown=False):
+            for name in files:
+                path = os.path.join(directory, name)
+                key = os.path.relpath(path, out_folder)[:-4].replace(os.sep, "/")
+                parts = key.split("/")
+                if name.endswith(".png") and len(parts) == 3 and all(part.isdigit() for part in parts) \
+                        and key not in self.index:
+                    os.remove(path)
+                    removed += 1
+            if directory != out_folder and not os.listdir(directory):
+                os.rmdir(directory)
+        for key, entry in self.index.items():
+            target = os.path.join(out_folder, *key.split("/")) + ".png"
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            if os.path.exists(target):
+                os.remove(target)
+            try:
+                os.link(self.object_path(entry["png"]), target)
+            except OSError:
+                shutil.copyfile(self.object_path(entry["png"]), target)
+        return removed
+
+
+def import_tree(tile_folder, cache):
+    """Add every PNG of an existing tile tree to a cache, keyed by its path without .png.
+
+    Returns (tiles, distinct images).
+    """
+    tiles = 0
+    for directory, _, files in os.walk(tile_folder):
+        for name in sorted(files):
+            if not name.endswith(".png"):
+                continue
+            path = os.path.join(directory, name)
+            key = os.path.relpath(path, tile_folder)[:-4].replace(os.sep, "/")
+            with open(path, 'rb') as file:
+                cache.put(key, file.read(), None)
+            tiles += 1
+    return tiles, len({entry["png"] for entry in cache.index.values()})
+
+
+# Each worker process opens the raster once; tiles are then rendered from its memory map
+_reader = None
+
+
+def _open_worker(raster_path):
+    global _reader
+    _reader = open_band(raster_path)
+
+
+def render_tile(reader, zoom, x, y, stops, known_source_hash=None):
+    """Render one tile. Returns (source hash, PNG bytes), with None for the PNG if the
+    source window still has known_source_hash, and (None, None) if the tile is blank.
+    """
+    row, col = sample_indices(reader, zoom, x, y)
+    inside_rows, inside_cols = row[row >= 0], col[col >= 0]
+    if len(inside_rows) == 0 or len(inside_cols) == 0:
+        return None, None
+    row0, row1 = int(inside_rows.min()), int(inside_rows.max()) + 1
+    col0, col1 = int(inside_cols.min()), int(inside_cols.max()) + 1
+    window = reader.read(row0, row1)[:, col0:col1]
+
+    # The tile only changes if the cells it samples, their position or the colours change
+    source = hashlib.sha256(window.tobytes())
+    source.update(repr((row0, row1, col0, col1, window.dtype.str, reader.nodata, stops)).encode())
+    source_hash = source.hexdigest()
+    if source_hash == known_source_hash:
+        return source_hash, None
+
+    values = window[np.clip(row - row0, 0, None)[:, np.newaxis], np.clip(col - col0, 0, None)[np.newaxis, :]]
+    valid = (row >= 0)[:, np.newaxis] & (col >= 0)[np.newaxis, :]
+    if reader.nodata is not None:
+        valid &= values != reader.nodata
+    if np.issubdtype(values.dtype, np.floating):
+        valid &= ~np.isnan(values)
+    if not valid.any():
+        return None, None
+    return source_hash, encode_png(colourize(values, valid, stops))
+
+
+def _render_task(zoom, x, y, stops, known_source_hash):
+    return (zoom, x, y) + render_tile(_reader, zoom, x, y, stops, known_source_hash)
+
+
+def generate_pyramid(raster_path, cache_folder, zooms, stops=RISK_COLOURS, workers=None):
+    """Render a geographic (EPSG:4326) raster into a Web Mercator XYZ pyramid held in a TileCache.
+
+    Every tile covering the raster at the given zoom levels is one process-pool task. Tiles
+    whose source window is unchanged since the last run are skipped, blank tiles are not stored,
+    and identical tiles share one stored PNG. Returns the cache and a dict of counts.
+    """
+    cache = TileCache(cache_folder)
+    extent = raster_extent(open_band(raster_path))
+    counts = {"rendered": 0, "new images": 0, "unchanged": 0, "blank": 0}
+    wanted = set()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_open_worker, initargs=(raster_path,)) as executor:
+        futures = []
+        for zoom in zooms:
+            x0, x1, y0, y1 = tile_range(extent, zoom)
+            for x in range(x0, x1 + 1):
+                for y in range(y0, y1 + 1):
+                    key = f"{zoom}/{x}/{y}"
+                    wanted.add(key)
+                    futures.append(executor.submit(_render_task, zoom, x, y, stops, cache.source_hash(key)))
+        # Only this process writes to the cache, so workers never race on the index
+        for future in as_completed(futures):
+            zoom, x, y, source_hash, png = future.result()
+            key = f"{zoom}/{x}/{y}"
+            if source_hash is None:
+                cache.remove(key)
+                counts["blank"] += 1
+            elif png is None:
+                counts["unchanged"] += 1
+            else:
+                counts["rendered"] += 1
+                counts["new images"] += cache.put(key, png, source_hash)
+
+    # Tiles of zoom levels that were rendered but are no longer covered are dropped
+    rendered_zooms = {str(zoom) for zoom in zooms}
+    for key in list(cache.index):
+        if key.split("/")[0] in rendered_zooms and key not in wanted:
+            cache.remove(key)
+    cache.save()
+    return cache, counts
@@ -10,13 +10,19 @@ env.overwriteOutput = True
 
 # Define input DEM file
 dem_file = "Park_DEM.dt2"
+# Flood stages in metres above the drainage; the floodplain of every stage comes from one HAND raster
+flood_stages = [1, 2, 5, 10]
 
 # Create the output folder if it doesn't exist
 if not os.path.exists(output_folder):
     os.makedirs(output_folder)
 
+# Fill the sinks first, so pits in the DEM do not break flow accumulation and the stream network
+filled_dem = Fill(os.path.join(env.workspace, dem_file))
+print("Depression filling successful.")
+
 # Flow direction analysis
-flow_dir = FlowDirection(os.path.join(env.workspace, dem_file))
+flow_dir = FlowDirection(filled_dem)
 print("Flow direction analysis successful.")
 
 # Flow accumulation analysis
@@ -50,11 +56,14 @@ print("Drainage basins identified.")
 stream_order = StreamOrder(stream_network, flow_dir)
 print("Stream order analysis successful.")
 
-# Floodplain mapping
-floodplain = Con(IsNull(stream_network), 1, 0)
+# Floodplain mapping: height above the nearest drainage (vertical flow distance to the streams
+# along the D8 paths), then one Con per flood stage
+hand = FlowDistance(stream_threshold, filled_dem, flow_dir, "VERTICAL", "D8")
+floodplains = [Con(hand <= stage, 1, 0) for stage in flood_stages]
 print("Floodplain mapping successful.")
 
 # Save outputs in the output folder
+filled_dem.save(os.path.join(output_folder, "filled_dem.tif"))
 flow_dir.save(os.path.join(output_folder, "flow_direction.tif"))
 flow_acc.save(os.path.join(output_folder, "flow_accumulation.tif"))
 stream_network.save(os.path.join(output_folder, "stream_network.tif"))
@@ -63,6 +72,8 @@ slope.save(os.path.join(output_folder, "slope.tif"))
 aspect.save(os.path.join(output_folder, "aspect.tif"))
 basins.save(os.path.join(output_folder, "drainage_basins.tif"))
 stream_order.save(os.path.join(output_folder, "stream_order.tif"))
-floodplain.save(os.path.join(output_folder, "floodplain.tif"))
+hand.save(os.path.join(output_folder, "hand.tif"))
+for stage, floodplain in zip(flood_stages, floodplains):
+    floodplain.save(os.path.join(output_folder, "floodplain_{:g}m.tif".format(stage)))
 
 print("Hydrological modelling analysis completed, and files are saved.")
@@ -0,0 +1,90 @@
+import os
+
+import numpy as np
+
+import floodplain
+import hydrology_numpy as hydro
+from depression_filling import fill_depressions
+from raster_io import read_dted, save_geotiff
+
+# Same workflow as Hydrological_Modelling.py, without arcpy or a Spatial Analyst licence
+base_path_directory = r"C:\GitHub\NRS_528\Midterm Challenge\Modelling"
+output_folder = r"C:\GitHub\NRS_528\Midterm Challenge\Modelling\Output"
+
+# Define input DEM file
+dem_file = "n41_w072_1arc_v3.dt2"
+stream_threshold = 1000
+# Flood stages in metres above the drainage; the floodplain of every stage comes from one HAND raster
+flood_stages = [1, 2, 5, 10]
+
+# Create the output folder if it doesn't exist
+if not os.path.exists(output_folder):
+    os.makedirs(output_folder)
+
+dem, transform = read_dted(os.path.join(base_path_directory, dem_file))
+print(f"DEM loaded: {dem.shape[0]} rows x {dem.shape[1]} columns.")
+
+# The DTED grid is in degrees; slopes and drops need the cell size in metres
+centre_latitude = transform[1] - dem.shape[0] * transform[3] / 2.0
+cell_width, cell_height = hydro.geographic_cell_size(transform[2], transform[3], centre_latitude)
+
+# Fill the depressions (priority-flood). The epsilon steps keep a slight gradient across the
+# filled flats, so every cell gets a downhill flow direction
+filled_dem = fill_depressions(dem, epsilon=True)
+print("Depression filling successful.")
+
+# Flow direction analysis
+flow_dir = hydro.flow_direction(filled_dem, cell_width, cell_height)
+print("Flow direction analysis successful.")
+
+# Flow accumulation analysis
+flow_acc = hydro.flow_accumulation(flow_dir).astype(np.float32)
+print("Flow accumulation analysis successful.")
+
+# Stream network delineation
+streams = flow_acc > stream_threshold
+stream_network = hydro.stream_link(streams, flow_dir)
+print("Stream network delineation successful.")
+
+# Watershed delineation
+out_watershed = hydro.watershed(flow_dir, stream_network)
+print("Watershed delineation successful.")
+
+# Calculate slope and aspect
+slope = hydro.slope(dem, cell_width, cell_height)
+aspect = hydro.aspect(dem, cell_width, cell_height)
+print("Slope and aspect calculations successful.")
+
+# Identify drainage basins
+basins = hydro.region_group(out_watershed)
+print("Drainage basins identified.")
+
+# Stream order analysis
+stream_order = hydro.strahler_order(streams, flow_dir)
+print("Stream order analysis successful.")
+
+# Floodplain mapping: height above the nearest drainage, then one comparison per flood stage
+hand = hydro.height_above_drainage(filled_dem, flow_dir, streams)
+flood_extents = floodplain.flood_extents(hand, flood_stages)
+flood_stage = floodplain.flood_stage_classes(hand, flood_stages)
+flooded_area = floodplain.inundated_area(hand, flood_stages, cell_width * cell_height / 1e6)
+for stage, area in zip(flood_stages, flooded_area):
+    print(f"Stage {stage} m floods {area:.2f} km2.")
+print("Floodplain mapping successful.")
+
+# Save outputs in the output folder (0 marks NoData in the integer rasters, as in the ArcGIS outputs)
+save_geotiff(os.path.join(output_folder, "filled_dem.tif"), filled_dem.astype(np.float32), transform, nodata=np.nan)
+save_geotiff(os.path.join(output_folder, "flow_direction.tif"), flow_dir, transform, nodata=0)
+save_geotiff(os.path.join(output_folder, "flow_accumulation.tif"), flow_acc, transform)
+save_geotiff(os.path.join(output_folder, "stream_network.tif"), stream_network, transform, nodata=0)
+save_geotiff(os.path.join(output_folder, "watershed.tif"), out_watershed, transform, nodata=0)
+save_geotiff(os.path.join(output_folder, "slope.tif"), slope, transform, nodata=np.nan)
+save_geotiff(os.path.join(output_folder, "aspect.tif"), aspect, transform, nodata=np.nan)
+save_geotiff(os.path.join(output_folder, "drainage_basins.tif"), basins, transform, nodata=0)
+save_geotiff(os.path.join(output_folder, "stream_order.tif"), stream_order, transform, nodata=0)
+save_geotiff(os.path.join(output_folder, "hand.tif"), hand, transform, nodata=np.nan)
+save_geotiff(os.path.join(output_folder, "flood_stage.tif"), flood_stage, transform)
+for stage, extent in zip(flood_stages, flood_extents):
+    save_geotiff(os.path.join(output_folder, f"floodplain_{stage:g}m.tif"), extent.astype(np.uint8), transform)
+
+print("Hydrological modelling analysis completed, and files are saved.")
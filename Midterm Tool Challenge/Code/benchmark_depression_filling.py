@@ -0,0 +1,51 @@
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+import depression_filling as filling
+from benchmark_hydrology import synthetic_dem, timed
+from raster_io import RasterReader
+
+# Square DEM sizes; the naive fill is skipped above naive_limit cells because its sweeps grow with the DEM
+sizes = [250, 500, 1000, 2000]
+naive_limit = 1000 * 1000
+strip_rows = 256
+
+
+def pitted_dem(size, seed=0):
+    """The valley surface of benchmark_hydrology with one-cell pits and a few wide closed basins,
+    rounded to whole metres like DTED elevations (so it also has flats)"""
+    rng = np.random.default_rng(seed)
+    dem = synthetic_dem(size, seed)
+    dem[rng.random(dem.shape) < 0.01] -= 20.0
+    rows, cols = np.mgrid[0:size, 0:size]
+    for row, col in rng.integers(0, size, (5, 2)):
+        radius = size / 20.0
+        dem -= np.where(np.hypot(rows - row, cols - col) < radius, 15.0, 0.0).astype(np.float32)
+    return np.round(dem)
+
+
+if __name__ == "__main__":
+    scratch = tempfile.mkdtemp()
+    print(f"{'Cells':>10} {'Naive':>8} {'Heap':>8} {'Queue':>8} {'Tiled':>8} {'us/cell':>8}  Same result")
+    for size in sizes:
+        dem = pitted_dem(size)
+        if dem.size <= naive_limit:
+            naive, t_naive = timed(filling.fill_depressions_naive, dem)
+        else:
+            naive, t_naive = None, float("nan")
+        heap, t_heap = timed(filling.fill_depressions_heap, dem)
+        queue, t_queue = timed(filling.fill_depressions, dem)
+        start = time.perf_counter()
+        tiled = filling.tiled_fill_depressions(RasterReader(dem, (0.0, 0.0, 1.0, 1.0)),
+                                               os.path.join(scratch, "filled.tif"), strip_rows, scratch)
+        tiled = tiled.read(0, size)
+        t_tiled = time.perf_counter() - start
+        reference = heap if naive is None else naive
+        same = all(np.array_equal(reference, other) for other in (heap, queue, tiled))
+        print(f"{dem.size:>10} {t_naive:>8.2f} {t_heap:>8.2f} {t_queue:>8.2f} {t_tiled:>8.2f} "
+              f"{t_queue / dem.size * 1e6:>8.3f}  {same}")
+    shutil.rmtree(scratch, ignore_errors=True)
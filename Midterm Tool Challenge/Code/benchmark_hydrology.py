@@ -0,0 +1,39 @@
+import time
+
+import numpy as np
+
+import hydrology_numpy as hydro
+
+# Square DEM sizes; the cell count grows 4x per step, so linear scaling keeps the time per cell flat
+sizes = [250, 500, 1000, 2000]
+
+
+def synthetic_dem(size, seed=0):
+    """Valley-shaped surface with noise, so flow paths are long and the stream network branches"""
+    rng = np.random.default_rng(seed)
+    rows, cols = np.mgrid[0:size, 0:size]
+    return (np.abs(cols - size / 2.0) + (size - rows) * 0.5 + rng.random((size, size)) * 2.0).astype(np.float32)
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    print(f"{'Cells':>10} {'Direction':>10} {'Accum':>8} {'Links':>8} {'Watershed':>10} {'Strahler':>9} "
+          f"{'HAND':>7} {'Slope':>7} {'Total':>7} {'us/cell':>8}")
+    for size in sizes:
+        dem = synthetic_dem(size)
+        flow_dir, t_dir = timed(hydro.flow_direction, dem)
+        flow_acc, t_acc = timed(hydro.flow_accumulation, flow_dir)
+        streams = flow_acc > 1000
+        links, t_link = timed(hydro.stream_link, streams, flow_dir)
+        _, t_shed = timed(hydro.watershed, flow_dir, links)
+        _, t_order = timed(hydro.strahler_order, streams, flow_dir)
+        _, t_hand = timed(hydro.height_above_drainage, dem, flow_dir, streams)
+        _, t_slope = timed(hydro.slope, dem)
+        total = t_dir + t_acc + t_link + t_shed + t_order + t_hand + t_slope
+        print(f"{dem.size:>10} {t_dir:>10.2f} {t_acc:>8.2f} {t_link:>8.2f} {t_shed:>10.2f} {t_order:>9.2f} "
+              f"{t_hand:>7.2f} {t_slope:>7.2f} {total:>7.2f} {total / dem.size * 1e6:>8.3f}")
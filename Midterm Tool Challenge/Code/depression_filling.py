@@ -0,0 +1,372 @@
+import heapq
+import math
+import os
+import shutil
+import tempfile
+from collections import deque
+
+import numpy as np
+
+from raster_io import GeoTiffWriter, open_geotiff
+from tiled_processing import strip_windows
+
+# Labels of the tiled fill: 0 is NoData, 1 is the outside of the DEM (the "ocean" every cell must drain to)
+NO_LABEL, OCEAN = 0, 1
+# Flat distance of the cells not (yet) connected to an outlet of their flat
+FAR = np.iinfo(np.int32).max
+
+
+def _prepare(dem, above=None, below=None):
+    # Flat working arrays over the DEM padded by one closed cell, so neighbours never leave the grid.
+    # The elevations stay one float64 NumPy array; the flood loops index it through a memoryview,
+    # which reads and writes plain Python floats as fast as a list does without boxing every cell.
+    # Returns the elevations (memoryview), the closed flags, the neighbour offsets and the seed cells:
+    # valid cells on the DEM edge or next to NoData, which drain out of the DEM. above and below are
+    # the rows of the neighbouring strips, if any: only their NoData cells count as the outside.
+    rows, cols = dem.shape
+    padded = np.pad(dem.astype(np.float64), 1, constant_values=np.nan)
+    nodata = np.isnan(padded)
+    outside = nodata.copy()
+    if above is not None:
+        outside[0, 1:-1] = np.isnan(above)
+    if below is not None:
+        outside[-1, 1:-1] = np.isnan(below)
+    next_to_outside = np.zeros_like(nodata)
+    for dr in (-1, 0, 1):
+        for dc in (-1, 0, 1):
+            next_to_outside[1:-1, 1:-1] |= outside[1 + dr:rows + 1 + dr, 1 + dc:cols + 1 + dc]
+    seeds = np.flatnonzero(next_to_outside & ~nodata)
+    width = cols + 2
+    offsets = [-width - 1, -width, -width + 1, -1, 1, width - 1, width, width + 1]
+    closed = bytearray(nodata.ravel().astype(np.uint8).tobytes())
+    for seed in seeds.tolist():
+        closed[seed] = 1
+    return memoryview(padded.ravel()), closed, offsets, seeds
+
+
+def _unpad(z, shape, dtype):
+    rows, cols = shape
+    return np.asarray(z).reshape(rows + 2, cols + 2)[1:-1, 1:-1].astype(dtype)
+
+
+def fill_depressions_heap(dem):
+    """Fill every depression with the plain Priority-Flood (Barnes et al. 2014, algorithm 1).
+
+    The cells draining out of the DEM (edge cells and cells next to NoData) seed a priority
+    queue. The lowest open cell is expanded each time, and a neighbour lower than it is raised to
+    its level, so every cell ends at the lowest level from which it can still drain out.
+    O(n log n) for float DEMs. NaN cells are NoData and stay NaN.
+    """
+    z, closed, offsets, seeds = _prepare(dem)
+    heap = [(z[seed], seed) for seed in seeds.tolist()]
+    heapq.heapify(heap)
+    push, pop = heapq.heappush, heapq.heappop
+    while heap:
+        level, cell = pop(heap)
+        for offset in offsets:
+            neighbour = cell + offset
+            if closed[neighbour]:
+                continue
+            closed[neighbour] = 1
+            if z[neighbour] < level:
+                z[neighbour] = level
+            push(heap, (z[neighbour], neighbour))
+    return _unpad(z, dem.shape, np.result_type(dem.dtype, np.float32))
+
+
+def fill_depressions(dem, epsilon=False):
+    """Priority-Flood with a plain queue for cells inside depressions and flats (Barnes et al.
+    2014, algorithms 2 and 3). Gives the same result as fill_depressions_heap.
+
+    A cell that is no higher than the cell it was reached from is raised and put in a FIFO
+    queue instead of the heap. Those cells skip the O(log n) heap operations, so filled pits
+    and flats take near-linear time.
+
+    With epsilon=True, each cell inside a depression is raised to the next representable value
+    above its upstream neighbour instead of the same level (algorithm 4). That leaves a tiny
+    gradient across every filled flat, so D8 flow direction has a downhill neighbour everywhere.
+    The result is returned as float64, because float32 would round those steps away.
+    """
+    z, closed, offsets, seeds = _prepare(dem)
+    heap = [(z[seed], seed) for seed in seeds.tolist()]
+    heapq.heapify(heap)
+    pit = deque()
+    push, pop, queue, dequeue = heapq.heappush, heapq.heappop, pit.append, pit.popleft
+    while heap or pit:
+        if pit:
+            cell = dequeue()
+            level = z[cell]
+        else:
+            level, cell = pop(heap)
+        raised = math.nextafter(level, math.inf) if epsilon else level
+        for offset in offsets:
+            neighbour = cell + offset
+            if closed[neighbour]:
+                continue
+            closed[neighbour] = 1
+            if z[neighbour] <= raised:
+                z[neighbour] = raised
+                queue(neighbour)
+            else:
+                push(heap, (z[neighbour], neighbour))
+    return _unpad(z, dem.shape, np.float64 if epsilon else np.result_type(dem.dtype, np.float32))
+
+
+def fill_depressions_naive(dem):
+    """Reference fill by repeated relaxation (morphological reconstruction by erosion).
+
+    Every cell starts at +inf except the cells draining out of the DEM, which keep their
+    elevation. Each sweep lowers every cell to max(its elevation, its lowest neighbour),
+    until nothing changes. Each sweep is one vectorised pass, but the number of sweeps grows
+    with the length of the longest path through the filled depressions.
+    """
+    rows, cols = dem.shape
+    elevation = dem.astype(np.float64)
+    nodata = np.isnan(elevation)
+    padded_nodata = np.pad(nodata, 1, constant_values=True)
+    seeds = ~nodata & np.zeros_like(nodata)
+    for dr in (-1, 0, 1):
+        for dc in (-1, 0, 1):
+            seeds |= ~nodata & padded_nodata[1 + dr:rows + 1 + dr, 1 + dc:cols + 1 + dc]
+    water = np.where(seeds | nodata, elevation, np.inf)
+    while True:
+        padded = np.pad(np.where(nodata, np.inf, water), 1, constant_values=np.inf)
+        lowest = water.copy()
+        for dr in (-1, 0, 1):
+            for dc in (-1, 0, 1):
+                np.minimum(lowest, padded[1 + dr:rows + 1 + dr, 1 + dc:cols + 1 + dc], out=lowest)
+        updated = np.where(nodata, np.nan, np.maximum(elevation, lowest))
+        if np.array_equal(updated, water, equal_nan=True):
+            return updated.astype(np.result_type(dem.dtype, np.float32))
+        water = updated
+
+
+def _flood_labels(dem, above, below):
+    """Priority-Flood of one strip whose top and/or bottom row drains into the neighbouring strip.
+
+    above and below are the adjacent rows of the strips above and below, or None at the DEM edge.
+
+    The cells draining out of the DEM are labelled OCEAN; every cell on an open row is its
+    own outlet with its own label (2, 3, ...). The flood carries each outlet's label to the cells
+    it fills, and records the lowest spill level between every pair of labels that meet.
+    Returns (filled strip, labels, {(label a, label b): spill level}).
+    """
+    rows, cols = dem.shape
+    z, closed, offsets, seeds = _prepare(dem, above, below)
+    label_array = np.full(len(z), NO_LABEL, dtype=np.int64)
+    label_array[seeds] = OCEAN
+    labels = memoryview(label_array)
+    # Open-row cells that do not already drain out of the DEM (e.g. at the row ends) become outlets
+    width = cols + 2
+    open_rows = {row for row, neighbour in ((0, above), (rows - 1, below)) if neighbour is not None}
+    edge_seeds = [cell for row in sorted(open_rows) for cell in range((row + 1) * width + 1, (row + 2) * width - 1)
+                  if not closed[cell]]
+    for number, seed in enumerate(edge_seeds):
+        closed[seed] = 1
+        labels[seed] = OCEAN + 1 + number
+    heap = [(z[seed], seed) for seed in seeds.tolist() + edge_seeds]
+    heapq.heapify(heap)
+    pit = deque()
+    spills = {}
+    push, pop, queue, dequeue = heapq.heappush, heapq.heappop, pit.append, pit.popleft
+    while heap or pit:
+        if pit:
+            cell = dequeue()
+            level = z[cell]
+        else:
+            level, cell = pop(heap)
+        label = labels[cell]
+        for offset in offsets:
+            neighbour = cell + offset
+            if closed[neighbour]:
+                other = labels[neighbour]
+                if other != label and other != NO_LABEL:
+                    # Water of the two labels meets at the higher of the two cells
+                    key = (label, other) if label < other else (other, label)
+                    spill = level if level > z[neighbour] else z[neighbour]
+                    if spill < spills.get(key, np.inf):
+                        spills[key] = spill
+                continue
+            closed[neighbour] = 1
+            labels[neighbour] = label
+            if z[neighbour] <= level:
+                z[neighbour] = level
+                queue(neighbour)
+            else:
+                push(heap, (z[neighbour], neighbour))
+    filled = np.asarray(z).reshape(rows + 2, cols + 2)[1:-1, 1:-1]
+    return filled, label_array.reshape(rows + 2, cols + 2)[1:-1, 1:-1], spills
+
+
+def _solve_spill_graph(spills, label_count):
+    # Lowest level each label must be raised to before its water reaches the OCEAN (minimax path),
+    # found with a Priority-Flood over the label graph
+    neighbours = [[] for _ in range(label_count)]
+    for (a, b), spill in spills.items():
+        neighbours[a].append((b, spill))
+        neighbours[b].append((a, spill))
+    level = np.full(label_count, np.inf)
+    level[OCEAN] = -np.inf
+    heap = [(-np.inf, OCEAN)]
+    done = np.zeros(label_count, dtype=bool)
+    while heap:
+        current, label = heapq.heappop(heap)
+        if done[label]:
+            continue
+        done[label] = True
+        for other, spill in neighbours[label]:
+            candidate = max(current, spill)
+            if candidate < level[other]:
+                level[other] = candidate
+                heapq.heappush(heap, (candidate, other))
+    return level
+
+
+def _flat_distances(window, core0, core1, halo_distances):
+    """Distance of every cell of a filled strip to the nearest outlet of its flat, in cells.
+
+    window is the filled strip with its halo rows; rows core0:core1 are the strip itself.
+    Outlets (distance 0) are cells with a lower neighbour, on the DEM edge or next to NoData;
+    the other valid cells are flat cells and take 1 + the distance of their nearest equal
+    neighbour. halo_distances holds the current distances of the halo rows from the
+    neighbouring strips. Returns the distances of the strip rows (FAR where none is known yet).
+    """
+    rows, cols = window.shape
+    padded = np.pad(window, 1, constant_values=np.nan)
+    valid = ~np.isnan(window)
+    outlet = np.zeros(window.shape, dtype=bool)
+    for dr in (-1, 0, 1):
+        for dc in (-1, 0, 1):
+            neighbour = padded[1 + dr:rows + 1 + dr, 1 + dc:cols + 1 + dc]
+            outlet |= np.isnan(neighbour) | (neighbour < window)
+    flat = valid & ~outlet
+    flat[:core0], flat[core1:] = False, False
+    distance = np.where(valid & ~flat, 0, FAR).astype(np.int64)
+    distance[:core0], distance[core1:] = halo_distances[:core0], halo_distances[core1:]
+
+    # Flat cells next to an outlet (or a halo cell) of the same flat start the search
+    padded_distance = np.pad(distance, 1, constant_values=FAR)
+    padded_flat = np.pad(flat, 1, constant_values=False)
+    start = np.full(window.shape, FAR, dtype=np.int64)
+    for dr in (-1, 0, 1):
+        for dc in (-1, 0, 1):
+            window_slice = (slice(1 + dr, rows + 1 + dr), slice(1 + dc, cols + 1 + dc))
+            known = (padded[window_slice] == window) & ~padded_flat[window_slice] & (padded_distance[window_slice] < FAR)
+            np.minimum(start, np.where(known, padded_distance[window_slice] + 1, FAR), out=start)
+    distance[flat] = start[flat]
+
+    # Breadth-first search through the flat cells, nearest first
+    width = cols + 2
+    offsets = [-width - 1, -width, -width + 1, -1, 1, width - 1, width, width + 1]
+    z = memoryview(padded.ravel())
+    is_flat = bytearray(padded_flat.ravel().astype(np.uint8).tobytes())
+    distance_array = np.pad(distance, 1, constant_values=FAR).ravel()
+    d = memoryview(distance_array)
+    starts = np.flatnonzero(padded_flat.ravel() & (distance_array < FAR))
+    heap = list(zip(distance_array[starts].tolist(), starts.tolist()))
+    heapq.heapify(heap)
+    push, pop = heapq.heappush, heapq.heappop
+    while heap:
+        current, cell = pop(heap)
+        if current > d[cell]:
+            continue
+        for offset in offsets:
+            neighbour = cell + offset
+            if is_flat[neighbour] and z[neighbour] == z[cell] and current + 1 < d[neighbour]:
+                d[neighbour] = current + 1
+                push(heap, (current + 1, neighbour))
+    return distance_array.reshape(rows + 2, width)[1 + core0:1 + core1, 1:-1]
+
+
+def tiled_fill_depressions(dem_reader, out_path, strip_rows=512, scratch_dir=None, epsilon=False):
+    """Depression filling strip by strip for DEMs larger than RAM (after Barnes 2016).
+
+    Pass 1 fills every strip with Priority-Flood as if its top and bottom rows drained away,
+    labels each cell with the edge cell (or the DEM outside) its water leaves through, and
+    records the spill levels between labels inside the strip and across the strip boundaries.
+    That graph of edge cells is small and is solved in memory for the level every label must
+    reach before its water escapes the DEM. Pass 2 raises each cell to max(its strip fill,
+    the level of its label) and writes the result. The output equals fill_depressions(dem).
+
+    With epsilon=True the filled flats are then given a drainage gradient, as the epsilon fill
+    does in memory: every flat cell is raised by as many float64 steps as it is cells away from
+    the nearest outlet of its flat (Garbrecht and Martz 1997, towards lower terrain only). The
+    distances are found strip by strip, sweeping down and up the DEM until no strip boundary
+    changes, and the result is written as float64 so D8 finds a downhill neighbour everywhere.
+    """
+    rows, cols = dem_reader.shape
+    scratch = tempfile.mkdtemp(dir=scratch_dir)
+    strips = list(strip_windows(rows, strip_rows))
+    try:
+        filled = np.memmap(os.path.join(scratch, "filled.dat"), dtype=np.float64, mode='w+', shape=(rows, cols))
+        labels = np.memmap(os.path.join(scratch, "labels.dat"), dtype=np.int64, mode='w+', shape=(rows, cols))
+        spills = {}
+        label_count = OCEAN + 1
+        previous_bottom = None
+        for row0, row1, read0, read1 in strip_windows(rows, strip_rows, halo=1):
+            # One halo row on each side tells which boundary cells border NoData in the next strip
+            window = dem_reader.read(read0, read1)
+            dem = window[row0 - read0:row1 - read0]
+            above = window[0] if read0 < row0 else None
+            below = window[-1] if read1 > row1 else None
+            strip_filled, strip_labels, strip_spills = _flood_labels(dem, above, below)
+            # Strip labels above OCEAN are renumbered after those of the strips before
+            shift = np.where(strip_labels > OCEAN, strip_labels + label_count - OCEAN - 1, strip_labels)
+            for (a, b), spill in strip_spills.items():
+                a = a + label_count - OCEAN - 1 if a > OCEAN else a
+                b = b + label_count - OCEAN - 1 if b > OCEAN else b
+                key = (min(a, b), max(a, b))
+                spills[key] = min(spills.get(key, np.inf), spill)
+            label_count = max(label_count, int(shift.max()) + 1)
+            filled[row0:row1] = strip_filled
+            labels[row0:row1] = shift
+
+            # Cells facing each other across the boundary spill into each other at the higher elevation
+            if previous_bottom is not None:
+                above_z, above_labels = previous_bottom
+                below_z, below_labels = dem[0].astype(np.float64), shift[0]
+                for dc in (-1, 0, 1):
+                    a_z = above_z[max(dc, 0):cols + min(dc, 0)]
+                    b_z = below_z[max(-dc, 0):cols + min(-dc, 0)]
+                    a_label = above_labels[max(dc, 0):cols + min(dc, 0)]
+                    b_label = below_labels[max(-dc, 0):cols + min(-dc, 0)]
+                    valid = (a_label != NO_LABEL) & (b_label != NO_LABEL) & (a_label != b_label)
+                    for a, b, spill in zip(a_label[valid].tolist(), b_label[valid].tolist(),
+                                           np.maximum(a_z, b_z)[valid].tolist()):
+                        key = (min(a, b), max(a, b))
+                        spills[key] = min(spills.get(key, np.inf), spill)
+            previous_bottom = (dem[-1].astype(np.float64), shift[-1].copy())
+        filled.flush()
+        labels.flush()
+
+        level = _solve_spill_graph(spills, label_count)
+        if not epsilon:
+            with GeoTiffWriter(out_path, (rows, cols), np.float32, dem_reader.transform, nodata=np.nan) as writer:
+                for row0, row1, _, _ in strips:
+                    writer.write_rows(np.maximum(filled[row0:row1], level[labels[row0:row1]]))
+        else:
+            for row0, row1, _, _ in strips:
+                filled[row0:row1] = np.maximum(filled[row0:row1], level[labels[row0:row1]])
+            distance = np.memmap(os.path.join(scratch, "distance.dat"), dtype=np.int32, mode='w+', shape=(rows, cols))
+            distance[:] = FAR
+            windows = list(strip_windows(rows, strip_rows, halo=1))
+            changed = True
+            while changed:
+                changed = False
+                for row0, row1, read0, read1 in windows:
+                    core = _flat_distances(np.array(filled[read0:read1]), row0 - read0, row1 - read0,
+                                           np.array(distance[read0:read1], dtype=np.int64))
+                    edges = [0, row1 - row0 - 1]
+                    changed |= not np.array_equal(core[edges], distance[row0:row1][edges])
+                    distance[row0:row1] = core
+                windows.reverse()
+            with GeoTiffWriter(out_path, (rows, cols), np.float64, dem_reader.transform, nodata=np.nan) as writer:
+                for row0, row1, _, _ in strips:
+                    strip = np.array(filled[row0:row1])
+                    steps = np.where(distance[row0:row1] < FAR, distance[row0:row1], 0)
+                    writer.write_rows(strip + steps * np.spacing(strip))
+            del distance
+        del filled, labels
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    return open_geotiff(out_path)
@@ -0,0 +1,33 @@
+import numpy as np
+
+# Floodplains from a HAND raster (hydrology_numpy.height_above_drainage). A cell is flooded at a
+# stage when its height above the drainage it flows to is at most the stage, so every stage is a
+# comparison against the same raster and no hydrology has to be rerun per scenario.
+
+
+def flood_extents(hand, stages):
+    """Boolean stack (stage, row, column) of the cells flooded at each stage; NaN cells are never flooded"""
+    stages = np.asarray(stages, dtype=np.float64)
+    return hand[np.newaxis] <= stages[:, np.newaxis, np.newaxis]
+
+
+def flood_depths(hand, stage):
+    """Water depth at one stage (stage - HAND), NaN where the cell stays dry"""
+    return np.where(hand <= stage, stage - hand, np.nan).astype(np.float32)
+
+
+def flood_stage_classes(hand, stages):
+    """Number (1-based) of the lowest stage that floods each cell, 0 if no stage does.
+
+    stages must be in increasing order. The floodplain of stage k is 0 < class <= k, so this one
+    raster holds every extent of the sweep.
+    """
+    stages = np.asarray(stages, dtype=np.float64)
+    classes = np.searchsorted(stages, hand, side="left") + 1
+    return np.where(classes > stages.size, 0, classes).astype(np.uint8)
+
+
+def inundated_area(hand, stages, cell_area=1.0):
+    """Flooded area at each stage. HAND is sorted once; each stage is then a binary search"""
+    heights = np.sort(hand[~np.isnan(hand)], axis=None)
+    return np.searchsorted(heights, np.asarray(stages, dtype=np.float64), side="right") * cell_area
@@ -0,0 +1,240 @@
+import numpy as np
+
+# D8 direction codes (as used by ArcGIS FlowDirection) and their (row, column) offsets
+D8_CODES = [1, 2, 4, 8, 16, 32, 64, 128]
+D8_OFFSETS = [(0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1), (-1, 0), (-1, 1)]
+
+
+def flow_direction(dem, cell_width=1.0, cell_height=1.0):
+    """D8 flow direction: each cell points to the neighbour with the steepest downhill drop.
+
+    Cells with no downhill neighbour get 0, except on the raster edge where they flow outward
+    (the ArcGIS NORMAL edge rule). NaN cells get 0 and are never flowed into.
+    """
+    rows, cols = dem.shape
+    padded = np.pad(dem.astype(np.float64), 1, constant_values=np.nan)
+    diagonal = np.hypot(cell_width, cell_height)
+    best_drop = np.zeros(dem.shape)
+    direction = np.zeros(dem.shape, dtype=np.uint8)
+    for code, (dr, dc) in zip(D8_CODES, D8_OFFSETS):
+        neighbour = padded[1 + dr:1 + dr + rows, 1 + dc:1 + dc + cols]
+        distance = diagonal if dr and dc else (cell_width if dc else cell_height)
+        drop = (dem - neighbour) / distance
+        steeper = drop > best_drop  # NaN comparisons are False, so NaN neighbours are skipped
+        best_drop[steeper] = drop[steeper]
+        direction[steeper] = code
+
+    # Edge cells without a downhill neighbour flow out of the raster
+    valid = ~np.isnan(dem)
+    edge_codes = np.zeros(dem.shape, dtype=np.uint8)
+    edge_codes[0, :], edge_codes[-1, :] = 64, 4
+    edge_codes[:, 0], edge_codes[:, -1] = 16, 1
+    edge_codes[0, 0], edge_codes[0, -1], edge_codes[-1, 0], edge_codes[-1, -1] = 32, 128, 8, 2
+    outward = (direction == 0) & (edge_codes > 0) & valid
+    direction[outward] = edge_codes[outward]
+    return direction
+
+
+def downstream_index(direction):
+    """Flat index of the cell each cell drains to, or -1 for sinks and cells draining off the raster"""
+    rows, cols = direction.shape
+    flat = direction.ravel()
+    receiver = np.full(flat.size, -1, dtype=np.int64)
+    for code, (dr, dc) in zip(D8_CODES, D8_OFFSETS):
+        cells = np.flatnonzero(flat == code)
+        row, col = np.divmod(cells, cols)
+        row, col = row + dr, col + dc
+        inside = (row >= 0) & (row < rows) & (col >= 0) & (col < cols)
+        receiver[cells[inside]] = row[inside] * cols + col[inside]
+    return receiver
+
+
+def flow_levels(receiver):
+    """Yield cells in upstream-to-downstream order, one frontier at a time.
+
+    A cell is yielded only after every cell draining into it (Kahn's topological sort), and each
+    cell is visited exactly once, so the total work is linear in the number of cells.
+    """
+    draining = receiver[receiver >= 0]
+    indegree = np.bincount(draining, minlength=receiver.size)
+    frontier = np.flatnonzero(indegree == 0)
+    while frontier.size:
+        yield frontier
+        targets = receiver[frontier]
+        targets = targets[targets >= 0]
+        np.subtract.at(indegree, targets, 1)
+        frontier = np.unique(targets[indegree[targets] == 0])
+
+
+def flow_accumulation(direction, weights=None):
+    """Weighted count of upstream cells draining through each cell (the cell itself is not counted)"""
+    receiver = downstream_index(direction)
+    accumulation = np.zeros(receiver.size)
+    weights = np.ones(receiver.size) if weights is None else np.nan_to_num(weights.ravel().astype(np.float64))
+    for frontier in flow_levels(receiver):
+        targets = receiver[frontier]
+        draining = targets >= 0
+        np.add.at(accumulation, targets[draining], accumulation[frontier[draining]] + weights[frontier[draining]])
+    return accumulation.reshape(direction.shape)
+
+
+def _stream_receiver(streams, direction):
+    # Receivers restricted to the stream network: only stream cells draining into stream cells
+    receiver = downstream_index(direction)
+    flat_streams = streams.ravel()
+    receiver[~flat_streams] = -1
+    draining = receiver >= 0
+    receiver[draining & ~flat_streams[np.maximum(receiver, 0)]] = -1
+    return receiver
+
+
+def stream_link(streams, direction):
+    """Give every stream segment between junctions a unique id (0 off the stream network).
+
+    A new link starts at stream sources and at confluences, i.e. wherever a stream cell does not
+    have exactly one stream cell draining into it.
+    """
+    streams = streams.astype(bool)
+    receiver = _stream_receiver(streams, direction)
+    donors = receiver >= 0
+    donor_count = np.bincount(receiver[donors], minlength=receiver.size)
+    # Upstream cell a link continues from, for cells fed by exactly one stream cell
+    upstream = np.full(receiver.size, -1, dtype=np.int64)
+    single = donor_count[receiver[donors]] == 1
+    upstream[receiver[donors][single]] = np.flatnonzero(donors)[single]
+
+    flat_streams = streams.ravel()
+    links = np.zeros(receiver.size, dtype=np.int32)
+    next_id = 1
+    for frontier in flow_levels(receiver):
+        frontier = frontier[flat_streams[frontier]]
+        heads = upstream[frontier] < 0
+        links[frontier[heads]] = np.arange(next_id, next_id + heads.sum())
+        next_id += int(heads.sum())
+        links[frontier[~heads]] = links[upstream[frontier[~heads]]]
+    return links.reshape(streams.shape)
+
+
+def watershed(direction, pour_points):
+    """Label every cell with the value of the first pour point (non-zero cell) it drains to, 0 if none"""
+    receiver = downstream_index(direction)
+    pour = pour_points.ravel()
+    labels = np.zeros(receiver.size, dtype=pour.dtype)
+    # Walk from the outlets upstream so every receiver is labelled before its donors
+    for frontier in reversed(list(flow_levels(receiver))):
+        targets = receiver[frontier]
+        inherited = np.where(targets >= 0, labels[np.maximum(targets, 0)], 0)
+        labels[frontier] = np.where(pour[frontier] != 0, pour[frontier], inherited)
+    return labels.reshape(direction.shape)
+
+
+def strahler_order(streams, direction):
+    """Strahler stream order: sources are 1 and the order grows by one where two streams of equal order meet"""
+    streams = streams.astype(bool)
+    receiver = _stream_receiver(streams, direction)
+    donor_cells = np.flatnonzero(receiver >= 0)
+    donor_targets = receiver[donor_cells]
+    sort = np.argsort(donor_targets, kind="stable")
+    donor_cells, donor_targets = donor_cells[sort], donor_targets[sort]
+    donor_count = np.bincount(donor_targets, minlength=receiver.size)
+
+    flat_streams = streams.ravel()
+    order = np.zeros(receiver.size, dtype=np.int16)
+    for frontier in flow_levels(receiver):
+        frontier = frontier[flat_streams[frontier]]
+        counts = donor_count[frontier]
+        order[frontier[counts == 0]] = 1
+        joined = frontier[counts > 0]
+        if not joined.size:
+            continue
+        # Gather the donors of every joined cell, grouped per cell
+        lengths = counts[counts > 0]
+        group_starts = np.cumsum(lengths) - lengths
+        first_donor = np.searchsorted(donor_targets, joined)
+        gather = np.repeat(first_donor - group_starts, lengths) + np.arange(lengths.sum())
+        donor_orders = order[donor_cells[gather]]
+        highest = np.maximum.reduceat(donor_orders, group_starts)
+        ties = np.add.reduceat(donor_orders == np.repeat(highest, lengths), group_starts)
+        order[joined] = highest + (ties >= 2)
+    return order.reshape(streams.shape)
+
+
+def height_above_drainage(dem, direction, streams):
+    """Height Above Nearest Drainage (HAND): elevation of every cell above the stream cell its D8
+    flow path reaches first (Nobre et al. 2011).
+
+    Stream cells get 0. Cells whose path leaves the raster or ends in a sink before reaching a
+    stream get NaN. One walk from the outlets upstream hands each cell its receiver's drainage level.
+    """
+    receiver = downstream_index(direction)
+    flat_dem = dem.ravel().astype(np.float64)
+    flat_streams = streams.ravel().astype(bool)
+    drainage = np.full(receiver.size, np.nan)
+    for frontier in reversed(list(flow_levels(receiver))):
+        targets = receiver[frontier]
+        inherited = np.where(targets >= 0, drainage[np.maximum(targets, 0)], np.nan)
+        drainage[frontier] = np.where(flat_streams[frontier], flat_dem[frontier], inherited)
+    return (flat_dem - drainage).reshape(dem.shape).astype(np.float32)
+
+
+def _horn_gradients(dem, cell_width, cell_height):
+    # Third-order finite differences over the 3x3 window (Horn 1981), edges padded by repetition
+    z = np.pad(dem.astype(np.float64), 1, mode="edge")
+    a, b, c = z[:-2, :-2], z[:-2, 1:-1], z[:-2, 2:]
+    d, f = z[1:-1, :-2], z[1:-1, 2:]
+    g, h, i = z[2:, :-2], z[2:, 1:-1], z[2:, 2:]
+    dz_dx = ((c + 2 * f + i) - (a + 2 * d + g)) / (8.0 * cell_width)
+    dz_dy = ((g + 2 * h + i) - (a + 2 * b + c)) / (8.0 * cell_height)
+    return dz_dx, dz_dy
+
+
+def slope(dem, cell_width=1.0, cell_height=1.0, z_factor=1.0):
+    """Slope in degrees (Horn's method, as ArcGIS Slope)"""
+    dz_dx, dz_dy = _horn_gradients(dem * z_factor, cell_width, cell_height)
+    return np.degrees(np.arctan(np.hypot(dz_dx, dz_dy))).astype(np.float32)
+
+
+def aspect(dem, cell_width=1.0, cell_height=1.0):
+    """Aspect in compass degrees clockwise from north, -1 on flat cells (as ArcGIS Aspect)"""
+    dz_dx, dz_dy = _horn_gradients(dem, cell_width, cell_height)
+    angle = np.degrees(np.arctan2(dz_dy, -dz_dx))
+    compass = np.where(angle > 90.0, 450.0 - angle, 90.0 - angle)
+    compass = np.where((dz_dx == 0) & (dz_dy == 0), -1.0, compass)
+    return np.where(np.isnan(dem), np.nan, compass).astype(np.float32)
+
+
+def geographic_cell_size(cell_width, cell_height, latitude):
+    """Approximate cell size in metres of a cell given in degrees at the given latitude"""
+    metres_per_degree = 111320.0
+    return cell_width * metres_per_degree * np.cos(np.radians(latitude)), cell_height * metres_per_degree
+
+
+def region_group(values, background=0):
+    """Label 4-connected regions of equal value (RegionGroup FOUR/WITHIN); background cells get 0"""
+    rows, cols = values.shape
+    valid = values != background
+    ids = np.arange(rows * cols, dtype=np.int64).reshape(rows, cols)
+    same_right = (values[:, :-1] == values[:, 1:]) & valid[:, :-1]
+    same_down = (values[:-1, :] == values[1:, :]) & valid[:-1, :]
+    pairs_a = np.concatenate([ids[:, :-1][same_right], ids[:-1, :][same_down]])
+    pairs_b = np.concatenate([ids[:, 1:][same_right], ids[1:, :][same_down]])
+
+    # Vectorized union-find: hook larger roots under smaller ones, then compress the paths
+    parent = np.arange(rows * cols, dtype=np.int64)
+    while True:
+        low = np.minimum(parent[pairs_a], parent[pairs_b])
+        high = np.maximum(parent[pairs_a], parent[pairs_b])
+        changed = low != high
+        if not changed.any():
+            break
+        np.minimum.at(parent, high[changed], low[changed])
+        while True:
+            grand_parent = parent[parent]
+            if np.array_equal(grand_parent, parent):
+                break
+            parent = grand_parent
+
+    groups = np.zeros(rows * cols, dtype=np.int32)
+    flat_valid = valid.ravel()
+    groups[flat_valid] = np.unique(parent[flat_valid], return_inverse=True)[1] + 1
+    return groups.reshape(rows, cols)
@@ -0,0 +1,238 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+import hydrology_numpy as hydro
+from raster_io import GeoTiffWriter, open_geotiff
+
+
+def strip_windows(rows, strip_rows, halo=0):
+    """Yield (row0, row1, read0, read1): the core rows of each strip and the rows to read with the halo"""
+    for row0 in range(0, rows, strip_rows):
+        row1 = min(row0 + strip_rows, rows)
+        yield row0, row1, max(row0 - halo, 0), min(row1 + halo, rows)
+
+
+def map_strips(reader, out_path, function, dtype, strip_rows=512, halo=0, nodata=None, readers=()):
+    """Apply a local (focal or cell-by-cell) operator strip by strip and stream the result to a GeoTIFF.
+
+    function receives the strip read with `halo` extra rows above and below (plus the matching
+    windows of any extra `readers`) and must return an array of the same shape; the halo rows are
+    dropped before writing. Only one strip of each input is in memory at a time.
+    """
+    rows, cols = reader.shape
+    with GeoTiffWriter(out_path, (rows, cols), dtype, reader.transform, nodata=nodata) as writer:
+        for row0, row1, read0, read1 in strip_windows(rows, strip_rows, halo):
+            windows = [reader.read(read0, read1)] + [extra.read(read0, read1) for extra in readers]
+            result = function(*windows)
+            writer.write_rows(result[row0 - read0:row1 - read0])
+    return open_geotiff(out_path)
+
+
+def tiled_flow_direction(dem_reader, out_path, cell_width, cell_height, strip_rows=512):
+    # One halo row is enough: D8 only looks at the immediate neighbours
+    return map_strips(dem_reader, out_path, lambda dem: hydro.flow_direction(dem, cell_width, cell_height),
+                      np.uint8, strip_rows, halo=1, nodata=0)
+
+
+def tiled_slope(dem_reader, out_path, cell_width, cell_height, strip_rows=512):
+    return map_strips(dem_reader, out_path, lambda dem: hydro.slope(dem, cell_width, cell_height),
+                      np.float32, strip_rows, halo=1, nodata=np.nan)
+
+
+def tiled_aspect(dem_reader, out_path, cell_width, cell_height, strip_rows=512):
+    return map_strips(dem_reader, out_path, lambda dem: hydro.aspect(dem, cell_width, cell_height),
+                      np.float32, strip_rows, halo=1, nodata=np.nan)
+
+
+def tiled_con(reader, out_path, condition, true_value, false_value=0, dtype=np.uint8, strip_rows=512):
+    """Con(condition(raster), true_value, false_value) evaluated strip by strip"""
+    return map_strips(reader, out_path, lambda values: np.where(condition(values), true_value, false_value),
+                      dtype, strip_rows)
+
+
+def _strip_receivers(direction, row0, total_rows):
+    # Global flat receivers of the strip's cells, including receivers in the neighbouring strips
+    rows, cols = direction.shape
+    receiver = np.full(direction.size, -1, dtype=np.int64)
+    flat = direction.ravel()
+    for code, (dr, dc) in zip(hydro.D8_CODES, hydro.D8_OFFSETS):
+        cells = np.flatnonzero(flat == code)
+        row, col = np.divmod(cells, cols)
+        row, col = row + row0 + dr, col + dc
+        inside = (row >= 0) & (row < total_rows) & (col >= 0) & (col < cols)
+        receiver[cells[inside]] = row[inside] * cols + col[inside]
+    return receiver
+
+
+def tiled_flow_accumulation(direction_reader, out_path, strip_rows=512, scratch_dir=None):
+    """Flow accumulation computed strip by strip and stitched across strip boundaries.
+
+    Pass 1 accumulates every strip on its own and, for the cells on the strip's top and bottom
+    rows (the only cells flow can enter or leave through), records the next boundary cell
+    downstream. Those boundary cells form a small graph that is solved in memory for the flow each
+    boundary cell receives from other strips. Pass 2 routes that inflow through each strip and
+    writes the final accumulation, so memory is one strip plus two rows per strip.
+    """
+    rows, cols = direction_reader.shape
+    scratch = tempfile.mkdtemp(dir=scratch_dir)
+    strips = list(strip_windows(rows, strip_rows))
+
+    # Boundary rows get compact node ids: node = position of the row * cols + column
+    boundary_rows = sorted({row for row0, row1, _, _ in strips for row in (row0, row1 - 1)})
+    row_position = np.full(rows, -1, dtype=np.int64)
+    row_position[boundary_rows] = np.arange(len(boundary_rows))
+    nodes = len(boundary_rows) * cols
+    node_link = np.full(nodes, -1, dtype=np.int64)
+    node_external = np.zeros(nodes, dtype=bool)
+    node_outflow = np.zeros(nodes)
+
+    def node_of(cells):
+        row, col = np.divmod(cells, cols)
+        return row_position[row] * cols + col
+
+    try:
+        local_path = os.path.join(scratch, "local_accumulation.dat")
+        local = np.memmap(local_path, dtype=np.float64, mode='w+', shape=(rows, cols))
+        for row0, row1, _, _ in strips:
+            direction = direction_reader.read(row0, row1)
+            receiver = _strip_receivers(direction, row0, rows)
+            first, last = row0 * cols, row1 * cols
+            in_strip = (receiver >= first) & (receiver < last)
+            local_receiver = np.where(in_strip, receiver - first, -1)
+
+            accumulation = np.zeros(receiver.size)
+            levels = list(hydro.flow_levels(local_receiver))
+            for frontier in levels:
+                targets = local_receiver[frontier]
+                draining = targets >= 0
+                np.add.at(accumulation, targets[draining], accumulation[frontier[draining]] + 1)
+            local[row0:row1] = accumulation.reshape(row1 - row0, cols)
+
+            # Next boundary cell downstream of every cell, walking from the outlets upstream
+            target_row = np.where(receiver >= 0, receiver // cols, -1)
+            next_boundary = np.full(receiver.size, -1, dtype=np.int64)
+            for frontier in reversed(levels):
+                targets = receiver[frontier]
+                on_boundary = (targets >= 0) & (~in_strip[frontier] | (row_position[np.maximum(target_row[frontier], 0)] >= 0))
+                inherited = np.where(local_receiver[frontier] >= 0, next_boundary[np.maximum(local_receiver[frontier], 0)], -1)
+                next_boundary[frontier] = np.where(on_boundary, targets, inherited)
+
+            for row in {row0, row1 - 1}:
+                cells = np.arange((row - row0) * cols, (row - row0 + 1) * cols)
+                node = node_of(cells + first)
+                links = next_boundary[cells]
+                node_link[node] = np.where(links >= 0, node_of(np.maximum(links, 0)), -1)
+                node_external[node] = (receiver[cells] >= 0) & ~in_strip[cells]
+                node_outflow[node] = accumulation[cells] + 1
+            local.flush()
+
+        # Inflow from other strips, solved on the boundary graph in topological order
+        inflow = np.zeros(nodes)
+        for frontier in hydro.flow_levels(node_link):
+            targets = node_link[frontier]
+            linked = targets >= 0
+            sent = inflow[frontier] + np.where(node_external[frontier], node_outflow[frontier], 0.0)
+            np.add.at(inflow, targets[linked], sent[linked])
+        external = np.flatnonzero(node_external & (node_link >= 0))
+        entering = np.zeros(nodes)
+        np.add.at(entering, node_link[external], node_outflow[external] + inflow[external])
+
+        # Pass 2: route the entering flow through each strip and write the result
+        with GeoTiffWriter(out_path, (rows, cols), np.float32, direction_reader.transform) as writer:
+            for row0, row1, _, _ in strips:
+                direction = direction_reader.read(row0, row1)
+                receiver = _strip_receivers(direction, row0, rows)
+                first, last = row0 * cols, row1 * cols
+                local_receiver = np.where((receiver >= first) & (receiver < last), receiver - first, -1)
+                routed = np.zeros(receiver.size)
+                for row in {row0, row1 - 1}:
+                    cells = np.arange((row - row0) * cols, (row - row0 + 1) * cols)
+                    routed[cells] = entering[node_of(cells + first)]
+                for frontier in hydro.flow_levels(local_receiver):
+                    targets = local_receiver[frontier]
+                    draining = targets >= 0
+                    np.add.at(routed, targets[draining], routed[frontier[draining]])
+                writer.write_rows(local[row0:row1] + routed.reshape(row1 - row0, cols))
+        del local
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    return open_geotiff(out_path)
+
+
+def _strip_drainage(dem, streams, receiver, first, last, external):
+    # Drainage level of every cell of a strip, walking from the outlets upstream. Paths that leave
+    # the strip take external(targets) as their level and keep the cell they leave to in `exits`
+    in_strip = (receiver >= first) & (receiver < last)
+    local_receiver = np.where(in_strip, receiver - first, -1)
+    flat_dem = dem.ravel().astype(np.float64)
+    flat_streams = streams.ravel().astype(bool)
+    drainage = np.full(receiver.size, np.nan)
+    exits = np.full(receiver.size, -1, dtype=np.int64)
+    for frontier in reversed(list(hydro.flow_levels(local_receiver))):
+        targets, local = receiver[frontier], local_receiver[frontier]
+        inherited = drainage[np.maximum(local, 0)]
+        exit_cells = exits[np.maximum(local, 0)]
+        leaving = (targets >= 0) & (local < 0)
+        inherited[leaving] = external(targets[leaving])
+        exit_cells[leaving] = targets[leaving]
+        inherited[targets < 0] = np.nan
+        exit_cells[targets < 0] = -1
+        stream = flat_streams[frontier]
+        drainage[frontier] = np.where(stream, flat_dem[frontier], inherited)
+        exits[frontier] = np.where(stream, -1, exit_cells)
+    return drainage, exits
+
+
+def tiled_height_above_drainage(dem_reader, direction_reader, stream_reader, out_path, strip_rows=512):
+    """HAND computed strip by strip and stitched across strip boundaries.
+
+    Pass 1 walks every strip on its own; a cell on a strip's top or bottom row either reaches a
+    stream inside the strip or leaves it at a known cell of the next strip's boundary row. Those
+    boundary cells are resolved in memory, outlets first, and pass 2 walks each strip again with
+    the drainage level of every cell its flow leaves to.
+    """
+    rows, cols = dem_reader.shape
+    strips = list(strip_windows(rows, strip_rows))
+    boundary_rows = sorted({row for row0, row1, _, _ in strips for row in (row0, row1 - 1)})
+    row_position = np.full(rows, -1, dtype=np.int64)
+    row_position[boundary_rows] = np.arange(len(boundary_rows))
+    nodes = len(boundary_rows) * cols
+    node_drainage = np.full(nodes, np.nan)
+    node_link = np.full(nodes, -1, dtype=np.int64)
+
+    def node_of(cells):
+        row, col = np.divmod(cells, cols)
+        return row_position[row] * cols + col
+
+    def read_strip(row0, row1):
+        direction = direction_reader.read(row0, row1)
+        receiver = _strip_receivers(direction, row0, rows)
+        return dem_reader.read(row0, row1), stream_reader.read(row0, row1) > 0, receiver
+
+    for row0, row1, _, _ in strips:
+        dem, streams, receiver = read_strip(row0, row1)
+        first = row0 * cols
+        drainage, exits = _strip_drainage(dem, streams, receiver, first, row1 * cols,
+                                          lambda targets: np.nan)
+        for row in {row0, row1 - 1}:
+            cells = np.arange((row - row0) * cols, (row - row0 + 1) * cols)
+            node = node_of(cells + first)
+            node_drainage[node] = drainage[cells]
+            node_link[node] = np.where(exits[cells] >= 0, node_of(np.maximum(exits[cells], 0)), -1)
+
+    # Boundary cells leaving their strip take the level of the cell they leave to, outlets first
+    for frontier in reversed(list(hydro.flow_levels(node_link))):
+        targets = node_link[frontier]
+        linked = targets >= 0
+        node_drainage[frontier[linked]] = node_drainage[targets[linked]]
+
+    with GeoTiffWriter(out_path, (rows, cols), np.float32, dem_reader.transform, nodata=np.nan) as writer:
+        for row0, row1, _, _ in strips:
+            dem, streams, receiver = read_strip(row0, row1)
+            drainage, _ = _strip_drainage(dem, streams, receiver, row0 * cols, row1 * cols,
+                                          lambda targets: node_drainage[node_of(targets)])
+            writer.write_rows((dem.astype(np.float64) - drainage.reshape(dem.shape)).astype(np.float32))
+    return open_geotiff(out_path)
@@ -0,0 +1,12 @@
+import os
+import sys
+
+# The challenge folders are not packages: each runs its scripts from its own folder. The tests import
+# the modules the same way, from the folders holding the reference copies of the shared modules.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CODE_FOLDERS = ["Code_Challenge_03", "Code_Challenge_04/Codes", "Code_Challenge_05/Code",
+                "Final Toolbox Challenge/Code", "Midterm Tool Challenge/Code", "Code_Challenge_08/Code",
+                "Code_Challenge_10/Code"]
+
+for folder in CODE_FOLDERS:
+    sys.path.insert(0, os.path.join(ROOT, folder))
@@ -0,0 +1,82 @@
+import os
+
+from band_cleanup import CleanupWorker, Journal, file_checksum, raster_files, remove_raster
+
+
+def write_band(folder, name):
+    # A band with the sidecars arcpy leaves next to it
+    path = os.path.join(str(folder), name)
+    for file_path in [path, path + ".aux.xml", path[:-4] + ".tfw"]:
+        with open(file_path, "w") as file:
+            file.write(file_path)
+    return path
+
+
+def write_output(folder, text="ndvi"):
+    path = os.path.join(str(folder), "output_scene.tif")
+    with open(path, "w") as file:
+        file.write(text)
+    return path
+
+
+def test_remove_and_archive(tmp_path):
+    band = write_band(tmp_path, "B4.TIF")
+    assert raster_files(band) == [band, band + ".aux.xml", str(tmp_path / "B4.tfw")]
+    remove_raster(band, str(tmp_path / "archive"))
+    assert sorted(os.listdir(tmp_path / "archive")) == ["B4.TIF", "B4.TIF.aux.xml", "B4.tfw"]
+    assert raster_files(band) == []
+    # Repeating an interrupted cleanup is harmless
+    remove_raster(band)
+
+
+def test_cleanup_records_and_deletes(tmp_path):
+    bands = [write_band(tmp_path, "B4.TIF"), write_band(tmp_path, "B5.TIF")]
+    output = write_output(tmp_path)
+    journal = Journal(str(tmp_path / "journal.jsonl"))
+    journal.record("scene", "computed", output=output, inputs=bands, checksum=None)
+    with CleanupWorker(journal) as cleanup:
+        cleanup.submit("scene", output, bands)
+    assert cleanup.failed == []
+    assert sorted(os.listdir(tmp_path)) == ["journal.jsonl", "output_scene.tif"]
+    assert journal.state("scene") == "cleaned"
+    assert journal.scenes["scene"]["checksum"] == file_checksum(output)
+
+
+def test_journal_resume_after_torn_line(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = Journal(path)
+    journal.record("a", "computed", output="a.tif", inputs=["a4", "a5"], checksum=None)
+    journal.record("a", "verified", output="a.tif", checksum="1234")
+    journal.record("b", "computed", output="b.tif", inputs=["b4", "b5"], checksum=None)
+    # A crash in the middle of writing the next entry
+    with open(path, "a") as file:
+        file.write('{"scene": "b", "state": "clea')
+
+    resumed = Journal(path)
+    assert resumed.state("a") == "verified" and resumed.scenes["a"]["inputs"] == ["a4", "a5"]
+    assert resumed.state("b") == "computed"
+    assert resumed.state("c") is None
+    # The torn line is terminated, so new entries are read back on the next resume
+    resumed.record("b", "cleaned", inputs=["b4", "b5"])
+    assert Journal(path).state("b") == "cleaned"
+
+
+def test_resumed_cleanup_keeps_changed_output(tmp_path):
+    bands = [write_band(tmp_path, "B4.TIF"), write_band(tmp_path, "B5.TIF")]
+    output = write_output(tmp_path)
+    path = str(tmp_path / "journal.jsonl")
+    Journal(path).record("scene", "verified", output=output, inputs=bands, checksum=file_checksum(output))
+    write_output(tmp_path, "overwritten")
+
+    # The output no longer matches the verified checksum, so the bands must stay
+    journal = Journal(path)
+    with CleanupWorker(journal) as cleanup:
+        cleanup.submit("scene", output, journal.scenes["scene"]["inputs"])
+    assert cleanup.failed == ["scene"]
+    assert journal.state("scene") == "verified"
+    assert all(os.path.exists(band) for band in bands)
+
+    # A missing output is never cleaned up either
+    with CleanupWorker(journal) as cleanup:
+        cleanup.submit("other", str(tmp_path / "missing.tif"), bands)
+    assert cleanup.failed == ["other"] and journal.state("other") is None
@@ -0,0 +1,101 @@
+import os
+
+import numpy as np
+
+from batch_ndvi import compute_ndvi, find_scenes, is_up_to_date, run_batch
+from raster_io import open_band, open_geotiff, save_geotiff
+
+TRANSFORM = (500000.0, 4600000.0, 30.0, 30.0)
+SCENE = "LC08_L1TP_012031_20200615_20200625_02_T1"
+
+
+def write_scene(folder, scene, red, nir):
+    os.makedirs(folder, exist_ok=True)
+    red_path = os.path.join(folder, f"{scene}_B4.TIF")
+    nir_path = os.path.join(folder, f"{scene}_B5.TIF")
+    save_geotiff(red_path, red, TRANSFORM, epsg=32619)
+    save_geotiff(nir_path, nir, TRANSFORM, epsg=32619)
+    return red_path, nir_path
+
+
+def test_find_scenes(tmp_path):
+    red = np.full((4, 5), 100, dtype=np.uint16)
+    red_path, nir_path = write_scene(str(tmp_path / "scene_a"), SCENE, red, red)
+    (tmp_path / "scene_a" / "readme.txt").write_text("")
+    (tmp_path / "loose.TIF").write_text("")
+    assert find_scenes(str(tmp_path)) == [(SCENE, red_path, nir_path)]
+
+
+def test_batch_skips_up_to_date_outputs(tmp_path):
+    rng = np.random.default_rng(2)
+    red = rng.integers(1, 1000, (6, 7), dtype=np.uint16)
+    nir = rng.integers(1, 1000, (6, 7), dtype=np.uint16)
+    red_path, nir_path = write_scene(str(tmp_path / "data" / "scene_a"), SCENE, red, nir)
+    output_directory = str(tmp_path / "output")
+    output_path = os.path.join(output_directory, f"output_{SCENE}.tif")
+
+    assert run_batch(str(tmp_path / "data"), output_directory, workers=1) == []
+    assert is_up_to_date(output_path, [red_path, nir_path])
+    expected = (nir.astype(np.float32) - red) / (nir.astype(np.float32) + red)
+    assert np.allclose(open_geotiff(output_path).read(0, 6), expected)
+
+    # A second run leaves the output alone; a newer band makes it stale again
+    output_time = os.path.getmtime(output_path)
+    run_batch(str(tmp_path / "data"), output_directory, workers=1)
+    assert os.path.getmtime(output_path) == output_time
+    os.utime(red_path, (output_time + 10, output_time + 10))
+    assert not is_up_to_date(output_path, [red_path, nir_path])
+    assert not is_up_to_date(output_path + ".missing", [red_path])
+
+
+def write_bil(path, bands, nodata=None):
+    # Two-band BIL: each line holds one row of every band
+    rows, cols = bands[0].shape
+    with open(path[:-4] + ".hdr", "w") as file:
+        file.write(f"NROWS {rows}\nNCOLS {cols}\nNBANDS {len(bands)}\nNBITS 16\nPIXELTYPE SIGNEDINT\n"
+                   f"BYTEORDER I\nLAYOUT BIL\nULXMAP 500015\nULYMAP 4599985\nXDIM 30\nYDIM 30\n")
+        if nodata is not None:
+            file.write(f"NODATA {nodata}\n")
+    np.stack(bands, axis=1).astype("<i2").tofile(path)
+
+
+def test_ndvi_chunks_and_nodata(tmp_path):
+    rng = np.random.default_rng(4)
+    red = rng.integers(1, 1000, (9, 6)).astype(np.uint16)
+    nir = rng.integers(1, 1000, (9, 6)).astype(np.uint16)
+    red[0, 0] = 0  # Landsat fill
+    nir[1, 1] = 0
+    red[2, 2] = nir[2, 2] = 0
+    red_path, nir_path = write_scene(str(tmp_path), SCENE, red, nir)
+    with np.errstate(invalid="ignore"):
+        expected = (nir.astype(np.float32) - red) / (nir.astype(np.float32) + red)
+    for chunk_rows in (2, 4, 512):
+        output_path = compute_ndvi(red_path, nir_path, str(tmp_path / f"ndvi_{chunk_rows}.tif"), chunk_rows,
+                                   nodata=0)
+        assert not os.path.exists(output_path + ".partial.tif")
+        ndvi = open_geotiff(output_path)
+        assert ndvi.nodata is not None and np.isnan(ndvi.nodata)
+        values = ndvi.read(0, 9)
+        # Cells with fill in either band are NaN, the rest are computed in every chunk
+        assert np.isnan(values[[0, 1, 2], [0, 1, 2]]).all()
+        mask = np.ones(values.shape, dtype=bool)
+        mask[[0, 1, 2], [0, 1, 2]] = False
+        assert np.allclose(values[mask], expected[mask])
+
+
+def test_ndvi_from_bil_bands(tmp_path):
+    red = np.array([[10, 20, -1], [30, 0, 50]], dtype=np.int16)
+    nir = np.array([[30, 20, 40], [10, 0, 150]], dtype=np.int16)
+    path = str(tmp_path / "scene.bil")
+    write_bil(path, [red, nir], nodata=-1)
+    assert np.array_equal(open_band(path, 2).read(0, 2), nir)
+    red_band = open_band(path, 1)
+    assert red_band.nodata == -1 and red_band.transform == (500000.0, 4600000.0, 30.0, 30.0)
+
+    # compute_ndvi opens band 1 of each path, so the NIR band gets its own file
+    nir_path = str(tmp_path / "nir.bil")
+    write_bil(nir_path, [nir])
+    output_path = compute_ndvi(path, nir_path, str(tmp_path / "ndvi.tif"), chunk_rows=1)
+    values = open_geotiff(output_path).read(0, 2)
+    # -1 is the red band's NoData and 0 + 0 has no NDVI
+    assert np.allclose(values, [[0.5, 0.0, np.nan], [-0.5, np.nan, 0.5]], equal_nan=True)
@@ -0,0 +1,85 @@
+import os
+
+import numpy as np
+import pytest
+
+from co2_arrays import (annual_stats, group_stats, load_daily_arrays, monthly_stats, parse_daily_csv, rolling_mean,
+                        seasonal_stats)
+from test_co2_stats import ROWS, write_daily
+
+
+def test_group_stats_matches_numpy():
+    rng = np.random.default_rng(9)
+    keys = rng.integers(-3, 40, 5000)
+    values = 400.0 + rng.normal(0, 5, 5000)
+    unique, stats = group_stats(keys, values)
+    assert unique.tolist() == sorted(set(keys.tolist()))
+    for index, key in enumerate(unique):
+        group = values[keys == key]
+        assert stats["count"][index] == len(group)
+        assert stats["mean"][index] == pytest.approx(group.mean(), rel=1e-12)
+        assert stats["std"][index] == pytest.approx(group.std(ddof=1) if len(group) > 1 else 0.0, abs=1e-9)
+        assert (stats["min"][index], stats["max"][index]) == (group.min(), group.max())
+
+
+def test_group_stats_single_values():
+    unique, stats = group_stats(np.array([5, 2, 5]), np.array([1.0, 7.0, 3.0]))
+    assert unique.tolist() == [2, 5]
+    assert stats["count"].tolist() == [1, 2] and stats["mean"].tolist() == [7.0, 2.0]
+    assert stats["std"][0] == 0.0 and stats["std"][1] == pytest.approx(np.sqrt(2.0))
+    assert stats["min"].tolist() == [7.0, 1.0] and stats["max"].tolist() == [7.0, 3.0]
+
+
+def test_parse_and_group(tmp_path):
+    path = str(tmp_path / "co2.csv")
+    write_daily(path)
+    dates, values = parse_daily_csv(path)
+    assert dates[0] == np.datetime64("1999-12-30") and dates[3] == np.datetime64("2000-03-01")
+    assert values.tolist() == [value for _, value in ROWS]
+
+    years, stats = annual_stats(dates, values)
+    assert years.tolist() == [1999, 2000, 2001] and stats["count"].tolist() == [1, 5, 1]
+    assert stats["mean"][1] == pytest.approx(np.mean(values[1:6]))
+    months, stats = monthly_stats(dates, values)
+    assert months[0] == np.datetime64("1999-12") and len(months) == 7
+    seasons, stats = seasonal_stats(dates, values)
+    assert seasons == ["Spring", "Summer", "Winter"] and stats["count"].tolist() == [1, 1, 5]
+
+
+def test_rolling_mean_matches_loop():
+    rng = np.random.default_rng(10)
+    # Irregular days, with gaps longer than the window
+    days = np.unique(np.concatenate([rng.integers(0, 60, 40), [100, 101]]))
+    dates = np.datetime64("2000-01-01") + days
+    values = 350.0 + rng.normal(0, 2, len(days))
+    calendar, means = rolling_mean(dates, values, 7)
+    assert calendar[0] == dates.min() and calendar[-1] == dates.max()
+    for index, day in enumerate(calendar):
+        window = (dates > day - 7) & (dates <= day)
+        if window.any():
+            assert means[index] == pytest.approx(values[window].mean(), rel=1e-12)
+        else:
+            assert np.isnan(means[index])
+
+
+def test_cache_is_invalidated(tmp_path):
+    path = str(tmp_path / "co2.csv")
+    write_daily(path)
+    dates, values = load_daily_arrays(path)
+    assert os.path.exists(str(tmp_path / "co2.npz"))
+    cached_dates, cached_values = load_daily_arrays(path)
+    assert np.array_equal(cached_dates, dates) and np.array_equal(cached_values, values)
+
+    # A changed CSV (new size and mtime) is parsed again and the sidecar rewritten
+    write_daily(path, ROWS[:3])
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    dates, values = load_daily_arrays(path)
+    assert values.tolist() == [value for _, value in ROWS[:3]]
+    with np.load(str(tmp_path / "co2.npz")) as saved:
+        assert saved["values"].tolist() == values.tolist()
+
+    # A corrupt sidecar is ignored
+    with open(str(tmp_path / "co2.npz"), "wb") as file:
+        file.write(b"not a zip")
+    assert load_daily_arrays(path)[1].tolist() == values.tolist()
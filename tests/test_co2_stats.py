@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from co2_stats import RunningStats, aggregate, iter_anomalies
+
+ROWS = [("12/30/1999", 368.5), ("1/2/2000", 369.25), ("2/28/2000", 370.0), ("3/1/2000", 371.5),
+        ("7/4/2000", 369.0), ("12/31/2000", 370.75), ("1/1/2001", 371.0)]
+
+
+def write_daily(path, rows=ROWS):
+    with open(path, "w") as file:
+        file.write("year,co2\n")
+        for date, value in rows:
+            file.write(f"{date},{value}\n")
+        # A blank line at the end is skipped
+        file.write("\n")
+
+
+def test_running_stats_matches_numpy():
+    # A large offset and a small spread, where sum(x^2) - n * mean^2 would lose most digits
+    values = 1e9 + np.random.default_rng(8).normal(0, 0.01, 1000)
+    stats = RunningStats()
+    for value in values:
+        stats.add(float(value))
+    assert stats.count == 1000
+    assert stats.mean == pytest.approx(values.mean(), rel=1e-15)
+    assert stats.variance == pytest.approx(values.var(ddof=1), rel=1e-6)
+    assert stats.std == pytest.approx(values.std(ddof=1), rel=1e-6)
+    assert (stats.min, stats.max) == (values.min(), values.max())
+
+
+def test_running_stats_short():
+    stats = RunningStats()
+    assert stats.variance == 0.0
+    stats.add(5.0)
+    assert (stats.count, stats.mean, stats.variance, stats.min, stats.max) == (1, 5.0, 0.0, 5.0, 5.0)
+
+
+def test_aggregate(tmp_path):
+    path = str(tmp_path / "co2.csv")
+    write_daily(path)
+    overall, by_year, by_season = aggregate(path)
+    values = np.array([value for _, value in ROWS])
+    assert overall.count == 7 and overall.mean == pytest.approx(values.mean())
+    assert overall.variance == pytest.approx(values.var(ddof=1))
+    assert sorted(by_year) == ["1999", "2000", "2001"]
+    year_2000 = values[1:6]
+    assert by_year["2000"].count == 5 and by_year["2000"].mean == pytest.approx(year_2000.mean())
+    assert by_year["2000"].std == pytest.approx(year_2000.std(ddof=1))
+    assert (by_year["2000"].min, by_year["2000"].max) == (369.0, 371.5)
+    # December, January and February are one winter across the years
+    winter = values[[0, 1, 2, 5, 6]]
+    assert by_season["Winter"].count == 5 and by_season["Winter"].mean == pytest.approx(winter.mean())
+    assert (by_season["Spring"].count, by_season["Summer"].count) == (1, 1) and "Autumn" not in by_season
+
+
+def test_anomalies(tmp_path):
+    path = str(tmp_path / "co2.csv")
+    write_daily(path)
+    anomalies = list(iter_anomalies(path, 370.0))
+    assert anomalies[0] == ("12/30/1999", -1.5) and anomalies[-1] == ("1/1/2001", 1.0)
+    assert len(anomalies) == 7
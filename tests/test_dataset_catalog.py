@@ -0,0 +1,104 @@
+import os
+
+import numpy as np
+
+from dataset_catalog import DatasetCatalog, describe, epsg_name
+from raster_io import save_geotiff
+from shapefile_io import POINT, POLYGON, ShapefileWriter
+
+WGS84_WKT = ('GEOGCS["GCS_WGS_1984",DATUM["D_WGS_1984",SPHEROID["WGS_1984",6378137.0,298.257223563]],'
+             'PRIMEM["Greenwich",0.0],UNIT["Degree",0.0174532925199433]]')
+
+
+def write_points(path, points, prj_wkt=WGS84_WKT):
+    with ShapefileWriter(path, POINT, [("Id", "N", 10, 0)], prj_wkt) as writer:
+        for index, point in enumerate(points):
+            writer.write([[point]], [index])
+    return path
+
+
+def write_bil(path, array, nodata):
+    with open(path[:-4] + ".hdr", "w") as file:
+        file.write(f"NROWS {array.shape[0]}\nNCOLS {array.shape[1]}\nNBANDS 1\nNBITS 32\nPIXELTYPE FLOAT\n"
+                   f"LAYOUT BIL\nULXMAP 10.5\nULYMAP 49.5\nXDIM 1\nYDIM 1\nNODATA {nodata}\n")
+    array.astype("<f4").tofile(path)
+    return path
+
+
+def test_describe_shapefile(tmp_path):
+    path = write_points(str(tmp_path / "wells.shp"), [(36.8, -1.3), (36.9, -1.2), (37.1, -1.25)])
+    description = describe(path)
+    assert description["dataType"] == "ShapeFile" and description["shapeType"] == "Point"
+    assert description["featureCount"] == 3
+    assert description["extent"] == [36.8, -1.3, 37.1, -1.2]
+    assert (description["spatialReference"], description["spatialReferenceType"]) == ("GCS_WGS_1984", "Geographic")
+
+    polygon = str(tmp_path / "area.shp")
+    with ShapefileWriter(polygon, POLYGON, [("Id", "N", 10, 0)]) as writer:
+        writer.write([[(0.0, 0.0), (0.0, 2.0), (3.0, 2.0), (0.0, 0.0)]], [1])
+    description = describe(polygon)
+    assert description["shapeType"] == "Polygon" and description["spatialReference"] == "Unknown"
+
+
+def test_describe_rasters(tmp_path):
+    tif = str(tmp_path / "elevation.tif")
+    save_geotiff(tif, np.zeros((4, 6), dtype=np.int16), (500000.0, 4600000.0, 30.0, 30.0), epsg=32619, nodata=-9999)
+    description = describe(tif)
+    assert (description["rows"], description["columns"], description["pixelType"]) == (4, 6, "int16")
+    assert description["noData"] == -9999 and description["cellSize"] == [30.0, 30.0]
+    assert description["extent"] == [500000.0, 4599880.0, 500180.0, 4600000.0]
+    assert (description["spatialReference"], description["spatialReferenceType"]) == \
+        ("WGS_1984_UTM_Zone_19N", "Projected")
+
+    bil = write_bil(str(tmp_path / "rain.bil"), np.ones((3, 2)), -1)
+    with open(str(tmp_path / "rain.prj"), "w") as file:
+        file.write(WGS84_WKT)
+    description = describe(bil)
+    assert description["pixelType"] == "float32" and description["noData"] == -1
+    assert description["extent"] == [10.0, 47.0, 12.0, 50.0]
+    assert description["spatialReference"] == "GCS_WGS_1984"
+
+
+def test_epsg_names():
+    assert epsg_name(4326) == "GCS_WGS_1984"
+    assert epsg_name(32737) == "WGS_1984_UTM_Zone_37S"
+    assert epsg_name(26918) == "NAD_1983_UTM_Zone_18N"
+    assert epsg_name(2193) == "EPSG:2193"
+
+
+def test_index_invalidation(tmp_path):
+    data = tmp_path / "data"
+    os.makedirs(str(data / "nested"))
+    wells = write_points(str(data / "wells.shp"), [(0.0, 0.0), (1.0, 1.0)])
+    roads = write_points(str(data / "nested" / "roads.shp"), [(5.0, 5.0)])
+    (data / "broken.shp").write_bytes(b"not a shapefile")
+    index_path = str(tmp_path / "index.json")
+
+    catalog = DatasetCatalog(index_path)
+    assert catalog.scan(str(data), workers=2) == (3, 3)
+    assert "error" in catalog.descriptions()[str(data / "broken.shp")]
+    catalog.save()
+
+    # Nothing changed: the saved index answers without describing anything again
+    catalog = DatasetCatalog(index_path)
+    assert catalog.scan(str(data)) == (3, 0)
+    assert catalog.descriptions(str(data / "nested")) == {roads: describe(roads)}
+
+    # A rewritten dataset is described again and a deleted one is dropped
+    write_points(wells, [(0.0, 0.0), (1.0, 1.0), (2.0, 3.0)])
+    stat = os.stat(wells)
+    os.utime(wells, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    os.remove(str(data / "broken.shp"))
+    assert catalog.scan(str(data)) == (2, 1)
+    descriptions = catalog.descriptions()
+    assert sorted(descriptions) == sorted([wells, roads])
+    assert descriptions[wells]["featureCount"] == 3
+
+
+def test_damaged_index(tmp_path):
+    index_path = tmp_path / "index.json"
+    index_path.write_text('{"truncated": ')
+    catalog = DatasetCatalog(str(index_path))
+    assert catalog.entries == {}
+    write_points(str(tmp_path / "wells.shp"), [(0.0, 0.0)])
+    assert catalog.scan(str(tmp_path)) == (1, 1)
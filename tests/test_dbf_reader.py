@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from dbf_reader import DbfReader, cpg_encoding, read_field_names
+from shapefile_io import POINT, ShapefileWriter
+
+FIELDS = [("Name", "C", 12, 0), ("Count", "N", 6, 0), ("Risk", "F", 8, 2), ("Missing", "N", 4, 0)]
+RECORDS = [["Kibera", 12, 3.5, None], ["Mathare é", -4, 0.25, 7], ["Langata-Karēn", 0, 10.0, None]]
+
+
+def write_table(path):
+    with ShapefileWriter(path, POINT, FIELDS) as writer:
+        for index, record in enumerate(RECORDS):
+            writer.write([[(float(index), 0.0)]], record)
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "points.shp")
+    write_table(path)
+    table = DbfReader(path)
+    assert len(table) == 3
+    assert table.field_names == read_field_names(path) == ["Name", "Count", "Risk", "Missing"]
+    values = table.read()
+    # Text is cut to 12 bytes of UTF-8 without splitting "ē" (bytes 12 and 13)
+    assert values["Name"].tolist() == ["Kibera", "Mathare é", "Langata-Kar"]
+    assert values["Count"].dtype == np.int64 and values["Count"].tolist() == [12, -4, 0]
+    assert values["Risk"].tolist() == [3.5, 0.25, 10.0]
+    # Blank integers are masked
+    assert values["Missing"].dtype == np.int64 and values["Missing"].tolist() == [None, 7, None]
+
+
+def test_columns_and_ranges(tmp_path):
+    path = str(tmp_path / "points.shp")
+    write_table(path)
+    table = DbfReader(path)
+    assert list(table.read(["count"])) == ["Count"]
+    assert table.read(["Count"], start=1)["Count"].tolist() == [-4, 0]
+    batches = [batch["Count"].tolist() for batch in table.iter_batches(["Count"], batch_size=2)]
+    assert batches == [[12, -4], [0]]
+    # Every batch of a column has the same dtype, whether or not it has blanks
+    dtypes = {batch["Missing"].dtype for batch in table.iter_batches(["Missing"], batch_size=1)}
+    assert dtypes == {np.dtype(np.int64)}
+    with pytest.raises(KeyError):
+        table.read(["Nope"])
+
+
+def test_deleted_records(tmp_path):
+    path = str(tmp_path / "points.shp")
+    write_table(path)
+    table = DbfReader(path)
+    # Mark the second record deleted, as dBASE does, with '*' in its flag byte
+    with open(str(tmp_path / "points.dbf"), 'r+b') as file:
+        file.seek(table.records.offset + table.records.shape[1])
+        file.write(b"*")
+    table = DbfReader(path)
+    assert table.read(["Count"])["Count"].tolist() == [12, 0]
+    assert table.read(["Count"], skip_deleted=False)["Count"].tolist() == [12, -4, 0]
+
+
+@pytest.mark.parametrize("text, encoding", [("UTF-8", "utf-8"), ("65001", "utf-8"), ("ANSI 1252", "cp1252"),
+                                            ("1252", "cp1252"), ("8859_1", "iso8859-1"),
+                                            ("ISO 88591", "iso8859-1"), ("OEM 437", "cp437"),
+                                            ("no such page", "latin-1")])
+def test_cpg_encoding(tmp_path, text, encoding):
+    with open(str(tmp_path / "table.cpg"), 'w') as file:
+        file.write(text + "\n")
+    assert cpg_encoding(str(tmp_path / "table.dbf")) == encoding
+
+
+def test_cpg_encoding_without_cpg(tmp_path):
+    assert cpg_encoding(str(tmp_path / "table.dbf")) == "latin-1"
+
+
+def test_latin_1_table_without_cpg(tmp_path):
+    path = str(tmp_path / "points.shp")
+    write_table(path)
+    (tmp_path / "points.cpg").unlink()
+    # Without the .cpg the UTF-8 bytes are read as latin-1, as ArcGIS would
+    assert DbfReader(path).read(["Name"])["Name"][1] == "Mathare Ã©"
+    assert DbfReader(path, encoding="utf-8").read(["Name"])["Name"][1] == "Mathare é"
+
+
+def test_dates(tmp_path):
+    path = str(tmp_path / "dates.shp")
+    with ShapefileWriter(path, POINT, [("Reported", "D", 8, 0)]) as writer:
+        for value in [20240131, None, 20231301]:
+            writer.write([[(0.0, 0.0)]], [value])
+    dates = DbfReader(path).read()["Reported"]
+    assert dates[0] == np.datetime64("2024-01-31")
+    # Blank and impossible dates are NaT
+    assert np.isnat(dates[1:]).all()
@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+
+from depression_filling import fill_depressions, fill_depressions_heap, fill_depressions_naive, tiled_fill_depressions
+from hydrology_numpy import flow_direction
+from raster_io import RasterReader
+
+TRANSFORM = (0.0, 0.0, 1.0, 1.0)
+
+
+def random_dem(seed):
+    # Small DEMs with coarse (so many flat) elevations and scattered NoData
+    rng = np.random.default_rng(seed)
+    rows, cols = rng.integers(1, 12, size=2)
+    dem = np.round(rng.random((rows, cols)) * 6).astype(np.float32)
+    dem[rng.random(dem.shape) < 0.1] = np.nan
+    return dem
+
+
+def brute_force_fill(dem):
+    """Fill level straight from its definition: the lowest level t at which a cell is joined to a
+    cell draining out of the DEM (edge or next to NoData) by cells no higher than t."""
+    rows, cols = dem.shape
+    valid = ~np.isnan(dem)
+    neighbours = [(dr, dc) for dr in (-1, 0, 1) for dc in (-1, 0, 1) if dr or dc]
+
+    def drains_out(row, col):
+        return any(not (0 <= row + dr < rows and 0 <= col + dc < cols) or not valid[row + dr, col + dc]
+                   for dr, dc in neighbours)
+
+    filled = np.full(dem.shape, np.nan)
+    for level in sorted(set(dem[valid].tolist())):
+        below = valid & (dem <= level)
+        stack = [(row, col) for row, col in zip(*np.nonzero(below)) if drains_out(row, col)]
+        reached = np.zeros(dem.shape, dtype=bool)
+        for cell in stack:
+            reached[cell] = True
+        while stack:
+            row, col = stack.pop()
+            for dr, dc in neighbours:
+                r, c = row + dr, col + dc
+                if 0 <= r < rows and 0 <= c < cols and below[r, c] and not reached[r, c]:
+                    reached[r, c] = True
+                    stack.append((r, c))
+        new = reached & np.isnan(filled)
+        filled[new] = level
+    # A cell is never lowered, and cells not reached below their own level drain at it
+    return np.where(valid, np.fmax(filled, dem), np.nan)
+
+
+def sinks(filled):
+    # Cells with no downhill neighbour, apart from those next to NoData, which the fill drains into
+    nodata = np.pad(np.isnan(filled), 1)
+    rows, cols = filled.shape
+    next_to_nodata = np.zeros(filled.shape, dtype=bool)
+    for dr in (-1, 0, 1):
+        for dc in (-1, 0, 1):
+            next_to_nodata |= nodata[1 + dr:rows + 1 + dr, 1 + dc:cols + 1 + dc]
+    return int(((flow_direction(filled) == 0) & ~np.isnan(filled) & ~next_to_nodata).sum())
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_fills_match_brute_force(seed):
+    dem = random_dem(seed)
+    expected = brute_force_fill(dem)
+    for fill in (fill_depressions, fill_depressions_heap, fill_depressions_naive):
+        np.testing.assert_array_equal(fill(dem), expected)
+
+
+def test_pit_is_filled_to_its_spill_level():
+    dem = np.array([[5, 5, 5, 5, 5],
+                    [5, 3, 3, 3, 5],
+                    [5, 3, 1, 3, 4],
+                    [5, 3, 3, 3, 5],
+                    [5, 5, 5, 5, 5]], dtype=np.float32)
+    expected = np.where(dem < 4, 4, dem)
+    np.testing.assert_array_equal(fill_depressions(dem), expected)
+    np.testing.assert_array_equal(fill_depressions_heap(dem), expected)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_epsilon_fill_leaves_no_sinks(seed):
+    dem = random_dem(seed)
+    filled = fill_depressions(dem, epsilon=True)
+    assert filled.dtype == np.float64
+    assert sinks(filled) == 0
+    np.testing.assert_allclose(filled, fill_depressions(dem), atol=1e-9)
+
+
+@pytest.mark.parametrize("strip_rows", [1, 2, 3, 5])
+def test_tiled_fill_matches_in_memory(tmp_path, strip_rows):
+    for seed in range(15):
+        dem = random_dem(seed)
+        out = tiled_fill_depressions(RasterReader(dem, TRANSFORM), str(tmp_path / "filled.tif"), strip_rows,
+                                     str(tmp_path))
+        np.testing.assert_array_equal(out.read(0, dem.shape[0]), fill_depressions(dem))
+
+
+@pytest.mark.parametrize("strip_rows", [1, 2, 3, 5])
+def test_tiled_epsilon_fill_leaves_no_sinks(tmp_path, strip_rows):
+    for seed in range(15):
+        dem = random_dem(seed)
+        out = tiled_fill_depressions(RasterReader(dem, TRANSFORM), str(tmp_path / "filled.tif"), strip_rows,
+                                     str(tmp_path), epsilon=True)
+        filled = out.read(0, dem.shape[0])
+        assert sinks(filled) == 0
+        np.testing.assert_allclose(filled, fill_depressions(dem), atol=1e-9)
@@ -0,0 +1,51 @@
+import json
+
+import numpy as np
+
+from shapefile_io import POLYGON, ShapefileWriter
+from spatial_index import join_point_attributes, join_to_structured_json
+from test_spatial_index import brute_force_pairs, delete_record, random_polygons
+
+FIELDS = [("NAME_1", "C", 12, 0), ("NAME_2", "C", 12, 0)]
+
+
+def write_admin(path, polygons):
+    with ShapefileWriter(path, POLYGON, FIELDS) as writer:
+        for index, rings in enumerate(polygons):
+            writer.write([ring.tolist() for ring in rings], [f"county {index // 3}", f"const {index}"])
+
+
+def test_join_point_attributes_matches_brute_force(tmp_path):
+    rng = np.random.default_rng(11)
+    polygons = random_polygons(rng, 9)
+    path = str(tmp_path / "admin.shp")
+    write_admin(path, polygons)
+    delete_record(path, 4)
+    live = np.arange(len(polygons)) != 4
+    xy = rng.uniform(-1, 11, (250, 2))
+    point, values = join_point_attributes(xy, path, ["NAME_2", "name_1", "NAME_3"])
+    expected = brute_force_pairs(xy, polygons, live_polygons=live)
+    assert point.tolist() == [pair[0] for pair in expected]
+    assert values["NAME_2"].tolist() == [f"const {pair[1]}" for pair in expected]
+    assert values["name_1"].tolist() == [f"county {pair[1] // 3}" for pair in expected]
+    # The admin layer has no NAME_3
+    assert values["NAME_3"].tolist() == [None] * len(expected)
+
+
+def test_join_to_structured_json(tmp_path):
+    rng = np.random.default_rng(12)
+    polygons = random_polygons(rng, 6)
+    path = str(tmp_path / "admin.shp")
+    write_admin(path, polygons)
+    xy = rng.uniform(-1, 11, (100, 2))
+    risk = np.ma.MaskedArray(np.arange(100) % 11, mask=np.arange(100) == 7)
+    out = str(tmp_path / "risk.json")
+    count = join_to_structured_json(xy, risk, path, out, ndjson=True)
+    expected = brute_force_pairs(xy, polygons)
+    with open(out) as file:
+        entries = [json.loads(line) for line in file]
+    assert count == len(entries) == len(expected)
+    for entry, (point, polygon) in zip(entries, expected):
+        assert entry == {"Constituency": f"const {polygon}", "County": f"county {polygon // 3}", "Ward": None,
+                         "Risk Factor": None if point == 7 else point % 11,
+                         "Longitude": xy[point, 0], "Latitude": xy[point, 1]}
@@ -0,0 +1,121 @@
+import numpy as np
+import pytest
+
+from heatmap_binning import (bin_points, coarsen, count_points, count_table, fishnet_grid, heatmap_pyramid,
+                             iter_point_chunks, point_extent)
+
+
+def direct_count(x, y, transform, shape):
+    # One point at a time: the column and row whose bounds hold it, the last cell closed on both sides
+    x_min, y_max, cell_width, cell_height = transform
+    rows, cols = shape
+    counts = np.zeros(shape, dtype=np.int64)
+    for point_x, point_y in zip(x, y):
+        for row in range(rows):
+            top = y_max - row * cell_height
+            bottom = top - cell_height
+            if not (bottom < point_y <= top or (row == rows - 1 and point_y == bottom)):
+                continue
+            for col in range(cols):
+                left = x_min + col * cell_width
+                right = left + cell_width
+                if left <= point_x < right or (col == cols - 1 and point_x == right):
+                    counts[row, col] += 1
+    return counts
+
+
+def test_fishnet_grid():
+    transform, shape = fishnet_grid((10.0, 20.0, 13.5, 22.0), 0.5)
+    assert shape == (4, 7) and transform == (10.0, 22.0, 0.5, 0.5)
+    # Extended to whole cells from the lower-left corner
+    transform, shape = fishnet_grid((10.0, 20.0, 13.2, 21.1), 0.5)
+    assert shape == (3, 7) and transform == (10.0, 21.5, 0.5, 0.5)
+
+
+def test_bin_points_matches_direct_count():
+    rng = np.random.default_rng(3)
+    transform, shape = (0.0, 8.0, 1.0, 1.0), (8, 10)
+    # Random points, points on the grid lines, on the far edges, outside and NaN
+    x = np.concatenate([rng.uniform(-1, 11, 400), [0.0, 3.0, 10.0, 10.0, 5.0, np.nan, 2.0]])
+    y = np.concatenate([rng.uniform(-1, 9, 400), [8.0, 4.0, 0.0, 8.0, 0.0, 2.0, np.nan]])
+    counts = bin_points(x, y, transform, shape)
+    assert np.array_equal(counts, direct_count(x, y, transform, shape))
+    inside = (x >= 0) & (x <= 10) & (y >= 0) & (y <= 8)
+    assert counts.sum() == inside.sum()
+
+
+def test_bin_points_accumulates():
+    transform, shape = (0.0, 2.0, 1.0, 1.0), (2, 2)
+    counts = bin_points([0.5], [1.5], transform, shape)
+    bin_points([0.5, 1.5], [1.5, 0.5], transform, shape, counts)
+    assert counts.tolist() == [[2, 0], [0, 1]]
+
+
+def write_points(path, x, y):
+    with open(path, "w") as file:
+        file.write("id,lat,lon\n")
+        for index, (point_x, point_y) in enumerate(zip(x, y)):
+            file.write(f"{index},{float(point_y)!r},{float(point_x)!r}\n")
+            if index == 100:
+                # Rows without coordinates are skipped
+                file.write("101,,\n102,unknown,1.0\n")
+
+
+def test_point_chunks(tmp_path):
+    rng = np.random.default_rng(5)
+    x, y = rng.uniform(0, 4, 300), rng.uniform(0, 3, 300)
+    path = str(tmp_path / "points.csv")
+    write_points(path, x, y)
+    # Chunks much smaller than the file, so lines are cut between chunks
+    chunks = list(iter_point_chunks(path, chunk_bytes=500))
+    assert len(chunks) > 10
+    assert np.array_equal(np.concatenate([chunk_x for chunk_x, _ in chunks]), x)
+    assert np.array_equal(np.concatenate([chunk_y for _, chunk_y in chunks]), y)
+
+
+def test_count_points(tmp_path):
+    rng = np.random.default_rng(5)
+    x, y = rng.uniform(0, 4, 300), rng.uniform(0, 3, 300)
+    path = str(tmp_path / "points.csv")
+    write_points(path, x, y)
+    counts, transform = count_points(path, (0.0, 0.0, 4.0, 3.0), 0.5)
+    assert transform == (0.0, 3.0, 0.5, 0.5)
+    assert np.array_equal(counts, direct_count(x, y, transform, (6, 8)))
+
+
+def test_point_extent(tmp_path):
+    rng = np.random.default_rng(7)
+    x, y = rng.uniform(-3, 4, 300), rng.uniform(1, 3, 300)
+    path = str(tmp_path / "points.csv")
+    write_points(path, x, y)
+    assert point_extent(path) == (x.min(), y.min(), x.max(), y.max())
+    empty = tmp_path / "empty.csv"
+    empty.write_text("id,lat,lon\n1,,\n")
+    with pytest.raises(ValueError):
+        point_extent(str(empty))
+
+
+@pytest.mark.parametrize("factor", [2, 3, 4])
+def test_coarsen_matches_direct_count(factor):
+    rng = np.random.default_rng(factor)
+    x, y = rng.uniform(0, 10, 500), rng.uniform(0, 7, 500)
+    transform, shape = fishnet_grid((0.0, 0.0, 10.0, 7.0), 1.0)
+    coarse, coarse_transform = coarsen(bin_points(x, y, transform, shape), transform, factor)
+    # Same lower-left corner, grid extended to whole coarse cells at the top and right
+    coarse_shape = (-(-7 // factor), -(-10 // factor))
+    assert coarse.shape == coarse_shape
+    assert coarse_transform == (0.0, coarse_shape[0] * factor, factor, factor)
+    assert np.array_equal(coarse, direct_count(x, y, coarse_transform, coarse_shape))
+
+
+def test_heatmap_pyramid():
+    counts = np.arange(12, dtype=np.int64).reshape(3, 4)
+    transform = (0.0, 3.0, 0.5, 0.5)
+    levels = heatmap_pyramid(counts, transform, [1.0, 0.5])
+    assert levels[0.5][0] is counts
+    # The odd row count is padded with an empty row at the top
+    assert levels[1.0][0].tolist() == [[1, 5], [26, 34]] and levels[1.0][1] == (0.0, 3.5, 1.0, 1.0)
+    with pytest.raises(ValueError):
+        heatmap_pyramid(counts, transform, [0.75])
+    cells, values = count_table(levels[1.0][0])
+    assert cells.tolist() == [0, 1, 2, 3] and values.tolist() == [1, 5, 26, 34]
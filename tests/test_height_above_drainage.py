@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from benchmark_depression_filling import pitted_dem
+from depression_filling import fill_depressions
+from floodplain import flood_extents, flood_stage_classes, inundated_area
+from hydrology_numpy import flow_accumulation, flow_direction, height_above_drainage
+from raster_io import RasterReader
+from tiled_processing import tiled_height_above_drainage
+
+TRANSFORM = (0.0, 0.0, 1.0, 1.0)
+
+
+def hand_inputs(seed):
+    rng = np.random.default_rng(seed)
+    size = int(rng.integers(5, 40))
+    dem = pitted_dem(size, seed).astype(np.float64)
+    dem[rng.random(dem.shape) < 0.03] = np.nan
+    filled = fill_depressions(dem, epsilon=True)
+    direction = flow_direction(filled)
+    streams = flow_accumulation(direction) > 10
+    return filled, direction, streams
+
+
+def test_stream_cells_are_zero_and_nothing_is_below_its_stream():
+    filled, direction, streams = hand_inputs(0)
+    hand = height_above_drainage(filled, direction, streams)
+    assert (hand[streams & ~np.isnan(filled)] == 0).all()
+    assert not (hand < 0).any()
+
+
+def test_hand_of_a_valley():
+    # A V-shaped valley draining south along its middle column
+    rows = np.arange(5, dtype=np.float64)[:, np.newaxis]
+    dem = np.abs(np.arange(5) - 2)[np.newaxis, :] * 2.0 + (4 - rows)
+    direction = flow_direction(dem)
+    streams = np.zeros(dem.shape, dtype=bool)
+    streams[:, 2] = True
+    hand = height_above_drainage(dem, direction, streams)
+    assert hand[:, 2].tolist() == [0.0] * 5
+    # Side cells drain diagonally, reaching the stream one row down per column, where it is 1 lower
+    assert hand[2].tolist() == [6.0, 3.0, 0.0, 3.0, 6.0]
+
+
+@pytest.mark.parametrize("strip_rows", [1, 2, 3, 7])
+def test_tiled_matches_in_memory(tmp_path, strip_rows):
+    for seed in range(8):
+        filled, direction, streams = hand_inputs(seed)
+        hand = height_above_drainage(filled, direction, streams)
+        out = tiled_height_above_drainage(RasterReader(filled, TRANSFORM), RasterReader(direction, TRANSFORM),
+                                          RasterReader(streams.astype(np.uint8), TRANSFORM),
+                                          str(tmp_path / "hand.tif"), strip_rows)
+        np.testing.assert_allclose(out.read(0, hand.shape[0]), hand, rtol=1e-6)
+
+
+def test_flood_stages_agree():
+    filled, direction, streams = hand_inputs(3)
+    hand = height_above_drainage(filled, direction, streams)
+    stages = [0.5, 1.0, 2.0, 5.0]
+    extents = flood_extents(hand, stages)
+    classes = flood_stage_classes(hand, stages)
+    for index in range(len(stages)):
+        assert np.array_equal(extents[index], (classes > 0) & (classes <= index + 1))
+    assert inundated_area(hand, stages, 900.0).tolist() == (extents.sum(axis=(1, 2)) * 900.0).tolist()
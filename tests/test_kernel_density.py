@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from heatmap_binning import bin_points
+from kernel_density import kernel_density, kernel_weights, naive_kernel_density
+
+
+@pytest.mark.parametrize("kernel", ["quartic", "gaussian"])
+def test_fft_matches_naive(kernel):
+    # Points at cell centres, so binning loses nothing and the two must agree
+    rng = np.random.default_rng(11)
+    transform, shape = (100.0, 250.0, 2.0, 2.5), (40, 60)
+    col, row = rng.integers(0, 60, 200), rng.integers(0, 40, 200)
+    x = 100.0 + (col + 0.5) * 2.0
+    y = 250.0 - (row + 0.5) * 2.5
+    counts = bin_points(x, y, transform, shape)
+    fft = kernel_density(counts, transform, 12.0, kernel)
+    naive = naive_kernel_density(x, y, transform, shape, 12.0, kernel)
+    assert fft.dtype == np.float32 and fft.shape == shape
+    # The gaussian is cut at 4 sigma, where it has fallen to exp(-8) of its peak
+    assert np.allclose(fft, naive, rtol=1e-4, atol=1e-3 * naive.max() if kernel == "gaussian" else 1e-7)
+    assert (fft >= 0).all()
+
+
+def test_points_near_the_edge():
+    # Kernels cut by the grid edge are not wrapped around to the other side
+    transform, shape = (0.0, 10.0, 1.0, 1.0), (10, 10)
+    counts = np.zeros(shape, dtype=np.int64)
+    counts[0, 0] = 3
+    density = kernel_density(counts, transform, 3.0)
+    naive = naive_kernel_density([0.5] * 3, [9.5] * 3, transform, shape, 3.0)
+    assert np.allclose(density, naive, atol=1e-7)
+    # Beyond the radius only FFT round-off is left
+    assert density[-1, -1] < 1e-12 and density[0, -1] < 1e-12
+
+
+@pytest.mark.parametrize("kernel", ["quartic", "gaussian"])
+def test_kernel_integrates_to_one(kernel):
+    weights = kernel_weights(5.0, 0.25, 0.25, kernel)
+    assert weights.shape[0] % 2 == 1 and weights.shape[1] % 2 == 1
+    assert weights.sum() * 0.25 * 0.25 == pytest.approx(1.0, rel=1e-3)
+
+
+def test_unknown_kernel():
+    with pytest.raises(ValueError):
+        kernel_weights(1.0, 0.1, 0.1, "epanechnikov")
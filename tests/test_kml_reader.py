@@ -0,0 +1,143 @@
+import json
+import os
+import zipfile
+
+import numpy as np
+import pytest
+
+from dbf_reader import DbfReader
+from kml_reader import convert_folder, dbf_field_names, iter_placemarks, kml_to_geojson, kml_to_shapefiles, \
+    parse_coordinates
+from raster_vectorize import ring_area
+from shapefile_io import read_points, read_polygons
+
+KML = """<?xml version="1.0" encoding="UTF-8"?>
+<kml xmlns="http://www.opengis.net/kml/2.2">
+<Document>
+  <Folder>
+    <Placemark>
+      <name>Clinic é</name>
+      <ExtendedData><Data name="beds"><value>12</value></Data></ExtendedData>
+      <Point><coordinates>36.80,-1.28,0</coordinates></Point>
+    </Placemark>
+    <Placemark>
+      <name>Road</name>
+      <LineString><coordinates>36.0,-1.0 36.5,-1.5
+        37.0,-1.0</coordinates></LineString>
+    </Placemark>
+    <Placemark>
+      <name>Ward</name>
+      <description>Counter-clockwise outer ring with a hole</description>
+      <ExtendedData><SchemaData><SimpleData name="ward_population_2019">1234</SimpleData></SchemaData></ExtendedData>
+      <Polygon>
+        <outerBoundaryIs><LinearRing><coordinates>0,0 4,0 4,4 0,4 0,0</coordinates></LinearRing></outerBoundaryIs>
+        <innerBoundaryIs><LinearRing><coordinates>1,1 1,2 2,2 2,1 1,1</coordinates></LinearRing></innerBoundaryIs>
+      </Polygon>
+    </Placemark>
+    <Placemark>
+      <name>Islands</name>
+      <MultiGeometry>
+        <Polygon><outerBoundaryIs><LinearRing><coordinates>10,0 10,1 11,1 11,0 10,0</coordinates></LinearRing></outerBoundaryIs></Polygon>
+        <Polygon><outerBoundaryIs><LinearRing><coordinates>12,0 13,0 13,1 12,1 12,0</coordinates></LinearRing></outerBoundaryIs></Polygon>
+        <Point><coordinates>10.5,0.5</coordinates></Point>
+      </MultiGeometry>
+    </Placemark>
+  </Folder>
+</Document>
+</kml>
+"""
+
+
+@pytest.fixture
+def kml_path(tmp_path):
+    path = tmp_path / "wards.kml"
+    path.write_text(KML, encoding="utf-8")
+    return str(path)
+
+
+def test_parse_coordinates():
+    assert parse_coordinates("1,2,3 4,5,6").tolist() == [[1.0, 2.0], [4.0, 5.0]]
+    assert parse_coordinates("1,2\n 4,5").tolist() == [[1.0, 2.0], [4.0, 5.0]]
+    assert parse_coordinates("  ").shape == (0, 2)
+
+
+def test_dbf_field_names_are_unique():
+    names = dbf_field_names(["ward_population_2019", "ward_population_2009", "Name", "name", ""])
+    assert names["ward_population_2019"] == "ward_popul"
+    assert names["ward_population_2009"] == "ward_popu1"
+    assert names["name"] == "name1" and names[""] == "FIELD"
+    assert all(len(field) <= 10 for field in names.values())
+
+
+def test_iter_placemarks(kml_path):
+    placemarks = list(iter_placemarks(kml_path))
+    assert [attributes["Name"] for attributes, _ in placemarks] == ["Clinic é", "Road", "Ward", "Islands"]
+    assert placemarks[0][0]["beds"] == "12"
+    assert placemarks[2][0]["ward_population_2019"] == "1234"
+    assert [kind for kind, _ in placemarks[3][1]] == ["Polygon", "Polygon", "Point"]
+    kind, parts = placemarks[2][1][0]
+    assert kind == "Polygon" and len(parts) == 2
+    assert placemarks[1][1][0][1][0].tolist() == [[36.0, -1.0], [36.5, -1.5], [37.0, -1.0]]
+
+
+def test_kmz_matches_kml(kml_path, tmp_path):
+    kmz_path = str(tmp_path / "wards.kmz")
+    with zipfile.ZipFile(kmz_path, 'w') as archive:
+        archive.writestr("files/readme.txt", "not a document")
+        archive.writestr("doc.kml", KML)
+    kml = [(attributes, [(kind, [part.tolist() for part in parts]) for kind, parts in geometries])
+           for attributes, geometries in iter_placemarks(kml_path)]
+    kmz = [(attributes, [(kind, [part.tolist() for part in parts]) for kind, parts in geometries])
+           for attributes, geometries in iter_placemarks(kmz_path)]
+    assert kml == kmz
+
+
+def test_kml_to_shapefiles(kml_path, tmp_path):
+    out = tmp_path / "out"
+    out.mkdir()
+    counts = kml_to_shapefiles(kml_path, str(out))
+    assert {os.path.basename(path): count for path, count in counts.items()} == \
+        {"wards_point.shp": 2, "wards_line.shp": 1, "wards_polygon.shp": 2}
+    assert (out / "wards_point.cpg").read_text() == "UTF-8"
+    assert (out / "wards_point.prj").read_text().startswith('GEOGCS["GCS_WGS_1984"')
+
+    assert read_points(str(out / "wards_point.shp")).tolist() == [[36.8, -1.28], [10.5, 0.5]]
+    points = DbfReader(str(out / "wards_point.shp")).read()
+    assert points["Name"].tolist() == ["Clinic é", "Islands"]
+    assert points["beds"].tolist() == ["12", ""]
+
+    _, parts = read_polygons(str(out / "wards_polygon.shp"))
+    # The ward's outer ring and hole, then both islands as one multipart shape
+    assert [len(rings) for rings in parts] == [2, 2]
+    for rings in parts:
+        assert ring_area(rings[0]) < 0
+    assert ring_area(parts[0][1]) > 0
+    assert ring_area(parts[1][1]) < 0
+    assert np.isclose(-sum(ring_area(ring) for ring in parts[0]), 15.0)
+    polygons = DbfReader(str(out / "wards_polygon.shp")).read()
+    assert polygons["ward_popul"].tolist() == ["1234", ""]
+
+
+def test_kml_to_geojson(kml_path, tmp_path):
+    path = str(tmp_path / "wards.geojson")
+    assert kml_to_geojson(kml_path, path) == 4
+    with open(path, encoding="utf-8") as file:
+        features = json.load(file)["features"]
+    assert [feature["geometry"]["type"] for feature in features] == \
+        ["Point", "LineString", "Polygon", "GeometryCollection"]
+    assert features[0]["properties"] == {"Name": "Clinic é", "beds": "12"}
+    assert features[0]["geometry"]["coordinates"] == [36.8, -1.28]
+    assert len(features[2]["geometry"]["coordinates"]) == 2
+
+
+def test_convert_folder_keeps_colliding_names_apart(kml_path, tmp_path):
+    with zipfile.ZipFile(str(tmp_path / "wards.kmz"), 'w') as archive:
+        archive.writestr("doc.kml", KML)
+    (tmp_path / "broken.kml").write_text("<kml><Placemark>", encoding="utf-8")
+    out = str(tmp_path / "out")
+    results = convert_folder(str(tmp_path), out, workers=1)
+    assert isinstance(results[str(tmp_path / "broken.kml")], str)
+    assert sorted(os.path.basename(path) for path in results[kml_path]) == \
+        ["wards_kml_line.shp", "wards_kml_point.shp", "wards_kml_polygon.shp"]
+    assert sorted(os.path.basename(path) for path in results[str(tmp_path / "wards.kmz")]) == \
+        ["wards_kmz_line.shp", "wards_kmz_point.shp", "wards_kmz_polygon.shp"]
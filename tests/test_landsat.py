@@ -0,0 +1,44 @@
+from landsat import find_band_pairs, parse_landsat_name
+
+
+def test_collection_name():
+    parts = parse_landsat_name("data/LC08_L1TP_012031_20200615_20200625_02_T1_B4.TIF")
+    assert parts["scene"] == "LC08_L1TP_012031_20200615_20200625_02_T1"
+    assert (parts["sensor"], parts["satellite"], parts["path"], parts["row"]) == ("LC", 8, "012", "031")
+    assert (parts["acquired"], parts["tier"], parts["band_number"]) == ("20200615", "T1", "B4")
+    # Level-2 surface reflectance bands pair like the level-1 bands
+    assert parse_landsat_name("LC09_L2SP_012031_20220110_20220112_02_T1_SR_B5.TIF")["band_number"] == "B5"
+
+
+def test_legacy_name():
+    parts = parse_landsat_name("LT50120311995167XXX02_B3.tif")
+    assert parts["scene"] == "LT50120311995167XXX02"
+    assert (parts["sensor"], parts["satellite"], parts["acquired"], parts["band"]) == ("LT", 5, "1995167", "B3")
+
+
+def test_not_landsat():
+    for name in ["LC08_L1TP_012031_20200615_20200625_02_T1_MTL.txt", "ndvi.tif",
+                 "LC08_L1TP_012031_20200615_20200625_02_T1_B4.TIF.aux.xml", "LC8_B4.TIF"]:
+        assert parse_landsat_name(name) is None
+
+
+def test_band_pairs():
+    names = ["LC08_L1TP_012031_20200615_20200625_02_T1_B4.TIF",
+             "LC08_L1TP_012031_20200615_20200625_02_T1_B5.TIF",
+             "LC08_L1TP_012031_20200615_20200625_02_T1_B3.TIF",
+             "LE07_L1TP_012031_20010610_20160929_01_T1_B3.TIF",
+             "LE07_L1TP_012031_20010610_20160929_01_T1_B4.TIF",
+             "LT50120311995167XXX02_B3.TIF",
+             "LT50120311995167XXX02_B4.TIF",
+             # MSS on Landsat 5 uses B2 and B4, not the TM bands
+             "LM05_L1GS_012031_19920610_20180320_01_T2_B2.TIF",
+             "LM05_L1GS_012031_19920610_20180320_01_T2_B4.TIF",
+             # Red without near-infrared is not a pair
+             "LC09_L1TP_012031_20220110_20220112_02_T1_B4.TIF",
+             "notes.txt"]
+    assert find_band_pairs(names) == {
+        "LC08_L1TP_012031_20200615_20200625_02_T1": (names[0], names[1]),
+        "LE07_L1TP_012031_20010610_20160929_01_T1": (names[3], names[4]),
+        "LT50120311995167XXX02": (names[5], names[6]),
+        "LM05_L1GS_012031_19920610_20180320_01_T2": (names[7], names[8]),
+    }
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+import lazy_raster
+from lazy_raster import Con, IsNull, save_all, source
+from raster_io import open_geotiff, save_geotiff
+
+TRANSFORM = (0.0, 10.0, 1.0, 1.0)
+
+
+def bands(seed=0, shape=(37, 23)):
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 2000, shape).astype(np.uint16), rng.integers(0, 2000, shape).astype(np.uint16)
+
+
+def eager_ndvi(red, nir):
+    red, nir = red.astype(np.float32), nir.astype(np.float32)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (nir - red) / (nir + red)
+
+
+@pytest.mark.parametrize("block_rows", [1, 5, 256])
+def test_ndvi_matches_eager(block_rows):
+    red, nir = bands()
+    red[0, :3] = nir[0, :3] = 0
+    lazy = (source(nir) - source(red)) / (source(nir) + source(red))
+    np.testing.assert_array_equal(lazy.compute(block_rows), eager_ndvi(red, nir))
+
+
+def test_con_keeps_the_smallest_type():
+    red, nir = bands()
+    ndvi = (source(nir) - source(red)) / (source(nir) + source(red))
+    eager = eager_ndvi(red, nir)
+    vegetated = Con(ndvi > 0.3, 1, 0).compute(7)
+    assert vegetated.dtype == np.uint8
+    np.testing.assert_array_equal(vegetated, np.where(eager > 0.3, 1, 0).astype(np.uint8))
+    assert Con(ndvi > 0.3, -1, 300).compute().dtype == np.int16
+    masked = Con(ndvi > 0.3, 1).compute()
+    assert masked.dtype == np.float32
+    np.testing.assert_array_equal(masked, np.where(eager > 0.3, 1.0, np.nan).astype(np.float32))
+    np.testing.assert_array_equal(Con(ndvi > 0.3, ndvi, 0).compute(), np.where(eager > 0.3, eager, 0))
+
+
+def test_nodata_is_masked_and_found_by_isnull():
+    dem = np.arange(30, dtype=np.int16).reshape(5, 6)
+    dem[1, 2] = dem[4, 5] = -9999
+    raster = source(dem, TRANSFORM, nodata=-9999)
+    null = IsNull(raster).compute(2)
+    np.testing.assert_array_equal(null, dem == -9999)
+    doubled = (raster * 2).compute()
+    np.testing.assert_array_equal(doubled, np.where(dem == -9999, np.nan, dem * 2.0).astype(np.float32))
+    assert Con(IsNull(raster), 1, 0).compute().dtype == np.uint8
+
+
+def test_save_all_writes_the_eager_types(tmp_path):
+    red, nir = bands(1)
+    red_path, nir_path = str(tmp_path / "B4.tif"), str(tmp_path / "B5.tif")
+    save_geotiff(red_path, red, TRANSFORM, nodata=0)
+    save_geotiff(nir_path, nir, TRANSFORM, nodata=0)
+    ndvi = (source(nir_path) - source(red_path)) / (source(nir_path) + source(red_path))
+    outputs = {str(tmp_path / "ndvi.tif"): ndvi, str(tmp_path / "veg.tif"): Con(ndvi > 0.3, 1, 0)}
+    save_all(outputs, block_rows=4)
+
+    eager = eager_ndvi(red, nir)
+    eager[(red == 0) | (nir == 0)] = np.nan
+    saved = open_geotiff(str(tmp_path / "ndvi.tif"))
+    np.testing.assert_array_equal(saved.read(0, red.shape[0]), eager)
+    veg = open_geotiff(str(tmp_path / "veg.tif"))
+    assert veg.dtype == np.uint8
+    np.testing.assert_array_equal(veg.read(0, red.shape[0]), (eager > 0.3).astype(np.uint8))
+
+
+def test_shared_subexpressions_are_computed_once(monkeypatch):
+    red, nir = bands(2)
+    calls = []
+    original = lazy_raster._masked_read
+
+    def counting_read(reader, row0, row1):
+        calls.append(row0)
+        return original(reader, row0, row1)
+
+    monkeypatch.setattr(lazy_raster, "_masked_read", counting_read)
+    red_source, nir_source = source(red), source(nir)
+    ndvi = (nir_source - red_source) / (nir_source + red_source)
+    (ndvi * ndvi + ndvi).compute(block_rows=10)
+    # Two sources, four blocks of rows
+    assert len(calls) == 8
+
+
+def test_array_operands():
+    red, nir = bands(3)
+    offset = np.full(red.shape, 5, dtype=np.float32)
+    np.testing.assert_array_equal((source(red) + offset).compute(3), red.astype(np.float32) + 5)
+    np.testing.assert_array_equal((offset - source(red)).compute(3), 5 - red.astype(np.float32))
+    with pytest.raises(ValueError):
+        source(red) + np.zeros((2, 2))
@@ -0,0 +1,91 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+from precipitation_table import ingest_directory, ingest_files, read_station_csv, series_numbers, to_long
+
+# Two runs of years for one station, as in the NOAA export; 2001 has blank months
+ROWS = [
+    [2000, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12],
+    [2001, 0.5, "", 1.5, "", "", "", "", "", "", "", "", 2],
+    [2000, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2],
+    [2001, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1],
+]
+
+
+def write_station(path, rows=ROWS):
+    with open(path, "w") as file:
+        file.write("Latitude,longitude,YEAR,JAN,FEB,MAR,APR,MAY,JUN,JUL,AUG,SEP,OCT,NOV,DEC\n")
+        for row in rows:
+            file.write(",".join(str(value) for value in [41.5, -71.5] + row) + "\n")
+
+
+def test_series_numbers():
+    assert series_numbers(np.array([2000, 2001, 2002, 2000, 2001, 2001])).tolist() == [1, 1, 1, 2, 2, 3]
+    assert series_numbers(np.array([1999])).tolist() == [1]
+
+
+def test_read_and_to_long(tmp_path):
+    path = str(tmp_path / "station.csv")
+    write_station(path)
+    latitude, longitude, years, values = read_station_csv(path)
+    assert (latitude, longitude) == (41.5, -71.5)
+    assert years.tolist() == [2000, 2001, 2000, 2001] and values.shape == (4, 12)
+    series, year, month, value = to_long(years, values)
+    # 12 + 3 + 12 + 12 monthly values, blanks dropped
+    assert len(value) == 39
+    assert value[12:15].tolist() == [0.5, 1.5, 2]
+    assert month[12:15].tolist() == [1, 3, 12]
+    assert year[12:15].tolist() == [2001] * 3
+    assert series.tolist() == [1] * 15 + [2] * 24
+
+
+def test_aggregates(tmp_path):
+    path = str(tmp_path / "Meshanticut.csv")
+    database = str(tmp_path / "precipitation.sqlite")
+    write_station(path)
+    assert ingest_files([path], database) == (39, [])
+    connection = sqlite3.connect(database)
+    annual = connection.execute("SELECT series, year, total, months FROM annual_totals "
+                                 "WHERE station = 'Meshanticut' ORDER BY series, year").fetchall()
+    assert annual == [(1, 2000, 78.0, 12), (1, 2001, 4.0, 3), (2, 2000, 24.0, 12), (2, 2001, 12.0, 12)]
+    normals = connection.execute("SELECT month, mean, minimum, maximum, years FROM monthly_normals "
+                                 "WHERE station = 'Meshanticut' AND series = 1 ORDER BY month").fetchall()
+    assert normals[0] == (1, 0.75, 0.5, 1.0, 2)
+    assert normals[1] == (2, 2.0, 2.0, 2.0, 1)
+    assert normals[11] == (12, 7.0, 2.0, 12.0, 2)
+    connection.close()
+
+
+def test_reingest_replaces_station(tmp_path):
+    path = str(tmp_path / "Meshanticut.csv")
+    database = str(tmp_path / "precipitation.sqlite")
+    write_station(path)
+    ingest_files([path], database)
+    write_station(path, ROWS[2:])
+    assert ingest_files([path], database) == (24, [])
+    connection = sqlite3.connect(database)
+    assert connection.execute("SELECT COUNT(*) FROM precipitation").fetchone() == (24,)
+    assert connection.execute("SELECT series, year, total FROM annual_totals ORDER BY year").fetchall() == \
+        [(1, 2000, 24.0), (1, 2001, 12.0)]
+    connection.close()
+
+
+def test_other_csv_is_skipped(tmp_path):
+    write_station(str(tmp_path / "station.csv"))
+    with open(tmp_path / "notes.csv", "w") as file:
+        file.write("id,comment\n1,not a station\n")
+    database = str(tmp_path / "precipitation.sqlite")
+    count, skipped = ingest_directory(str(tmp_path), database)
+    assert count == 39 and skipped == [str(tmp_path / "notes.csv")]
+    connection = sqlite3.connect(database)
+    assert connection.execute("SELECT station FROM stations").fetchall() == [("station",)]
+    connection.close()
+
+
+def test_header_is_checked(tmp_path):
+    path = tmp_path / "notes.csv"
+    path.write_text("id,comment\n1,text\n")
+    with pytest.raises(ValueError):
+        read_station_csv(str(path))
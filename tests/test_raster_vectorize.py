@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from dbf_reader import DbfReader
+from raster_vectorize import array_window_reader, ring_area, vectorize_tiles, vectorize_to_shapefile
+from shapefile_io import read_polygons
+
+
+def ring_raster():
+    # A ring of 2s around a 3 in a background of 1s, plus a separate 2 in the corner
+    values = np.ones((9, 10), dtype=np.int32)
+    values[2:7, 2:7] = 2
+    values[4, 4] = 3
+    values[8, 9] = 2
+    values[0, 9] = 0
+    return values
+
+
+def regions(values, tile_size, nodata=None):
+    # (value, cell area, ring count) of every region, in a stable order
+    found = []
+    for value, rings in vectorize_tiles(array_window_reader(values), values.shape, nodata, tile_size):
+        # Rows point down, so exteriors have positive shoelace area here and holes negative
+        found.append((int(value), sum(ring_area(ring) for ring in rings), len(rings)))
+    return sorted(found)
+
+
+@pytest.mark.parametrize("tile_size", [1, 2, 3, 4, 100])
+def test_tiles_give_the_same_regions(tile_size):
+    values = ring_raster()
+    assert regions(values, tile_size, nodata=0) == regions(values, 100, nodata=0)
+
+
+def test_regions_cover_every_cell():
+    values = ring_raster()
+    found = regions(values, 3, nodata=0)
+    assert found == [(1, 63.0, 2), (2, 1.0, 1), (2, 24.0, 2), (3, 1.0, 1)]
+    assert sum(area for _, area, _ in found) == (values != 0).sum()
+
+
+def test_nan_cells_are_skipped():
+    values = np.array([[1.0, np.nan], [1.0, 1.0]])
+    assert regions(values, 1) == [(1, 3.0, 1)]
+    assert regions(np.full((3, 3), np.nan), 2) == []
+
+
+def test_shapefile_rings_are_oriented(tmp_path):
+    values = ring_raster()
+    path = str(tmp_path / "regions.shp")
+    transform = (500000.0, 4000000.0, 30.0, 30.0)
+    count = vectorize_to_shapefile(array_window_reader(values), values.shape, transform, path, nodata=0,
+                                   tile_size=4)
+    boxes, parts = read_polygons(path)
+    assert count == len(parts) == 4
+    for rings in parts:
+        # Shapefile exteriors are clockwise and holes counter-clockwise
+        assert ring_area(rings[0]) < 0
+        assert all(ring_area(ring) > 0 for ring in rings[1:])
+        assert all(np.array_equal(ring[0], ring[-1]) for ring in rings)
+    areas = [-sum(ring_area(ring) for ring in rings) / 900.0 for rings in parts]
+    table = DbfReader(path).read()
+    assert sorted(zip(table["gridcode"].tolist(), areas)) == [(1, 63.0), (2, 1.0), (2, 24.0), (3, 1.0)]
+    assert table["Id"].tolist() == [1, 2, 3, 4]
+    assert np.allclose(boxes[:, 0].min(), 500000.0) and np.allclose(boxes[:, 3].max(), 4000000.0)
+
+
+def test_regions_are_yielded_before_the_last_tile_is_read():
+    values = np.arange(64, dtype=np.int32).reshape(8, 8) // 4
+    reads = []
+
+    def read_window(row0, row1, col0, col1):
+        reads.append((row0, col0))
+        return values[row0:row1, col0:col1]
+
+    regions = vectorize_tiles(read_window, values.shape, tile_size=2)
+    next(regions)
+    # The regions of the first tile row are finished once the second tile row has been read
+    assert len(reads) < 16
+    assert len(list(regions)) == 15
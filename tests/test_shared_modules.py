@@ -0,0 +1,19 @@
+import glob
+import os
+
+import pytest
+
+from conftest import ROOT
+
+# Shared modules and the folder holding the reference copy of each
+SHARED_MODULES = {"raster_io.py": "Final Toolbox Challenge/Code", "shapefile_io.py": "Final Toolbox Challenge/Code",
+                  "dbf_reader.py": "Final Toolbox Challenge/Code", "kml_reader.py": "Code_Challenge_08/Code"}
+
+
+@pytest.mark.parametrize("name", sorted(SHARED_MODULES))
+def test_copies_match_reference(name):
+    with open(os.path.join(ROOT, SHARED_MODULES[name], name), 'rb') as file:
+        reference = file.read()
+    for path in glob.glob(os.path.join(ROOT, "*", "Code*", name)):
+        with open(path, 'rb') as file:
+            assert file.read() == reference, f"{path} differs from the reference copy"
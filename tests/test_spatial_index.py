@@ -0,0 +1,172 @@
+import numpy as np
+import pytest
+
+from dbf_reader import DbfReader
+from shapefile_io import POINT, POLYGON, ShapefileWriter
+from spatial_index import PolygonEdges, STRTree, candidate_features, intersect_points_with_polygons, \
+    load_or_build_index, locate_points, points_in_polygons
+
+
+def convex_ring(rng, centre, radius, corners, clockwise):
+    # Corners on a circle are always convex; spread around it, they keep the circle of radius
+    # 0.3 * radius inside. The ring is closed (first point repeated).
+    angles = (np.arange(corners) + rng.uniform(-0.1, 0.1, corners)) * 2 * np.pi / corners + rng.uniform(0, np.pi)
+    if clockwise:
+        angles = angles[::-1]
+    ring = centre + radius * np.column_stack([np.cos(angles), np.sin(angles)])
+    return np.vstack([ring, ring[:1]])
+
+
+def inside_convex(point, ring):
+    # Brute force: inside a convex ring when the point is on the same side of every edge
+    edges = ring[1:] - ring[:-1]
+    offsets = point - ring[:-1]
+    cross = edges[:, 0] * offsets[:, 1] - edges[:, 1] * offsets[:, 0]
+    return bool((cross > 0).all() or (cross < 0).all())
+
+
+def random_polygons(rng, count):
+    # Overlapping convex polygons, every other one with a convex hole
+    polygons = []
+    for index in range(count):
+        centre = rng.uniform(0, 10, 2)
+        radius = rng.uniform(0.5, 3)
+        rings = [convex_ring(rng, centre, radius, int(rng.integers(3, 9)), True)]
+        if index % 2:
+            rings.append(convex_ring(rng, centre, radius * 0.15, 5, False))
+        polygons.append(rings)
+    return polygons
+
+
+def brute_force_pairs(xy, polygons, live_points=None, live_polygons=None):
+    pairs = []
+    for point_index, point in enumerate(xy):
+        if live_points is not None and not live_points[point_index]:
+            continue
+        for polygon_index, rings in enumerate(polygons):
+            if live_polygons is not None and not live_polygons[polygon_index]:
+                continue
+            if inside_convex(point, rings[0]) and not any(inside_convex(point, ring) for ring in rings[1:]):
+                pairs.append((point_index, polygon_index))
+    return pairs
+
+
+def write_polygons(path, polygons):
+    with ShapefileWriter(path, POLYGON, [("NAME", "C", 10, 0)]) as writer:
+        for index, rings in enumerate(polygons):
+            writer.write([ring.tolist() for ring in rings], [f"area {index}"])
+
+
+def write_points(path, xy):
+    with ShapefileWriter(path, POINT, [("gridcode", "N", 4, 0)]) as writer:
+        for index, point in enumerate(xy):
+            writer.write([[tuple(point)]], [index % 11])
+
+
+def delete_record(path, record):
+    table = DbfReader(path)
+    with open(table.path, 'r+b') as file:
+        file.seek(table.records.offset + record * table.records.shape[1])
+        file.write(b"*")
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_tree_query_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    corners = rng.uniform(0, 100, (300, 2))
+    boxes = np.column_stack([corners, corners + rng.uniform(0, 10, (300, 2))])
+    queries = np.column_stack([rng.uniform(0, 100, (50, 2)), rng.uniform(0, 100, (50, 2))])
+    queries[:, 2:] = queries[:, :2] + np.abs(queries[:, 2:] - queries[:, :2]) / 5
+    tree = STRTree.build(boxes, capacity=4)
+    query, item = tree.query(queries)
+    expected = {(q, i) for q in range(len(queries)) for i in range(len(boxes))
+                if queries[q, 0] <= boxes[i, 2] and boxes[i, 0] <= queries[q, 2]
+                and queries[q, 1] <= boxes[i, 3] and boxes[i, 1] <= queries[q, 3]}
+    assert set(zip(query.tolist(), item.tolist())) == expected
+    assert len(query) == len(expected)
+
+
+def test_tree_save_and_load(tmp_path):
+    rng = np.random.default_rng(0)
+    corners = rng.uniform(0, 100, (100, 2))
+    tree = STRTree.build(np.column_stack([corners, corners + 1]))
+    tree.save(str(tmp_path / "tree.npz"), (12, 34))
+    loaded, signature = STRTree.load(str(tmp_path / "tree.npz"))
+    assert signature == (12, 34)
+    points = rng.uniform(0, 100, (200, 2))
+    assert [a.tolist() for a in loaded.query_points(points)] == [a.tolist() for a in tree.query_points(points)]
+
+
+def test_empty_tree():
+    tree = STRTree.build(np.zeros((0, 4)))
+    query, item = tree.query(np.array([[0.0, 0.0, 1.0, 1.0]]))
+    assert len(query) == len(item) == 0
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_points_in_polygons_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    polygons = random_polygons(rng, 12)
+    xy = rng.uniform(-1, 11, (400, 2))
+    point = np.repeat(np.arange(len(xy)), len(polygons))
+    polygon = np.tile(np.arange(len(polygons)), len(xy))
+    # A small chunk size makes the pairs run through several chunks
+    inside = points_in_polygons(xy, point, polygon, PolygonEdges(polygons), chunk_edges=1000)
+    found = list(zip(point[inside].tolist(), polygon[inside].tolist()))
+    assert found == brute_force_pairs(xy, polygons)
+
+
+def test_locate_points_and_saved_index(tmp_path):
+    rng = np.random.default_rng(7)
+    polygons = random_polygons(rng, 10)
+    path = str(tmp_path / "areas.shp")
+    write_polygons(path, polygons)
+    xy = rng.uniform(-1, 11, (300, 2))
+    xy[5] = np.nan
+    point, polygon = locate_points(xy, path)
+    assert list(zip(point.tolist(), polygon.tolist())) == brute_force_pairs(np.nan_to_num(xy, nan=-50), polygons)
+    assert (tmp_path / "areas.strtree.npz").exists()
+    # The second call reads the saved index
+    assert [a.tolist() for a in locate_points(xy, path)] == [point.tolist(), polygon.tolist()]
+    tree = load_or_build_index(path)
+    assert len(tree.items) == len(polygons)
+
+
+def test_intersect_skips_deleted_records(tmp_path):
+    rng = np.random.default_rng(3)
+    polygons = random_polygons(rng, 8)
+    xy = rng.uniform(-1, 11, (200, 2))
+    points_path, polygons_path = str(tmp_path / "risk.shp"), str(tmp_path / "areas.shp")
+    write_points(points_path, xy)
+    write_polygons(polygons_path, polygons)
+    live_points, live_polygons = np.ones(len(xy), dtype=bool), np.ones(len(polygons), dtype=bool)
+    for record in (0, 1, 2, 50):
+        delete_record(points_path, record)
+        live_points[record] = False
+    delete_record(polygons_path, 3)
+    live_polygons[3] = False
+
+    out = str(tmp_path / "intersect.shp")
+    count = intersect_points_with_polygons(points_path, polygons_path, out)
+    expected = brute_force_pairs(xy, polygons, live_points, live_polygons)
+    assert count == len(expected)
+    table = DbfReader(out).read()
+    assert table["FID_risk"].tolist() == [pair[0] for pair in expected]
+    assert table["FID_areas"].tolist() == [pair[1] for pair in expected]
+    assert table["NAME"].tolist() == [f"area {pair[1]}" for pair in expected]
+    assert table["gridcode"].tolist() == [pair[0] % 11 for pair in expected]
+
+
+def test_candidate_features(tmp_path):
+    rng = np.random.default_rng(5)
+    polygons = random_polygons(rng, 6)
+    points_path, polygons_path = str(tmp_path / "risk.shp"), str(tmp_path / "areas.shp")
+    xy = rng.uniform(-5, 15, (100, 2))
+    write_points(points_path, xy)
+    write_polygons(polygons_path, polygons)
+    points, areas = candidate_features(points_path, polygons_path)
+    boxes = np.array([[*rings[0].min(axis=0), *rings[0].max(axis=0)] for rings in polygons])
+    in_box = ((xy[:, None, 0] >= boxes[:, 0]) & (xy[:, None, 0] <= boxes[:, 2]) &
+              (xy[:, None, 1] >= boxes[:, 1]) & (xy[:, None, 1] <= boxes[:, 3]))
+    assert points.tolist() == np.flatnonzero(in_box.any(axis=1)).tolist()
+    assert areas.tolist() == np.flatnonzero(in_box.any(axis=0)).tolist()
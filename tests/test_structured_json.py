@@ -0,0 +1,50 @@
+import io
+import json
+
+import pytest
+
+from structured_json import convert_in_memory, convert_streaming, iter_esri_features
+
+
+def feature(index):
+    return {"attributes": {"NAME_1": "Nairobi", "NAME_2": f"Constituency {index}", "NAME_3": "Kibera é",
+                           "gridcode": index % 11, "POINT_X": 36.8 + index / 1000.0, "POINT_Y": -1.25,
+                           "OBJECTID": index},
+            "geometry": {"x": 36.8, "y": -1.25}}
+
+
+def write_feature_set(path, features):
+    data = {"displayFieldName": "", "fields": [{"name": "NAME_1", "type": "esriFieldTypeString"}],
+            "spatialReference": {"wkid": 4326}, "features": features}
+    with open(path, 'w') as file:
+        json.dump(data, file, indent=2)
+
+
+@pytest.mark.parametrize("count", [0, 1, 25])
+@pytest.mark.parametrize("ndjson", [False, True])
+def test_streaming_matches_in_memory(tmp_path, count, ndjson):
+    source = str(tmp_path / "risk.json")
+    write_feature_set(source, [feature(index) for index in range(count)])
+    streamed, loaded = str(tmp_path / "streamed.json"), str(tmp_path / "loaded.json")
+    assert convert_streaming(source, streamed, ndjson) == count
+    assert convert_in_memory(source, loaded, ndjson) == count
+    with open(streamed, 'rb') as a, open(loaded, 'rb') as b:
+        assert a.read() == b.read()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 65536])
+def test_features_cut_across_chunks(chunk_size):
+    features = [feature(index) for index in range(10)]
+    text = json.dumps({"features": features, "spatialReference": {"wkid": 4326}})
+    assert list(iter_esri_features(io.StringIO(text), chunk_size)) == features
+
+
+def test_member_order_and_empty_object():
+    text = '{"spatialReference": {"wkid": 4326}, "features": [ ], "fields": []}'
+    assert list(iter_esri_features(io.StringIO(text), 4)) == []
+    assert list(iter_esri_features(io.StringIO("{ }"), 4)) == []
+
+
+def test_malformed_input_raises():
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_esri_features(io.StringIO('{"features": [{"attributes": {}} {}]}'), 4))
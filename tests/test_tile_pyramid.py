@@ -0,0 +1,116 @@
+import os
+import struct
+import zlib
+
+import numpy as np
+import pytest
+
+from raster_io import RasterReader, save_geotiff
+from tile_pyramid import TILE_SIZE, TileCache, encode_png, generate_pyramid, import_tree, lonlat_to_tile, \
+    render_tile, tile_range
+
+
+def decode_png(png):
+    # Just enough of a PNG decoder for encode_png's output: one IDAT, no filtering
+    assert png[:8] == b"\x89PNG\r\n\x1a\n"
+    chunks, position = {}, 8
+    while position < len(png):
+        length, kind = struct.unpack(">I4s", png[position:position + 8])
+        data = png[position + 8:position + 8 + length]
+        assert struct.unpack(">I", png[position + 8 + length:position + 12 + length])[0] == zlib.crc32(kind + data)
+        chunks[kind] = data
+        position += 12 + length
+    width, height, depth, colour, _, _, _ = struct.unpack(">IIBBBBB", chunks[b"IHDR"])
+    assert (depth, colour) == (8, 6)
+    rows = np.frombuffer(zlib.decompress(chunks[b"IDAT"]), dtype=np.uint8).reshape(height, width * 4 + 1)
+    assert not rows[:, 0].any()
+    return rows[:, 1:].reshape(height, width, 4)
+
+
+def test_lonlat_to_tile():
+    assert lonlat_to_tile(0.0, 0.0, 1) == (1.0, 1.0)
+    x, y = lonlat_to_tile(-180.0, 85.0511287798, 3)
+    assert x == 0.0 and abs(y) < 1e-9
+    # Latitudes beyond Web Mercator's limit are clamped
+    assert lonlat_to_tile(180.0, -90.0, 2)[1] == pytest.approx(4.0)
+
+
+def test_tile_range():
+    assert tile_range((-180.0, -85.0, 180.0, 85.0), 2) == (0, 3, 0, 3)
+    assert tile_range((0.5, 0.5, 1.0, 1.0), 0) == (0, 0, 0, 0)
+    x0, x1, y0, y1 = tile_range((33.9, -4.7, 41.9, 5.0), 6)
+    assert x0 <= lonlat_to_tile(33.9, 5.0, 6)[0] < x0 + 1 and x1 == int(lonlat_to_tile(41.9, -4.7, 6)[0])
+    assert y0 == int(lonlat_to_tile(33.9, 5.0, 6)[1]) and y1 == int(lonlat_to_tile(41.9, -4.7, 6)[1])
+
+
+def test_encode_png_round_trip():
+    rgba = np.random.default_rng(0).integers(0, 256, size=(5, 7, 4), dtype=np.uint8)
+    png = encode_png(rgba)
+    assert np.array_equal(decode_png(png), rgba)
+    assert encode_png(rgba.copy()) == png
+
+
+def test_render_tile():
+    values = np.array([[0, 5], [10, np.nan]], dtype=np.float32)
+    reader = RasterReader(values, (0.0, 1.0, 0.5, 0.5))
+    x, y = (int(value) for value in lonlat_to_tile(0.5, 0.5, 10))
+    source_hash, png = render_tile(reader, 10, x, y, [(0, (0, 0, 0, 255)), (10, (200, 100, 0, 255))])
+    image = decode_png(png)
+    assert image.shape == (TILE_SIZE, TILE_SIZE, 4)
+    colours = {tuple(pixel) for pixel in image.reshape(-1, 4).tolist()}
+    # Two colours from the ramp, the midpoint and transparent pixels (NoData and outside the raster)
+    assert colours == {(0, 0, 0, 255), (100, 50, 0, 255), (200, 100, 0, 255), (0, 0, 0, 0)}
+    assert render_tile(reader, 10, x, y, [(0, (0, 0, 0, 255)), (10, (200, 100, 0, 255))], source_hash) == \
+        (source_hash, None)
+    # A tile away from the raster is blank
+    assert render_tile(reader, 10, x + 10, y, [(0, (0, 0, 0, 255))]) == (None, None)
+
+
+def test_tile_cache_stores_each_image_once(tmp_path):
+    cache = TileCache(str(tmp_path / "cache"))
+    blank, red = encode_png(np.zeros((2, 2, 4), np.uint8)), encode_png(np.full((2, 2, 4), 200, np.uint8))
+    assert cache.put("1/0/0", blank, "a") and not cache.put("1/0/1", blank, "b")
+    assert cache.put("1/1/0", red, "c")
+    cache.save()
+    reopened = TileCache(str(tmp_path / "cache"))
+    assert reopened.source_hash("1/0/1") == "b" and reopened.source_hash("2/0/0") is None
+    reopened.remove("1/1/0")
+    assert reopened.prune() == 1
+    objects = [name for _, _, files in os.walk(reopened.objects) for name in files]
+    assert len(objects) == 1
+
+
+def test_export_tree_removes_stale_tiles(tmp_path):
+    cache = TileCache(str(tmp_path / "cache"))
+    png = encode_png(np.zeros((2, 2, 4), np.uint8))
+    for key in ["3/1/1", "3/1/2", "3/2/1"]:
+        cache.put(key, png, None)
+    tree = tmp_path / "tiles"
+    assert cache.export_tree(str(tree)) == 0
+    with open(str(tree / "3" / "1" / "1.png"), 'rb') as file:
+        assert file.read() == png
+    (tree / "legend.png").write_bytes(b"keep")
+    cache.remove("3/2/1")
+    assert cache.export_tree(str(tree)) == 1
+    assert not (tree / "3" / "2").exists()
+    assert (tree / "legend.png").exists() and (tree / "3" / "1" / "2.png").exists()
+
+    imported = TileCache(str(tmp_path / "imported"))
+    assert import_tree(str(tree), imported) == (3, 2)
+    assert sorted(imported.index) == ["3/1/1", "3/1/2", "legend"]
+
+
+def test_generate_pyramid_skips_unchanged_tiles(tmp_path):
+    raster = str(tmp_path / "risk.tif")
+    values = np.arange(24, dtype=np.float32).reshape(4, 6) % 11
+    save_geotiff(raster, values, (34.0, 2.0, 1.0, 1.0))
+    first_cache, first = generate_pyramid(raster, str(tmp_path / "cache"), [3, 4], workers=1)
+    assert first["rendered"] == len(first_cache.index) > 0 and first["unchanged"] == 0
+    _, second = generate_pyramid(raster, str(tmp_path / "cache"), [3, 4], workers=1)
+    assert second["rendered"] == 0 and second["unchanged"] == first["rendered"]
+
+    values[0, 0] = 10
+    save_geotiff(raster, values, (34.0, 2.0, 1.0, 1.0))
+    _, third = generate_pyramid(raster, str(tmp_path / "cache"), [3, 4], workers=1)
+    assert 0 < third["rendered"] < first["rendered"] + 1
+    assert third["rendered"] + third["unchanged"] == first["rendered"]